@@ -0,0 +1,275 @@
+"""
+Per-language admission control for executions.
+
+Each language gets a fixed number of execution slots and a bounded queue of
+waiters. A request that finds the queue full, or waits longer than the
+admission timeout, is rejected with AdmissionRejected so the web layer can
+answer 429 instead of forking yet another compiler.
+
+Slot counts: COLUNN_SLOTS_C, COLUNN_SLOTS_CPP, COLUNN_SLOTS_JAVA,
+COLUNN_SLOTS_PYTHON (default: number of CPUs). Queue bound and wait limit:
+COLUNN_ADMISSION_QUEUE and COLUNN_ADMISSION_TIMEOUT.
+
+Threads and coroutines share one FIFO per language: threads wait on a
+condition variable, coroutines (acquire_async) on a future that is resolved
+when they reach the head of the queue, so neither blocks the event loop.
+"""
+import asyncio
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+LANGUAGES = ('c', 'cpp', 'java', 'python')
+
+DEFAULT_MAX_WAITING = 32
+DEFAULT_WAIT_TIMEOUT = 10.0
+
+# Smoothing factor for the moving averages of wait and hold times
+EWMA_ALPHA = 0.2
+
+
+class AdmissionRejected(Exception):
+    """Raised when a language's slots and wait queue are exhausted"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class AsyncWaiter:
+    """A coroutine's place in a limiter's queue"""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.future = loop.create_future()
+        self.started = time.monotonic()
+        self.admitted = False
+        self.waited = 0.0
+
+    def admit(self, waited):
+        # Called with the limiter's condition held, from any thread
+        self.admitted = True
+        self.waited = waited
+        self.loop.call_soon_threadsafe(_resolve, self.future)
+
+
+class LanguageLimiter:
+    """
+    Counting semaphore with a bounded FIFO of waiters and wait-time figures.
+    """
+
+    def __init__(self, language, slots, max_waiting, wait_timeout):
+        self.language = language
+        self.slots = slots
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self._condition = threading.Condition()
+        self._waiters = []
+        self.running = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.max_wait = 0.0
+        self.avg_wait = 0.0
+        self.avg_hold = 0.0
+
+    def retry_after(self):
+        """Seconds a rejected client should back off, estimated from recent hold times"""
+        # Called with the condition held
+        backlog = (len(self._waiters) + 1) / self.slots
+        return max(1, math.ceil(backlog * self.avg_hold))
+
+    def acquire(self, timeout=None, bounded=True):
+        """
+        Take a slot, waiting up to timeout seconds (default wait_timeout).
+        bounded=False skips the queue bound and waits without a deadline, for
+        callers that are already bounded themselves (the job queue's workers).
+        Returns the time spent waiting; raises AdmissionRejected.
+        """
+        if timeout is None:
+            timeout = self.wait_timeout
+        started = time.monotonic()
+        ticket = object()
+
+        with self._condition:
+            if not self._waiters and self.running < self.slots:
+                self._admit(0.0)
+                return 0.0
+
+            if bounded and len(self._waiters) >= self.max_waiting:
+                self.rejected += 1
+                raise AdmissionRejected(f'Too many pending {self.language} executions',
+                                        self.retry_after())
+
+            self._waiters.append(ticket)
+            waited = None
+            try:
+                deadline = started + timeout if bounded else None
+                while self._waiters[0] is not ticket or self.running >= self.slots:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self.timed_out += 1
+                        raise AdmissionRejected(f'Timed out waiting for a {self.language} execution slot',
+                                                self.retry_after())
+                    self._condition.wait(remaining)
+                waited = time.monotonic() - started
+                self._admit(waited)
+            finally:
+                self._waiters.remove(ticket)
+                # The next waiter may now be at the head of the queue
+                self._condition.notify_all()
+                self._hand_off()
+
+            return waited
+
+    async def acquire_async(self, timeout=None, bounded=True):
+        """
+        acquire() for coroutines: queues in the same FIFO but waits on a
+        future, so the event loop keeps running. Returns the time spent
+        waiting; raises AdmissionRejected.
+        """
+        if timeout is None:
+            timeout = self.wait_timeout
+
+        with self._condition:
+            if not self._waiters and self.running < self.slots:
+                self._admit(0.0)
+                return 0.0
+
+            if bounded and len(self._waiters) >= self.max_waiting:
+                self.rejected += 1
+                raise AdmissionRejected(f'Too many pending {self.language} executions',
+                                        self.retry_after())
+
+            waiter = AsyncWaiter(asyncio.get_running_loop())
+            self._waiters.append(waiter)
+            self._hand_off()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout if bounded else None)
+        except asyncio.TimeoutError:
+            with self._condition:
+                # It may have been admitted while the timeout fired; then keep the slot
+                if not waiter.admitted:
+                    self._waiters.remove(waiter)
+                    self.timed_out += 1
+                    self._condition.notify_all()
+                    self._hand_off()
+                    raise AdmissionRejected(f'Timed out waiting for a {self.language} execution slot',
+                                            self.retry_after())
+        except asyncio.CancelledError:
+            with self._condition:
+                if waiter.admitted:
+                    self.running -= 1
+                else:
+                    self._waiters.remove(waiter)
+                self._condition.notify_all()
+                self._hand_off()
+            raise
+        return waiter.waited
+
+    def _hand_off(self):
+        """Admit coroutines that reached the head of the queue; threads wake on notify_all"""
+        # Called with the condition held
+        while self._waiters and type(self._waiters[0]) is AsyncWaiter and self.running < self.slots:
+            waiter = self._waiters.pop(0)
+            waited = time.monotonic() - waiter.started
+            self._admit(waited)
+            waiter.admit(waited)
+
+    def _admit(self, waited):
+        # Called with the condition held
+        self.running += 1
+        self.admitted += 1
+        self.max_wait = max(self.max_wait, waited)
+        self.avg_wait += EWMA_ALPHA * (waited - self.avg_wait)
+
+    def release(self, held):
+        """Return a slot held for `held` seconds"""
+        with self._condition:
+            self.running -= 1
+            self.avg_hold += EWMA_ALPHA * (held - self.avg_hold)
+            self._condition.notify_all()
+            self._hand_off()
+
+    def stats(self):
+        with self._condition:
+            return {
+                'slots': self.slots,
+                'running': self.running,
+                'waiting': len(self._waiters),
+                'max_waiting': self.max_waiting,
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'avg_wait': round(self.avg_wait, 6),
+                'max_wait': round(self.max_wait, 6),
+                'avg_hold': round(self.avg_hold, 6)
+            }
+
+
+class AdmissionController:
+    """
+    One LanguageLimiter per supported language.
+    """
+
+    def __init__(self, max_waiting=None, wait_timeout=None):
+        max_waiting = max_waiting or int(os.environ.get('COLUNN_ADMISSION_QUEUE', DEFAULT_MAX_WAITING))
+        wait_timeout = wait_timeout or float(os.environ.get('COLUNN_ADMISSION_TIMEOUT', DEFAULT_WAIT_TIMEOUT))
+        default_slots = os.cpu_count() or 2
+        self.limiters = {
+            language: LanguageLimiter(
+                language,
+                int(os.environ.get(f'COLUNN_SLOTS_{language.upper()}', default_slots)),
+                max_waiting,
+                wait_timeout
+            )
+            for language in LANGUAGES
+        }
+
+    def acquire(self, language, bounded=True):
+        """
+        Take one execution slot for language and return a function that gives
+        it back. Raises AdmissionRejected.
+        """
+        limiter = self.limiters[language]
+        limiter.acquire(bounded=bounded)
+        started = time.monotonic()
+
+        def release():
+            limiter.release(time.monotonic() - started)
+
+        return release
+
+    async def acquire_async(self, language, bounded=True):
+        """acquire() for coroutines; the returned release function is synchronous"""
+        limiter = self.limiters[language]
+        await limiter.acquire_async(bounded=bounded)
+        started = time.monotonic()
+
+        def release():
+            limiter.release(time.monotonic() - started)
+
+        return release
+
+    @contextmanager
+    def slot(self, language, bounded=True):
+        """Hold one execution slot for language for the duration of the block"""
+        release = self.acquire(language, bounded)
+        try:
+            yield
+        finally:
+            release()
+
+    def stats(self):
+        return {language: limiter.stats() for language, limiter in self.limiters.items()}
+
+
+admission = AdmissionController()
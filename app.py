@@ -1,6 +1,7 @@
 import os
 import logging
 import json
+import sys
 
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
@@ -15,6 +16,10 @@ class Base(DeclarativeBase):
 
 db = SQLAlchemy(model_class=Base)
 
+# Run as a script this module is __main__; let models' `from app import db`
+# find it rather than execute a second copy while models is half-imported
+sys.modules.setdefault('app', sys.modules[__name__])
+
 # Create the app
 app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key-change-in-production")
@@ -22,6 +27,8 @@ app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
 
 # Configure the database
 database_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'codequest.db')
+# The database is runtime state and is not checked in
+os.makedirs(os.path.dirname(database_path), exist_ok=True)
 app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", f"sqlite:///{database_path}")
 app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
     "pool_recycle": 300,
@@ -44,9 +51,28 @@ from routes import register_routes
 # Register routes
 register_routes(app, db)
 
+# Build precompiled headers for the C/C++ toolchains in the background
+from code_executor import NATIVE_TOOLCHAINS
+from precompiled_headers import precompiled_headers
+precompiled_headers.start(NATIVE_TOOLCHAINS)
+
+# Reap stray executor processes and stale workspaces in the background
+from janitor import janitor
+janitor.start()
+
 with app.app_context():
     # Create all tables
     db.create_all()
 
+    # Seed the tasks on a fresh database, then grading test cases and
+    # reference solutions for tasks that predate them
+    models.initialize_default_tasks()
+    models.initialize_default_test_cases()
+    models.initialize_default_references()
+
+# Benchmark reference solutions in the background to calibrate run time limits
+from time_limits import time_limit_calibrator
+time_limit_calibrator.start(app)
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)
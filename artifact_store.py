@@ -0,0 +1,174 @@
+"""
+Compiled-program handles shared between /compile and /run.
+
+/compile registers the submission here and gets back a handle derived from
+the language and source hash, alongside its syntax-only diagnostics. Nothing
+is built until the first /run that carries the handle: that run does the
+full build and keeps it, runs arriving meanwhile wait for it, and later runs
+use the stored program directly, so re-running the same code with different
+input invokes the compiler once. A /compile that is never run costs only the
+syntax check.
+
+Artifacts live in the memory of the process that built them, for
+COLUNN_ARTIFACT_TTL seconds after their last use, and at most
+COLUNN_ARTIFACT_MAX of them are kept (least recently used go first).
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_TTL = 900
+DEFAULT_MAX_ARTIFACTS = 64
+
+
+def artifact_handle(language, code):
+    """Handle for a language/source pair"""
+    digest = hashlib.sha256()
+    digest.update(language.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(code.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class Artifact:
+    """A submission's build: unbuilt until started, pending until ready is set, then result/program"""
+
+    def __init__(self, handle, language):
+        self.handle = handle
+        self.language = language
+        self.started = False
+        self.ready = threading.Event()
+        self.result = None
+        self.program = None
+        self.last_used = time.monotonic()
+        # Runs in progress; an artifact in use is never evicted
+        self.users = 0
+
+    def wait(self, timeout):
+        """Block until the build finishes; returns the CompiledProgram or None"""
+        self.ready.wait(timeout)
+        return self.program
+
+
+class ArtifactStore:
+    """
+    Bounded, TTL-limited map of handle -> Artifact.
+    """
+
+    def __init__(self, ttl=None, max_artifacts=None):
+        self.ttl = ttl or int(os.environ.get('COLUNN_ARTIFACT_TTL', DEFAULT_TTL))
+        self.max_artifacts = max_artifacts or int(os.environ.get('COLUNN_ARTIFACT_MAX', DEFAULT_MAX_ARTIFACTS))
+        self._artifacts = OrderedDict()
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    def _expire(self):
+        # Called with the lock held; returns artifacts to close outside it
+        cutoff = time.monotonic() - self.ttl
+        excess = len(self._artifacts) - self.max_artifacts
+        dropped = []
+        # Oldest first, so the LRU bound drops the least recently used
+        for handle in list(self._artifacts):
+            artifact = self._artifacts[handle]
+            if artifact.users or (artifact.started and not artifact.ready.is_set()):
+                continue
+            if artifact.last_used < cutoff:
+                self.expired += 1
+            elif len(dropped) >= excess:
+                continue
+            dropped.append(self._artifacts.pop(handle))
+        return dropped
+
+    @staticmethod
+    def _close(artifacts):
+        for artifact in artifacts:
+            if artifact.program is not None:
+                artifact.program.close()
+
+    def register(self, language, code):
+        """
+        Register language/code for a later build and return its handle; an
+        existing artifact for the same source is reused.
+        """
+        handle = artifact_handle(language, code)
+        with self._lock:
+            artifact = self._artifacts.get(handle)
+            if artifact is not None:
+                artifact.last_used = time.monotonic()
+                self._artifacts.move_to_end(handle)
+                return handle
+            self._artifacts[handle] = Artifact(handle, language)
+            dropped = self._expire()
+        self._close(dropped)
+        return handle
+
+    def build(self, artifact, code, compile_fn, timeout):
+        """
+        The artifact's CompiledProgram (None when the build failed or is still
+        running elsewhere after timeout seconds). The first caller builds it
+        in its own thread with compile_fn(language, code), which returns
+        (result, program); later callers wait for that build.
+        """
+        with self._lock:
+            building = not artifact.started
+            if building:
+                artifact.started = True
+                self.builds += 1
+        if not building:
+            return artifact.wait(timeout)
+
+        try:
+            result, program = compile_fn(artifact.language, code)
+        except Exception as e:
+            result, program = {'success': False, 'error': f'Build error: {str(e)}'}, None
+        with self._lock:
+            artifact.result = result
+            artifact.program = program
+            artifact.ready.set()
+        return program
+
+    def get(self, handle, language, code):
+        """
+        The artifact for handle if it is still stored and matches language/code,
+        else None. The artifact is held until release() is called.
+        """
+        if handle != artifact_handle(language, code):
+            return None
+        with self._lock:
+            dropped = self._expire()
+            artifact = self._artifacts.get(handle)
+            if artifact is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                artifact.users += 1
+                artifact.last_used = time.monotonic()
+                self._artifacts.move_to_end(handle)
+        self._close(dropped)
+        return artifact
+
+    def release(self, artifact):
+        """Finish a run started with get()"""
+        with self._lock:
+            artifact.users -= 1
+            artifact.last_used = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'artifacts': len(self._artifacts),
+                'max_artifacts': self.max_artifacts,
+                'ttl': self.ttl,
+                'builds': self.builds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'expired': self.expired
+            }
+
+
+artifact_store = ArtifactStore()
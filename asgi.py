@@ -0,0 +1,338 @@
+"""
+ASGI entry point.
+
+POST /run and /run/stream are served natively on the event loop: admission
+waits are awaited, and the program runs under async_executor, so one worker
+process can supervise hundreds of running submissions. Every other route
+(and /run with "async": true) is handed to the Flask app through a WSGI
+bridge on its own thread pool (COLUNN_WSGI_THREADS). uvicorn comes with the
+"asgi" extra (pip install '.[asgi]').
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+    gunicorn -k uvicorn.workers.UvicornWorker asgi:app
+
+main.py still serves the plain WSGI app.
+"""
+import asyncio
+import io
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from app import app as flask_app
+from admission import admission, AdmissionRejected
+from artifact_store import artifact_store
+from async_executor import execute_async, in_thread, install_child_watcher, run_compiled_async
+from code_executor import compile_program
+from result_cache import result_cache, OutputRecorder
+from routes import ARTIFACT_BUILD_WAIT, lookup_run, overloaded_payload, resolve_language, sse_event
+from singleflight import singleflight, flight_key
+
+DEFAULT_WSGI_THREADS = 32
+
+LANGUAGES = ('c', 'cpp', 'java', 'python')
+
+SSE_HEADERS = [
+    (b'content-type', b'text/event-stream; charset=utf-8'),
+    (b'cache-control', b'no-cache'),
+    (b'x-accel-buffering', b'no')
+]
+
+wsgi_pool = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('COLUNN_WSGI_THREADS', DEFAULT_WSGI_THREADS)),
+    thread_name_prefix='colunn-wsgi'
+)
+
+
+async def run_artifact_async(language, code, handle, stdin=None, on_output=None):
+    """routes.run_artifact for the event loop; None when the artifact can't be used"""
+    artifact = artifact_store.get(handle, language, code)
+    if artifact is None:
+        return None
+
+    try:
+        program = await in_thread(artifact_store.build, artifact, code, compile_program, ARTIFACT_BUILD_WAIT)
+        if not artifact.ready.is_set():
+            return None
+        if program is None:
+            result = dict(artifact.result)
+        else:
+            result = await run_compiled_async(program, stdin, on_output)
+    finally:
+        artifact_store.release(artifact)
+
+    result['artifact'] = handle
+    return result
+
+
+async def execute_request_async(language, code, on_output=None, stdin=None, artifact=None):
+    """routes.execute_request for a run on the event loop"""
+    if artifact:
+        result = await run_artifact_async(language, code, artifact, stdin, on_output)
+        if result is not None:
+            return result
+    return await execute_async(language, code, on_output, stdin)
+
+
+def request_error(code, language):
+    """The validation error /run reports before admitting a request, or None"""
+    if not code.strip():
+        return {'success': False, 'error': 'No code provided'}
+    if language not in LANGUAGES:
+        return {'success': False, 'error': f'Unsupported language: {language}'}
+    return None
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def send_json(send, payload, status=200, headers=()):
+    body = json.dumps(payload).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'),
+                    (b'content-length', str(len(body)).encode('latin-1'))] + list(headers)
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def send_overloaded(send, error):
+    await send_json(send, overloaded_payload(error), 429,
+                    [(b'retry-after', str(error.retry_after).encode('latin-1'))])
+
+
+async def run_code(data, receive, send):
+    """POST /run"""
+    code = data.get('code', '')
+    language = resolve_language(data)
+    error = request_error(code, language)
+    if error:
+        await send_json(send, error)
+        return
+
+    stdin = data.get('stdin')
+    artifact = data.get('artifact')
+    # Cache lookups read from disk and may run the compiler for its version
+    cache_key, cached = await in_thread(lookup_run, language, code, stdin)
+    if cached is not None:
+        await send_json(send, cached)
+        return
+
+    async def execute():
+        release = await admission.acquire_async(language)
+        try:
+            result = await execute_request_async(language, code, stdin=stdin, artifact=artifact)
+        finally:
+            release()
+        if cache_key is not None:
+            await in_thread(result_cache.store, cache_key, result)
+        return result
+
+    try:
+        result = await singleflight.do_async(flight_key(language, code, stdin, 'run', artifact), execute)
+    except AdmissionRejected as e:
+        await send_overloaded(send, e)
+        return
+    except Exception as e:
+        result = {'success': False, 'error': f'Execution error: {str(e)}'}
+    await send_json(send, result)
+
+
+async def run_code_stream(data, receive, send):
+    """POST /run/stream: program output as Server-Sent Events while it runs"""
+    code = data.get('code', '')
+    language = resolve_language(data)
+    error = request_error(code, language)
+
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+
+    def on_output(stream, text):
+        # Called on the loop, or from a pool thread for in-process runners
+        loop.call_soon_threadsafe(events.put_nowait, (stream, {'text': text}))
+
+    # Admit before the stream starts so an overloaded server can still answer 429
+    release = None
+    cache_key = cached = recorder = None
+    if error is None:
+        # A cached result replays its output into the queue and needs no slot
+        cache_key, cached = await in_thread(lookup_run, language, code, data.get('stdin'), on_output)
+        if cache_key is not None:
+            recorder = OutputRecorder(on_output)
+        if cached is None:
+            try:
+                release = await admission.acquire_async(language)
+            except AdmissionRejected as e:
+                await send_overloaded(send, e)
+                return
+
+    async def execute():
+        if error is not None:
+            result = error
+        elif cached is not None:
+            result = cached
+        else:
+            try:
+                result = await execute_request_async(language, code, on_output=recorder or on_output,
+                                                     stdin=data.get('stdin'), artifact=data.get('artifact'))
+            except Exception as e:
+                result = {'success': False, 'error': f'Execution error: {str(e)}'}
+            finally:
+                release()
+            if cache_key is not None:
+                await in_thread(result_cache.store, cache_key, result, recorder)
+        # Let output queued from pool threads arrive before the result
+        loop.call_soon_threadsafe(events.put_nowait, ('result', result))
+
+    async def watch_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    await send({'type': 'http.response.start', 'status': 200, 'headers': SSE_HEADERS})
+    execution = asyncio.create_task(execute())
+    disconnect = asyncio.create_task(watch_disconnect())
+    try:
+        while True:
+            next_event = asyncio.create_task(events.get())
+            await asyncio.wait((next_event, disconnect), return_when=asyncio.FIRST_COMPLETED)
+            if not next_event.done():
+                # The client went away; cancelling the run kills the program
+                next_event.cancel()
+                execution.cancel()
+                return
+            event, payload = next_event.result()
+            await send({'type': 'http.response.body', 'body': sse_event(event, payload).encode('utf-8'),
+                        'more_body': event != 'result'})
+            if event == 'result':
+                return
+    finally:
+        disconnect.cancel()
+
+
+NATIVE_ROUTES = {
+    '/run': run_code,
+    '/run/stream': run_code_stream
+}
+
+
+def wsgi_environ(scope, body):
+    """Build a WSGI environ for an ASGI HTTP scope with a fully read body"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_LENGTH':
+            continue
+        if name == 'CONTENT_TYPE':
+            environ[name] = value
+            continue
+        key = f'HTTP_{name}'
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+def run_wsgi(loop, environ, send):
+    """
+    Call the Flask app on a bridge thread, forwarding each chunk of its
+    response to the ASGI send as it is produced (so SSE routes stream).
+    """
+    response = {'started': False}
+
+    def forward(message):
+        asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+    def start():
+        if not response['started']:
+            response['started'] = True
+            forward({'type': 'http.response.start', 'status': response['status'],
+                     'headers': response['headers']})
+
+    def write(data):
+        start()
+        forward({'type': 'http.response.body', 'body': data, 'more_body': True})
+
+    def start_response(status, headers, exc_info=None):
+        if exc_info and response['started']:
+            raise exc_info[1].with_traceback(exc_info[2])
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                               for name, value in headers]
+        return write
+
+    body = flask_app(environ, start_response)
+    try:
+        for chunk in body:
+            if chunk:
+                write(chunk)
+        start()
+        forward({'type': 'http.response.body', 'body': b''})
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            install_child_watcher(asyncio.get_running_loop())
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    body = await read_body(receive)
+    if body is None:
+        return
+
+    handler = NATIVE_ROUTES.get(scope['path']) if scope['method'] == 'POST' else None
+    if handler is not None:
+        try:
+            data = json.loads(body)
+        except ValueError:
+            data = None
+        # Malformed bodies get Flask's error response; queued jobs go through Flask's job queue
+        if isinstance(data, dict) and not data.get('async'):
+            await handler(data, receive, send)
+            return
+
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(wsgi_pool, run_wsgi, loop, wsgi_environ(scope, body), send)
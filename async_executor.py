@@ -0,0 +1,350 @@
+"""
+Asyncio-native execution path.
+
+The synchronous executors hold a thread for as long as a student's program
+runs, so a worker's concurrency is its thread count. Here the run stage is a
+coroutine over asyncio.create_subprocess_exec with async output reading and
+timeouts: one event loop supervises any number of running programs, each
+costing a few file descriptors instead of a thread.
+
+Compilation (short, and mostly compile-cache hits) and the in-process runners
+(the Python zygote, the JVM pool, the C interpreter) still block, so they run
+on a bounded thread pool (COLUNN_ASYNC_THREADS). asgi.py serves /run and
+/run/stream on top of this module.
+"""
+import asyncio
+import functools
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from code_executor import compile_program, prepare_test_input, record_run
+from process_runner import (LEADER_EXIT_GRACE, LEADER_POLL_INTERVAL, MAX_OUTPUT_BYTES, READ_CHUNK, ProcessResult,
+                            child_environment, kill_group, stage_stats, text_output_callback)
+from time_slicer import time_slicer
+
+DEFAULT_THREADS = 32
+
+RUN_TIMEOUT = 5
+
+# Compile-stage keys copied from the compile result into the run result
+COMPILE_KEYS = ('compiler_tier', 'compiler', 'compile_cache', 'precompiled_header')
+
+blocking_pool = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('COLUNN_ASYNC_THREADS', DEFAULT_THREADS)),
+    thread_name_prefix='colunn-async'
+)
+
+
+async def in_thread(fn, *args, **kwargs):
+    """Run blocking fn(*args, **kwargs) on the executor's thread pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(blocking_pool, functools.partial(fn, *args, **kwargs))
+
+
+def install_child_watcher(loop):
+    """
+    Before Python 3.12, asyncio reaps each child with its own waitpid()
+    thread; a pidfd watcher waits for all of them on the event loop instead.
+    """
+    if sys.version_info >= (3, 12) or not hasattr(os, 'pidfd_open'):
+        return
+    watcher = asyncio.PidfdChildWatcher()
+    watcher.attach_loop(loop)
+    asyncio.set_child_watcher(watcher)
+
+
+class ProcessSupervisor:
+    """
+    Counters for processes running on the event loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.running = 0
+        self.peak = 0
+        self.started = 0
+        self.timed_out = 0
+        self.truncated = 0
+
+    def enter(self):
+        with self._lock:
+            self.running += 1
+            self.started += 1
+            self.peak = max(self.peak, self.running)
+
+    def leave(self, timed_out=False, truncated=False):
+        with self._lock:
+            self.running -= 1
+            self.timed_out += timed_out
+            self.truncated += truncated
+
+    def stats(self):
+        with self._lock:
+            return {
+                'running': self.running,
+                'peak': self.peak,
+                'started': self.started,
+                'timed_out': self.timed_out,
+                'truncated': self.truncated,
+                'threads': blocking_pool._max_workers
+            }
+
+
+supervisor = ProcessSupervisor()
+
+
+async def _feed_input(writer, data):
+    try:
+        if data:
+            writer.write(data)
+            await writer.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        # The program exited without reading all of its input
+        pass
+    finally:
+        writer.close()
+
+
+async def run_process_async(argv, input_text='', timeout=RUN_TIMEOUT, cwd=None, on_output=None, capture=True,
+                            max_output=None):
+    """
+    run_process() as a coroutine: same output cap, streaming callback and
+    ProcessResult, and raises subprocess.TimeoutExpired (with .stats) after
+    killing the child. The event loop's child watcher reaps the process, so
+    stats hold wall time (and time_slicer pauses) only. The timeout is
+    charged only while the time slicer has not paused the program.
+    """
+    if max_output is None:
+        max_output = MAX_OUTPUT_BYTES
+    forward = text_output_callback(on_output)
+    chunks = {'stdout': [], 'stderr': []}
+    state = {'output_bytes': 0, 'truncated': False}
+
+    started = time.monotonic()
+    process = await asyncio.create_subprocess_exec(
+        *argv,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        cwd=cwd,
+        env=child_environment(),
+        start_new_session=True
+    )
+    supervisor.enter()
+    registered = time_slicer.register(process.pid)
+
+    async def read(stream, reader):
+        while not state['truncated']:
+            data = await reader.read(READ_CHUNK)
+            if not data:
+                return
+            state['output_bytes'] += len(data)
+            if state['output_bytes'] > max_output:
+                # Keep what fits under the cap and stop the program
+                data = data[:max(len(data) - (state['output_bytes'] - max_output), 0)]
+                state['truncated'] = True
+                _kill(process)
+            if data:
+                if forward is not None:
+                    forward(stream, data)
+                if capture or stream == 'stderr':
+                    chunks[stream].append(data)
+
+    async def supervise():
+        pumping = asyncio.gather(
+            _feed_input(process.stdin, (input_text or '').encode('utf-8')),
+            read('stdout', process.stdout),
+            read('stderr', process.stderr)
+        )
+        pumping.add_done_callback(_retrieve)
+        exiting = asyncio.ensure_future(_leader_exit(process))
+        try:
+            # The child may close its pipes and keep running, or exit and
+            # leave a background process holding them
+            done, _ = await asyncio.wait((exiting, pumping), return_when=asyncio.FIRST_COMPLETED)
+            if pumping in done:
+                pumping.result()
+            await exiting
+            time_slicer.unregister(registered)
+            _kill_session(process.pid)
+            try:
+                await asyncio.wait_for(asyncio.shield(pumping), LEADER_EXIT_GRACE)
+            except asyncio.TimeoutError:
+                # Something outside the session still holds the pipes; stop reading them
+                for fd in (1, 2):
+                    pipe = process._transport.get_pipe_transport(fd)
+                    if pipe is not None:
+                        pipe.close()
+            # Resolves once the pipes are closed
+            await process.wait()
+        finally:
+            for task in (exiting, pumping):
+                if not task.done():
+                    task.cancel()
+
+    timed_out = False
+    supervising = asyncio.ensure_future(supervise())
+    try:
+        while True:
+            # Time spent paused by the slicer isn't charged, so re-check after each wait
+            remaining = timeout - registered.charged()
+            if remaining <= 0:
+                timed_out = True
+                break
+            done, _ = await asyncio.wait((supervising,), timeout=remaining)
+            if done:
+                supervising.result()
+                break
+    finally:
+        if not supervising.done():
+            supervising.cancel()
+        # Resume a paused child before it is killed or reaped
+        time_slicer.unregister(registered)
+        if process.returncode is None:
+            _kill(process)
+            await process.wait()
+        supervisor.leave(timed_out, state['truncated'])
+
+    stdout = b''.join(chunks['stdout'])
+    stderr = b''.join(chunks['stderr'])
+    stats = stage_stats(time.monotonic() - started)
+    stats['paused_time'] = round(registered.paused_total, 6)
+    if timed_out:
+        error = subprocess.TimeoutExpired(argv, timeout, output=stdout, stderr=stderr)
+        error.stats = stats
+        raise error
+
+    return ProcessResult(
+        argv,
+        process.returncode,
+        stdout.decode('utf-8', errors='replace'),
+        stderr.decode('utf-8', errors='replace'),
+        output_truncated=state['truncated'],
+        output_bytes=state['output_bytes'],
+        stats=stats
+    )
+
+
+def _kill(process):
+    # The whole session goes, as in run_process
+    if process.returncode is None:
+        kill_group(process.pid)
+
+
+async def _leader_exit(process):
+    """Wait for the child itself to exit; process.wait() also waits for its pipes to close"""
+    try:
+        pidfd = os.pidfd_open(process.pid)
+    except (AttributeError, OSError):
+        # No pidfds, or already exited and reaped
+        while process.returncode is None:
+            await asyncio.sleep(LEADER_POLL_INTERVAL)
+        return
+    loop = asyncio.get_running_loop()
+    exited = loop.create_future()
+    loop.add_reader(pidfd, _settle_exit, exited)
+    try:
+        await exited
+    finally:
+        loop.remove_reader(pidfd)
+        os.close(pidfd)
+
+
+def _retrieve(future):
+    # Output pumping is cancelled when the run ends early; don't log that as unretrieved
+    if not future.cancelled():
+        future.exception()
+
+
+def _settle_exit(exited):
+    if not exited.done():
+        exited.set_result(None)
+
+
+def _kill_session(pid):
+    """
+    Kill what is left of an exited leader's session. The child watcher may
+    already have reaped the leader, but its pid stays reserved as the session
+    and group id while any member is alive, so killpg only reaches those.
+    """
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except OSError:
+        pass
+
+
+async def run_compiled_async(program, stdin=None, on_output=None, timeout=RUN_TIMEOUT):
+    """
+    run_compiled() as a coroutine. Programs with an argv run on the event
+    loop; zygote, JVM and interpreted programs run on the thread pool, so
+    on_output may be called from a pool thread.
+    """
+    result = {
+        'output': '',
+        'error': '',
+        'execution_time': 0.0,
+        'success': True,
+        'stages': {}
+    }
+
+    start_time = time.monotonic()
+    test_input = prepare_test_input(program.code) if stdin is None else stdin
+    try:
+        if program.argv is not None and program.interpreted is None:
+            process = await run_process_async(program.argv, test_input, timeout, cwd=program.work_dir,
+                                              on_output=on_output, capture=on_output is None)
+        else:
+            process = await in_thread(program.run, test_input, timeout, on_output)
+        record_run(result, process)
+    except subprocess.TimeoutExpired as e:
+        result['stages']['run'] = getattr(e, 'stats', None)
+        result['error'] = "Execution timeout - program took too long to run"
+    except Exception as e:
+        result['success'] = False
+        result['error'] = f'Execution error: {str(e)}'
+
+    result['execution_time'] = round(time.monotonic() - start_time, 3)
+    return result
+
+
+async def execute_async(language, code, on_output=None, stdin=None):
+    """
+    Compile on the thread pool, then run on the event loop. Returns the same
+    result dict as the synchronous executors, with both stages recorded.
+    """
+    start_time = time.monotonic()
+    compiling = asyncio.ensure_future(in_thread(compile_program, language, code))
+    try:
+        compiled, program = await asyncio.shield(compiling)
+    except asyncio.CancelledError:
+        # The compile thread can't be interrupted; close its program when it finishes
+        compiling.add_done_callback(_close_abandoned)
+        raise
+    if program is None:
+        return compiled
+
+    try:
+        result = await run_compiled_async(program, stdin, on_output)
+    finally:
+        # Scrubbing the workspace touches the filesystem
+        await in_thread(program.close)
+
+    for key in COMPILE_KEYS:
+        if key in compiled:
+            result[key] = compiled[key]
+    result['stages'] = dict(compiled['stages'], **result['stages'])
+    result['execution_time'] = round(time.monotonic() - start_time, 3)
+    return result
+
+
+def _close_abandoned(compiling):
+    if compiling.cancelled() or compiling.exception() is not None:
+        return
+    program = compiling.result()[1]
+    if program is not None:
+        blocking_pool.submit(program.close)
@@ -0,0 +1,2554 @@
+"""
+In-process interpreter for the teaching subset of C.
+
+Hosts without a C compiler run C submissions here instead of spawning a
+process. The subset covers what the course tasks use: char/short/int/long
+(signed and unsigned), float/double and bool; fixed, variable-length and
+multi-dimensional arrays, char arrays and string literals; pointers to
+variables and array elements; if/else, while, do-while, for, switch,
+break/continue/return; functions (with recursion and static locals);
+object-like #define; and printf/scanf plus common stdio.h, string.h,
+ctype.h, math.h and stdlib.h functions. struct, union, enum, typedef and
+goto are reported as unsupported.
+
+compile_c() parses the source once into Python closures, raising ParseError
+with a line and column. Program.run() executes main() under an instruction
+budget (statements, loop iterations and calls, COLUNN_INTERPRETER_STEPS), a
+memory cap on program storage (COLUNN_INTERPRETER_MEMORY bytes, counted as
+8 bytes per stored value), a call-depth limit and the usual output cap.
+Array indexes are bounds-checked, so out-of-range accesses fail the way a
+segmentation fault would instead of corrupting state.
+"""
+import codecs
+import math
+import os
+import random
+import re
+import struct
+import sys
+import time
+from functools import lru_cache
+
+from c_tokenizer import Token, tokenize_c
+from process_runner import MAX_OUTPUT_BYTES
+
+DEFAULT_STEP_BUDGET = 20_000_000
+DEFAULT_MEMORY_LIMIT = 128 * 1024 * 1024
+
+# Bytes charged per stored value (a Python list slot)
+CELL_BYTES = 8
+
+# Nested calls before a stack overflow; each C call uses a handful of Python frames
+MAX_CALL_DEPTH = 10000
+RECURSION_LIMIT = MAX_CALL_DEPTH * 25
+
+# Steps between wall-clock checks
+CHECK_INTERVAL = 4096
+
+# Statement results besides None (fall through)
+BREAK = 1
+CONTINUE = 2
+RETURN = 3
+
+# Exit statuses that mirror the signal a native run would die with
+SIGFPE_STATUS = -8
+SIGKILL_STATUS = -9
+SIGSEGV_STATUS = -11
+
+PREDEFINED_MACROS = {
+    'NULL': '0',
+    'EOF': '(-1)',
+    'true': '1',
+    'false': '0',
+    'CHAR_BIT': '8',
+    'CHAR_MAX': '127',
+    'CHAR_MIN': '(-128)',
+    'SHRT_MAX': '32767',
+    'SHRT_MIN': '(-32768)',
+    'INT_MAX': '2147483647',
+    'INT_MIN': '(-2147483647-1)',
+    'UINT_MAX': '4294967295u',
+    'LONG_MAX': '9223372036854775807l',
+    'LONG_MIN': '(-9223372036854775807l-1)',
+    'LLONG_MAX': '9223372036854775807ll',
+    'LLONG_MIN': '(-9223372036854775807ll-1)',
+    'RAND_MAX': '2147483647',
+    'EXIT_SUCCESS': '0',
+    'EXIT_FAILURE': '1',
+    'CLOCKS_PER_SEC': '1000000l',
+    'M_PI': '3.14159265358979323846',
+    'M_E': '2.7182818284590452354',
+    'stdin': '0',
+    'stdout': '1',
+    'stderr': '2'
+}
+
+TYPE_WORDS = {'void', 'char', 'short', 'int', 'long', 'float', 'double', 'signed', 'unsigned',
+              '_Bool', 'bool', 'size_t'}
+QUALIFIERS = {'const', 'volatile', 'register', 'auto', 'extern', 'inline', 'static'}
+UNSUPPORTED_KEYWORDS = {'struct', 'union', 'enum', 'typedef', 'goto'}
+
+ASSIGNMENT_OPERATORS = {'=', '+=', '-=', '*=', '/=', '%=', '<<=', '>>=', '&=', '|=', '^='}
+BINARY_PRECEDENCE = {
+    '||': 1, '&&': 2, '|': 3, '^': 4, '&': 5,
+    '==': 6, '!=': 6, '<': 7, '<=': 7, '>': 7, '>=': 7,
+    '<<': 8, '>>': 8, '+': 9, '-': 9, '*': 10, '/': 10, '%': 10
+}
+
+ESCAPES = {'n': 10, 't': 9, 'r': 13, '0': 0, 'a': 7, 'b': 8, 'f': 12, 'v': 11,
+           '\\': 92, "'": 39, '"': 34, '?': 63, 'e': 27}
+ESCAPE_PATTERN = re.compile(r'\\(x[0-9a-fA-F]+|[0-7]{1,3}|.)', re.DOTALL)
+
+PRINTF_SPEC = re.compile(rb'%([-+ #0]*)(\*|\d+)?(?:\.(\*|\d*))?(hh|h|ll|l|L|z|j|t)?([diouxXeEfFgGcsp%])')
+SCANF_SPEC = re.compile(rb'%(\*)?(\d+)?(hh|h|ll|l|L|z|j)?([diouxXeEfFgGcs%]|\[\^?\]?[^\]]*\])')
+
+SCANF_PATTERNS = {
+    'd': rb'[+-]?\d+',
+    'u': rb'[+-]?\d+',
+    'i': rb'[+-]?(?:0[xX][0-9a-fA-F]+|0[0-7]*|[1-9]\d*)',
+    'x': rb'[+-]?(?:0[xX])?[0-9a-fA-F]+',
+    'X': rb'[+-]?(?:0[xX])?[0-9a-fA-F]+',
+    'o': rb'[+-]?[0-7]+',
+    'f': rb'[+-]?(?:(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?|inf(?:inity)?|nan)',
+}
+WHITESPACE = b' \t\n\r\f\v'
+
+
+class InterpreterError(Exception):
+    """Base for errors raised while compiling or running a program"""
+
+    def __init__(self, message, line=None, column=None):
+        super().__init__(message)
+        self.message = message
+        self.line = line
+        self.column = column
+
+
+class ParseError(InterpreterError):
+    """The source is not valid C, or uses something outside the subset"""
+
+
+class ProgramError(InterpreterError):
+    """A runtime fault: out-of-bounds access, null pointer, division by zero"""
+
+    def __init__(self, message, line=None, status=SIGSEGV_STATUS):
+        super().__init__(message, line)
+        self.status = status
+
+
+class BudgetExceeded(InterpreterError):
+    """The instruction budget or the time limit ran out"""
+
+
+class MemoryLimitExceeded(InterpreterError):
+    """The program allocated more than the memory cap"""
+
+
+class OutputLimitExceeded(InterpreterError):
+    """The program wrote more than the output cap"""
+
+
+class ProgramExit(Exception):
+    """exit() was called"""
+
+    def __init__(self, status):
+        super().__init__(status)
+        self.status = status
+
+
+# --- Types -----------------------------------------------------------------
+
+class CType:
+    """A C type: 'int' (bits, signed), 'float' (bits), 'bool', 'void', 'ptr' or 'array'"""
+
+    __slots__ = ('kind', 'bits', 'signed', 'target', 'length')
+
+    def __init__(self, kind, bits=0, signed=True, target=None, length=None):
+        self.kind = kind
+        self.bits = bits
+        self.signed = signed
+        self.target = target
+        self.length = length
+
+    @property
+    def is_integer(self):
+        return self.kind in ('int', 'bool')
+
+    @property
+    def is_floating(self):
+        return self.kind == 'float'
+
+    @property
+    def is_arithmetic(self):
+        return self.kind in ('int', 'bool', 'float')
+
+    @property
+    def is_pointer(self):
+        return self.kind in ('ptr', 'array')
+
+    def element(self):
+        """Innermost element type of an array"""
+        ctype = self
+        while ctype.kind == 'array':
+            ctype = ctype.target
+        return ctype
+
+    def size(self):
+        """sizeof in bytes, or None for a variable-length array"""
+        if self.kind in ('int', 'float'):
+            return self.bits // 8
+        if self.kind == 'bool':
+            return 1
+        if self.kind == 'ptr':
+            return 8
+        if self.kind == 'array':
+            inner = self.target.size()
+            if self.length is None or inner is None:
+                return None
+            return self.length * inner
+        return 1
+
+    def __str__(self):
+        if self.kind == 'int':
+            names = {8: 'char', 16: 'short', 32: 'int', 64: 'long'}
+            name = names[self.bits]
+            return name if self.signed else f'unsigned {name}'
+        if self.kind == 'float':
+            return 'float' if self.bits == 32 else 'double'
+        if self.kind == 'ptr':
+            return f'{self.target} *'
+        if self.kind == 'array':
+            return f'{self.target}[{self.length if self.length is not None else ""}]'
+        return self.kind
+
+
+VOID = CType('void')
+BOOL = CType('bool', 8)
+CHAR = CType('int', 8)
+UCHAR = CType('int', 8, signed=False)
+SHORT = CType('int', 16)
+USHORT = CType('int', 16, signed=False)
+INT = CType('int', 32)
+UINT = CType('int', 32, signed=False)
+LONG = CType('int', 64)
+ULONG = CType('int', 64, signed=False)
+FLOAT = CType('float', 32)
+DOUBLE = CType('float', 64)
+CHAR_PTR = CType('ptr', target=CHAR)
+VOID_PTR = CType('ptr', target=VOID)
+
+
+def pointer_to(ctype):
+    return CType('ptr', target=ctype)
+
+
+def array_of(ctype, length):
+    return CType('array', target=ctype, length=length)
+
+
+def decay(ctype):
+    """Arrays used as values become pointers to their first element"""
+    if ctype.kind == 'array':
+        return pointer_to(ctype.target)
+    return ctype
+
+
+def arithmetic_type(left, right):
+    """The usual arithmetic conversions, simplified to double / long / int"""
+    if left.is_floating or right.is_floating:
+        return DOUBLE
+    bits = max(32, left.bits, right.bits)
+    unsigned = (left.kind == 'int' and not left.signed and left.bits >= bits
+                or right.kind == 'int' and not right.signed and right.bits >= bits)
+    return CType('int', bits, signed=not unsigned)
+
+
+def _float32(value):
+    try:
+        return struct.unpack('f', struct.pack('f', value))[0]
+    except OverflowError:
+        return math.copysign(math.inf, value)
+
+
+def _float_to_int(value):
+    if math.isnan(value) or math.isinf(value):
+        return 0
+    return int(value)
+
+
+def converter(ctype):
+    """Function converting a value for storage as ctype (C assignment semantics), or None"""
+    if ctype.kind == 'int':
+        mask = (1 << ctype.bits) - 1
+        if ctype.signed:
+            low = -(1 << (ctype.bits - 1))
+            high = (1 << (ctype.bits - 1)) - 1
+
+            def convert(value):
+                if type(value) is int:
+                    if low <= value <= high:
+                        return value
+                elif type(value) is float:
+                    value = _float_to_int(value)
+                else:
+                    raise ProgramError('pointer converted to an integer')
+                value &= mask
+                return value - mask - 1 if value > high else value
+        else:
+            def convert(value):
+                if type(value) is int:
+                    if 0 <= value <= mask:
+                        return value
+                elif type(value) is float:
+                    value = _float_to_int(value)
+                else:
+                    raise ProgramError('pointer converted to an integer')
+                return value & mask
+        return convert
+
+    if ctype.kind == 'bool':
+        return lambda value: 1 if value else 0
+
+    if ctype.kind == 'float':
+        def convert(value):
+            if type(value) is Pointer:
+                raise ProgramError('pointer converted to a floating-point value')
+            return float(value) if ctype.bits == 64 else _float32(float(value))
+        return convert
+
+    if ctype.kind == 'ptr':
+        return lambda value: value
+
+    return None
+
+
+def same_type(left, right):
+    return left.kind == right.kind and left.bits == right.bits and left.signed == right.signed
+
+
+def integer_bounds(ctype):
+    """Smallest and largest value of an integer type"""
+    if ctype.signed:
+        return -(1 << (ctype.bits - 1)), (1 << (ctype.bits - 1)) - 1
+    return 0, (1 << ctype.bits) - 1
+
+
+# Comparison closures from operand closures; C comparisons yield int 1 or 0
+COMPARISONS = {
+    '==': lambda lv, rv: lambda frame: 1 if lv(frame) == rv(frame) else 0,
+    '!=': lambda lv, rv: lambda frame: 1 if lv(frame) != rv(frame) else 0,
+    '<': lambda lv, rv: lambda frame: 1 if lv(frame) < rv(frame) else 0,
+    '<=': lambda lv, rv: lambda frame: 1 if lv(frame) <= rv(frame) else 0,
+    '>': lambda lv, rv: lambda frame: 1 if lv(frame) > rv(frame) else 0,
+    '>=': lambda lv, rv: lambda frame: 1 if lv(frame) >= rv(frame) else 0
+}
+
+
+def zero_value(ctype):
+    return 0.0 if ctype.element().is_floating else 0
+
+
+# --- Runtime values ----------------------------------------------------------
+
+class Pointer:
+    """
+    Address of a cell in a buffer (a Python list). inner holds the dimensions
+    of the pointed-to rows for pointers into multi-dimensional arrays.
+    """
+
+    __slots__ = ('buffer', 'offset', 'inner', 'stride')
+
+    def __init__(self, buffer, offset=0, inner=()):
+        self.buffer = buffer
+        self.offset = offset
+        self.inner = inner
+        self.stride = math.prod(inner) if inner else 1
+
+    def moved(self, count):
+        return Pointer(self.buffer, self.offset + count * self.stride, self.inner)
+
+    def __eq__(self, other):
+        return type(other) is Pointer and other.buffer is self.buffer and other.offset == self.offset
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def _distance(self, other):
+        if type(other) is not Pointer or other.buffer is not self.buffer:
+            raise ProgramError('comparison of pointers into different arrays')
+        return self.offset - other.offset
+
+    def __lt__(self, other):
+        return self._distance(other) < 0
+
+    def __le__(self, other):
+        return self._distance(other) <= 0
+
+    def __gt__(self, other):
+        return self._distance(other) > 0
+
+    def __ge__(self, other):
+        return self._distance(other) >= 0
+
+    __hash__ = None
+
+
+def _check_pointer(pointer, line):
+    if type(pointer) is not Pointer:
+        raise ProgramError('null or invalid pointer dereferenced', line)
+    return pointer
+
+
+def _signed_byte(byte):
+    return byte - 256 if byte > 127 else byte
+
+
+def read_string(pointer, line=None):
+    """The bytes of the NUL-terminated string at pointer"""
+    buffer = _check_pointer(pointer, line).buffer
+    start = pointer.offset
+    end = start
+    length = len(buffer)
+    while end < length and buffer[end] != 0:
+        end += 1
+    if end >= length:
+        raise ProgramError('string is not NUL-terminated', line)
+    return bytes(value & 0xFF for value in buffer[start:end])
+
+
+def write_string(pointer, data, line=None):
+    """Store data plus a NUL terminator at pointer"""
+    buffer = _check_pointer(pointer, line).buffer
+    start = pointer.offset
+    if start < 0 or start + len(data) >= len(buffer):
+        raise ProgramError('buffer overflow writing a string', line)
+    buffer[start:start + len(data)] = [_signed_byte(byte) for byte in data]
+    buffer[start + len(data)] = 0
+
+
+# --- Compiled program ------------------------------------------------------
+
+class Expr:
+    """A compiled expression: value(frame), its static type, and address(frame) for lvalues"""
+
+    __slots__ = ('value', 'ctype', 'address', 'literal', 'element_size', 'compute', 'slot')
+
+    def __init__(self, value, ctype, address=None, literal=None, element_size=None):
+        self.value = value
+        self.ctype = ctype
+        self.address = address
+        # Bytes of a string literal, for printf/scanf formats and char array initializers
+        self.literal = literal
+        # sizeof(T) factor of a malloc-style size argument
+        self.element_size = element_size
+        # compute(a, b) of a binary operator, reused by compound assignment
+        self.compute = None
+        # Frame slot of a local scalar variable, for the fast assignment paths
+        self.slot = None
+
+
+class Function:
+    """A user-defined function; body is None until its definition is parsed"""
+
+    def __init__(self, name, return_type, params, line):
+        self.name = name
+        self.return_type = return_type
+        self.params = params
+        self.line = line
+        self.body = None
+        self.slot_count = 0
+        self.has_arrays = False
+        self.param_slots = []
+        self.param_converters = []
+        self.return_converter = converter(return_type)
+
+
+class Symbol:
+    __slots__ = ('name', 'kind', 'ctype', 'slot')
+
+    def __init__(self, name, kind, ctype, slot):
+        self.name = name
+        self.kind = kind
+        self.ctype = ctype
+        self.slot = slot
+
+
+class Machine:
+    """State of one run: budget, memory, I/O and the global frame"""
+
+    def __init__(self, program, stdin, timeout, step_budget, memory_limit, max_output, on_output, capture):
+        self.steps = 0
+        self.budget = step_budget
+        self.limit = min(step_budget, CHECK_INTERVAL)
+        self.deadline = time.monotonic() + timeout
+        self.memory = 0
+        self.peak_memory = 0
+        self.memory_limit = memory_limit
+        self.depth = 0
+        self.retval = None
+        self.stdin = stdin.encode('utf-8')
+        self.stdin_position = 0
+        self.stdout = bytearray()
+        self.output_size = 0
+        self.capture = capture
+        self.max_output = max_output
+        self.on_output = on_output
+        self.decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.literals = {}
+        self.random = random.Random(1)
+        self.globals = [self] + [None] * program.global_slots
+
+    def check_budget(self):
+        """Called when steps passes limit: enforce the budget and the deadline"""
+        if self.steps > self.budget:
+            raise BudgetExceeded('instruction budget exceeded')
+        if time.monotonic() > self.deadline:
+            raise BudgetExceeded('time limit exceeded')
+        self.limit = min(self.budget, self.steps + CHECK_INTERVAL)
+
+    def allocate(self, cells, line=None):
+        self.memory += cells * CELL_BYTES
+        if self.memory > self.memory_limit:
+            raise MemoryLimitExceeded('memory limit exceeded', line)
+        self.peak_memory = max(self.peak_memory, self.memory)
+
+    def free(self, cells):
+        self.memory -= cells * CELL_BYTES
+
+    def literal(self, key, data):
+        """The buffer of a string literal; one per literal per run"""
+        pointer = self.literals.get(key)
+        if pointer is None:
+            pointer = Pointer([_signed_byte(byte) for byte in data] + [0])
+            self.literals[key] = pointer
+        return pointer
+
+    def write(self, data):
+        room = self.max_output - self.output_size
+        truncated = len(data) > room
+        if truncated:
+            data = data[:max(room, 0)]
+        self.output_size += len(data)
+        if self.capture:
+            self.stdout += data
+        if self.on_output is not None and data:
+            text = self.decoder.decode(data)
+            if text:
+                self.on_output('stdout', text)
+        if truncated:
+            raise OutputLimitExceeded('output limit exceeded')
+
+    def invoke(self, function, values, line=None):
+        if self.depth >= MAX_CALL_DEPTH:
+            raise ProgramError('stack overflow (recursion too deep)', line)
+        self.steps += 1
+        if self.steps > self.limit:
+            self.check_budget()
+
+        frame = [self] + [None] * function.slot_count
+        for slot, convert, value in zip(function.param_slots, function.param_converters, values):
+            frame[slot] = [convert(value) if convert else value]
+
+        self.depth += 1
+        try:
+            status = function.body(frame)
+        finally:
+            self.depth -= 1
+            if function.has_arrays:
+                # Local arrays live in the frame as Pointers; give their memory back
+                for storage in frame:
+                    if type(storage) is Pointer:
+                        self.free(len(storage.buffer))
+
+        if status == RETURN:
+            value = self.retval
+            self.retval = None
+            return value
+        return zero_value(function.return_type)
+
+
+class Program:
+    """A parsed C program; run() may be called any number of times, from any thread"""
+
+    def __init__(self, main, global_inits, global_slots):
+        self.main = main
+        self.global_inits = global_inits
+        self.global_slots = global_slots
+
+    def run(self, stdin='', timeout=5, on_output=None, capture=True, step_budget=None, memory_limit=None,
+            max_output=None):
+        """
+        Execute main(). Returns {'returncode', 'stdout', 'stderr',
+        'output_truncated', 'output_bytes', 'timed_out', 'stats'}; with
+        capture=False stdout only goes to on_output(stream, text).
+        """
+        machine = Machine(
+            self, stdin or '', timeout,
+            step_budget or int(os.environ.get('COLUNN_INTERPRETER_STEPS', DEFAULT_STEP_BUDGET)),
+            memory_limit or int(os.environ.get('COLUNN_INTERPRETER_MEMORY', DEFAULT_MEMORY_LIMIT)),
+            max_output or MAX_OUTPUT_BYTES,
+            on_output,
+            capture
+        )
+        if sys.getrecursionlimit() < RECURSION_LIMIT:
+            sys.setrecursionlimit(RECURSION_LIMIT)
+
+        started = time.monotonic()
+        cpu_started = time.thread_time()
+        returncode = 0
+        stderr = ''
+        timed_out = False
+        truncated = False
+
+        try:
+            for initialize in self.global_inits:
+                initialize(machine.globals)
+            args = []
+            if self.main.params:
+                argv = Pointer([machine.literal('argv0', b'./main'), 0])
+                args = [1, argv][:len(self.main.params)]
+            status = machine.invoke(self.main, args)
+            returncode = status & 0xFF if type(status) is int else 0
+        except ProgramExit as e:
+            returncode = e.status & 0xFF
+        except BudgetExceeded:
+            timed_out = True
+            returncode = SIGKILL_STATUS
+        except OutputLimitExceeded:
+            truncated = True
+            returncode = SIGKILL_STATUS
+        except MemoryLimitExceeded as e:
+            stderr = f'Memory limit exceeded{_at_line(e.line)}\n'
+            returncode = SIGKILL_STATUS
+        except ProgramError as e:
+            stderr = f'Runtime error{_at_line(e.line)}: {e.message}\n'
+            returncode = e.status
+        except RecursionError:
+            stderr = 'Runtime error: stack overflow (recursion too deep)\n'
+            returncode = SIGSEGV_STATUS
+        except (TypeError, ValueError, AttributeError, OverflowError) as e:
+            # Operations on values the subset has no meaning for, e.g. arithmetic on a NULL pointer
+            stderr = f'Runtime error: invalid operation ({e})\n'
+            returncode = SIGSEGV_STATUS
+
+        if machine.on_output is not None:
+            tail = machine.decoder.decode(b'', final=True)
+            if tail:
+                machine.on_output('stdout', tail)
+            if stderr:
+                machine.on_output('stderr', stderr)
+
+        return {
+            'returncode': returncode,
+            'stdout': bytes(machine.stdout).decode('utf-8', errors='replace'),
+            'stderr': stderr,
+            'output_truncated': truncated,
+            'output_bytes': machine.output_size + len(stderr),
+            'timed_out': timed_out,
+            'stats': {
+                'wall_time': round(time.monotonic() - started, 6),
+                'user_cpu': round(time.thread_time() - cpu_started, 6),
+                'steps': machine.steps,
+                'peak_memory_bytes': machine.peak_memory
+            }
+        }
+
+
+def _at_line(line):
+    return f' at line {line}' if line else ''
+
+
+# --- Library functions -----------------------------------------------------
+
+@lru_cache(maxsize=256)
+def _printf_segments(fmt):
+    """Split a printf format into literal bytes and (flags, width, precision, length, conversion)"""
+    segments = []
+    position = 0
+    for match in PRINTF_SPEC.finditer(fmt):
+        if match.start() > position:
+            segments.append(fmt[position:match.start()])
+        flags, width, precision, length, conversion = match.groups()
+        if conversion == b'%':
+            segments.append(b'%')
+        else:
+            segments.append((flags.decode(), width and width.decode(), None if precision is None
+                             else precision.decode(), (length or b'').decode(), conversion.decode()))
+        position = match.end()
+    if position < len(fmt):
+        segments.append(fmt[position:])
+    return segments
+
+
+def _integer_argument(value, bits, signed):
+    if type(value) is float:
+        value = _float_to_int(value)
+    elif type(value) is not int:
+        value = 0
+    mask = (1 << bits) - 1
+    value &= mask
+    if signed and value >> (bits - 1):
+        value -= mask + 1
+    return value
+
+
+def format_printf(fmt, args, line=None):
+    """Bytes printf would produce for format bytes fmt"""
+    out = []
+    index = 0
+    for segment in _printf_segments(fmt):
+        if type(segment) is bytes:
+            out.append(segment.decode('latin-1'))
+            continue
+        flags, width, precision, length, conversion = segment
+        if width == '*':
+            width = str(args[index] if index < len(args) else 0)
+            index += 1
+        if precision == '*':
+            precision = str(args[index] if index < len(args) else 0)
+            index += 1
+        value = args[index] if index < len(args) else 0
+        index += 1
+
+        bits = 64 if length in ('l', 'll', 'z', 'j', 't') else 16 if length == 'h' else 8 if length == 'hh' else 32
+        spec = '%' + flags.replace('#', '') if conversion == 'o' else '%' + flags
+        spec += width or ''
+        if precision is not None:
+            spec += '.' + (precision or '0')
+
+        if conversion in 'di':
+            text = (spec + 'd') % _integer_argument(value, bits, True)
+        elif conversion in 'uoxX':
+            number = _integer_argument(value, bits, False)
+            text = (spec + ('d' if conversion == 'u' else conversion)) % number
+            if conversion == 'o' and '#' in flags and not text.lstrip().startswith('0'):
+                text = text.replace(text.lstrip(), '0' + text.lstrip(), 1)
+        elif conversion in 'eEfFgG':
+            if type(value) is Pointer:
+                value = 0.0
+            text = (spec + conversion) % float(value)
+        elif conversion == 'c':
+            text = (spec + 'c') % chr(_integer_argument(value, 8, False))
+        elif conversion == 's':
+            text = (spec + 's') % read_string(value, line).decode('latin-1')
+        else:
+            # %p: an address-like number that is stable for the pointer
+            address = 0 if type(value) is not Pointer else 0x7ffc0000 + id(value.buffer) % 0x10000 * 64 + value.offset
+            text = (spec + 's') % ('(nil)' if not address else hex(address))
+        out.append(text)
+    return ''.join(out).encode('latin-1')
+
+
+def _skip_whitespace(data, position):
+    while position < len(data) and data[position] in WHITESPACE:
+        position += 1
+    return position
+
+
+def _store_scanned(pointer, value, line):
+    if type(pointer) is not Pointer:
+        raise ProgramError("scanf argument is not a pointer (missing '&'?)", line)
+    buffer = pointer.buffer
+    if not 0 <= pointer.offset < len(buffer):
+        raise ProgramError('scanf target out of bounds', line)
+    buffer[pointer.offset] = value
+
+
+def scan_input(machine, fmt, targets, line):
+    """scanf: parse stdin per fmt into targets; returns the number assigned or EOF"""
+    data = machine.stdin
+    position = machine.stdin_position
+    assigned = 0
+    target_index = 0
+    index = 0
+    failed_on_eof = False
+
+    while index < len(fmt):
+        char = fmt[index]
+        if char in WHITESPACE:
+            position = _skip_whitespace(data, position)
+            index += 1
+            continue
+        if char != 0x25:
+            if position < len(data) and data[position] == char:
+                position += 1
+                index += 1
+                continue
+            failed_on_eof = position >= len(data)
+            break
+
+        match = SCANF_SPEC.match(fmt, index)
+        if not match:
+            break
+        index = match.end()
+        suppress, width, length, conversion = match.groups()
+        conversion = conversion.decode()
+        width = int(width) if width else None
+
+        if conversion not in ('c', '%') and not conversion.startswith('['):
+            position = _skip_whitespace(data, position)
+        if position >= len(data):
+            failed_on_eof = True
+            break
+        limit = len(data) if width is None else position + width
+
+        if conversion == '%':
+            if data[position] != 0x25:
+                break
+            position += 1
+            continue
+
+        if conversion == 'c':
+            count = width or 1
+            chunk = data[position:position + count]
+            if len(chunk) < count:
+                failed_on_eof = True
+                break
+            position += count
+            if not suppress:
+                pointer = _check_pointer(targets[target_index] if target_index < len(targets) else None, line)
+                for offset, byte in enumerate(chunk):
+                    _store_scanned(Pointer(pointer.buffer, pointer.offset + offset), _signed_byte(byte), line)
+        elif conversion == 's' or conversion.startswith('['):
+            if conversion == 's':
+                pattern = rb'[^ \t\n\r\f\v]+'
+            else:
+                # %[...]: a scanset; ranges like a-z pass through, other metacharacters are escaped
+                negate = conversion.startswith('[^')
+                members = conversion[2 if negate else 1:-1]
+                members = members.replace('\\', '\\\\').replace(']', '\\]').replace('[', '\\[')
+                pattern = ('[^' if negate else '[').encode() + members.encode('latin-1') + b']+'
+            found = re.compile(pattern).match(data, position, limit)
+            if not found:
+                break
+            position = found.end()
+            if not suppress:
+                target = targets[target_index] if target_index < len(targets) else None
+                write_string(target, found.group(), line)
+        else:
+            key = 'f' if conversion in 'eEfgG' else conversion
+            found = re.compile(SCANF_PATTERNS[key], re.IGNORECASE).match(data, position, limit)
+            if not found:
+                break
+            position = found.end()
+            text = found.group().decode()
+            if not suppress:
+                target = targets[target_index] if target_index < len(targets) else None
+                if key == 'f':
+                    value = float(text)
+                    value = value if length in (b'l', b'L') else _float32(value)
+                else:
+                    base = {'x': 16, 'X': 16, 'o': 8, 'i': 0}.get(conversion, 10)
+                    value = int(text, base) if base != 0 else int(text.replace('0', '0o', 1)
+                                                                 if re.fullmatch(r'[+-]?0[0-7]+', text) else text, 0)
+                    bits = 64 if length in (b'l', b'll', b'z', b'j') else 16 if length == b'h' else \
+                        8 if length == b'hh' else 32
+                    value = _integer_argument(value, bits, conversion in 'di')
+                _store_scanned(target, value, line)
+
+        if not suppress:
+            target_index += 1
+            assigned += 1
+
+    machine.stdin_position = position
+    if assigned == 0 and failed_on_eof:
+        return -1
+    return assigned
+
+
+def _library():
+    """name -> (implementation(machine, args, line), return type, argument count or None)"""
+
+    def printf(machine, args, line):
+        data = format_printf(read_string(args[0], line), args[1:], line)
+        machine.write(data)
+        return len(data)
+
+    def puts(machine, args, line):
+        machine.write(read_string(args[0], line) + b'\n')
+        return 1
+
+    def putchar(machine, args, line):
+        value = _integer_argument(args[0], 8, False)
+        machine.write(bytes([value]))
+        return value
+
+    def getchar(machine, args, line):
+        if machine.stdin_position >= len(machine.stdin):
+            return -1
+        machine.stdin_position += 1
+        return machine.stdin[machine.stdin_position - 1]
+
+    def scanf(machine, args, line):
+        return scan_input(machine, read_string(args[0], line), args[1:], line)
+
+    def fgets(machine, args, line):
+        size = args[1]
+        data = machine.stdin
+        start = machine.stdin_position
+        if start >= len(data) or size <= 1:
+            return 0
+        end = data.find(b'\n', start, start + size - 1)
+        end = min(start + size - 1, len(data)) if end < 0 else end + 1
+        write_string(args[0], data[start:end], line)
+        machine.stdin_position = end
+        return args[0]
+
+    def strlen(machine, args, line):
+        return len(read_string(args[0], line))
+
+    def strcpy(machine, args, line):
+        write_string(args[0], read_string(args[1], line), line)
+        return args[0]
+
+    def strncpy(machine, args, line):
+        data = read_string(args[1], line)[:args[2]]
+        pointer = _check_pointer(args[0], line)
+        padded = data + b'\0' * (args[2] - len(data))
+        if pointer.offset + len(padded) > len(pointer.buffer):
+            raise ProgramError('buffer overflow in strncpy', line)
+        pointer.buffer[pointer.offset:pointer.offset + len(padded)] = [_signed_byte(byte) for byte in padded]
+        return args[0]
+
+    def strcat(machine, args, line):
+        existing = read_string(args[0], line)
+        write_string(args[0].moved(len(existing)), read_string(args[1], line), line)
+        return args[0]
+
+    def strncat(machine, args, line):
+        existing = read_string(args[0], line)
+        write_string(args[0].moved(len(existing)), read_string(args[1], line)[:args[2]], line)
+        return args[0]
+
+    def compare(left, right):
+        return (left > right) - (left < right)
+
+    def strcmp(machine, args, line):
+        return compare(read_string(args[0], line), read_string(args[1], line))
+
+    def strncmp(machine, args, line):
+        return compare(read_string(args[0], line)[:args[2]], read_string(args[1], line)[:args[2]])
+
+    def strchr(machine, args, line):
+        data = read_string(args[0], line)
+        found = data.find(bytes([args[1] & 0xFF])) if args[1] & 0xFF else len(data)
+        return 0 if found < 0 else args[0].moved(found)
+
+    def strstr(machine, args, line):
+        found = read_string(args[0], line).find(read_string(args[1], line))
+        return 0 if found < 0 else args[0].moved(found)
+
+    def memset(machine, args, line):
+        pointer = _check_pointer(args[0], line)
+        if pointer.offset + args[2] > len(pointer.buffer):
+            # Byte counts over-cover multi-byte elements; clamp to the buffer
+            count = len(pointer.buffer) - pointer.offset
+        else:
+            count = args[2]
+        fill = _signed_byte(args[1] & 0xFF)
+        value = 0.0 if pointer.buffer and type(pointer.buffer[0]) is float and fill == 0 else fill
+        pointer.buffer[pointer.offset:pointer.offset + count] = [value] * count
+        return args[0]
+
+    def allocate(machine, cells, line):
+        if cells < 0:
+            return 0
+        machine.allocate(cells, line)
+        return Pointer([0] * cells)
+
+    def malloc(machine, args, line):
+        return allocate(machine, args[0], line)
+
+    def calloc(machine, args, line):
+        return allocate(machine, args[0] * max(args[1], 1), line)
+
+    def realloc(machine, args, line):
+        pointer = allocate(machine, args[1], line)
+        if type(args[0]) is Pointer and pointer:
+            old = args[0].buffer[args[0].offset:]
+            pointer.buffer[:min(len(old), len(pointer.buffer))] = old[:len(pointer.buffer)]
+            machine.free(len(args[0].buffer))
+        return pointer
+
+    def free(machine, args, line):
+        if type(args[0]) is Pointer:
+            machine.free(len(args[0].buffer))
+        return 0
+
+    def exit_program(machine, args, line):
+        raise ProgramExit(_integer_argument(args[0], 32, True))
+
+    def atoi(machine, args, line):
+        found = re.match(rb'\s*([+-]?\d+)', read_string(args[0], line))
+        return _integer_argument(int(found.group(1)), 32, True) if found else 0
+
+    def atof(machine, args, line):
+        found = re.match(rb'\s*' + SCANF_PATTERNS['f'], read_string(args[0], line), re.IGNORECASE)
+        return float(found.group().strip()) if found else 0.0
+
+    def rand(machine, args, line):
+        return machine.random.randrange(2147483648)
+
+    def srand(machine, args, line):
+        machine.random.seed(args[0])
+        return 0
+
+    def current_time(machine, args, line):
+        return int(time.time())
+
+    def clock(machine, args, line):
+        return int(time.thread_time() * 1000000)
+
+    def math_function(function):
+        def call(machine, args, line):
+            try:
+                return float(function(*(float(value) for value in args)))
+            except (ValueError, ZeroDivisionError):
+                return math.nan
+            except OverflowError:
+                return math.inf
+        return call
+
+    def character_test(test):
+        def call(machine, args, line):
+            value = args[0]
+            return 1 if 0 <= value < 128 and test(chr(value)) else 0
+        return call
+
+    def toupper(machine, args, line):
+        value = args[0]
+        return value - 32 if 97 <= value <= 122 else value
+
+    def tolower(machine, args, line):
+        value = args[0]
+        return value + 32 if 65 <= value <= 90 else value
+
+    def round_half_away(value):
+        return math.floor(value + 0.5) if value >= 0 else math.ceil(value - 0.5)
+
+    library = {
+        'printf': (printf, INT, None),
+        'puts': (puts, INT, 1),
+        'putchar': (putchar, INT, 1),
+        # Output is written through unbuffered
+        'fflush': (lambda machine, args, line: 0, INT, 1),
+        'getchar': (getchar, INT, 0),
+        'scanf': (scanf, INT, None),
+        'fgets': (fgets, CHAR_PTR, 3),
+        'strlen': (strlen, ULONG, 1),
+        'strcpy': (strcpy, CHAR_PTR, 2),
+        'strncpy': (strncpy, CHAR_PTR, 3),
+        'strcat': (strcat, CHAR_PTR, 2),
+        'strncat': (strncat, CHAR_PTR, 3),
+        'strcmp': (strcmp, INT, 2),
+        'strncmp': (strncmp, INT, 3),
+        'strchr': (strchr, CHAR_PTR, 2),
+        'strstr': (strstr, CHAR_PTR, 2),
+        'memset': (memset, VOID_PTR, 3),
+        'malloc': (malloc, VOID_PTR, 1),
+        'calloc': (calloc, VOID_PTR, 2),
+        'realloc': (realloc, VOID_PTR, 2),
+        'free': (free, VOID, 1),
+        'exit': (exit_program, VOID, 1),
+        'atoi': (atoi, INT, 1),
+        'atol': (atoi, LONG, 1),
+        'atof': (atof, DOUBLE, 1),
+        'abs': (lambda machine, args, line: abs(args[0]), INT, 1),
+        'labs': (lambda machine, args, line: abs(args[0]), LONG, 1),
+        'llabs': (lambda machine, args, line: abs(args[0]), LONG, 1),
+        'rand': (rand, INT, 0),
+        'srand': (srand, VOID, 1),
+        'time': (current_time, LONG, 1),
+        'clock': (clock, LONG, 0),
+        'toupper': (toupper, INT, 1),
+        'tolower': (tolower, INT, 1),
+        'isdigit': (character_test(str.isdigit), INT, 1),
+        'isalpha': (character_test(str.isalpha), INT, 1),
+        'isalnum': (character_test(str.isalnum), INT, 1),
+        'isspace': (character_test(lambda char: char in ' \t\n\r\f\v'), INT, 1),
+        'isupper': (character_test(str.isupper), INT, 1),
+        'islower': (character_test(str.islower), INT, 1),
+        'ispunct': (character_test(lambda char: char.isprintable() and not char.isalnum()
+                                   and char != ' '), INT, 1),
+        'fabs': (math_function(math.fabs), DOUBLE, 1),
+        'sqrt': (math_function(math.sqrt), DOUBLE, 1),
+        'pow': (math_function(math.pow), DOUBLE, 2),
+        'floor': (math_function(math.floor), DOUBLE, 1),
+        'ceil': (math_function(math.ceil), DOUBLE, 1),
+        'round': (math_function(round_half_away), DOUBLE, 1),
+        'trunc': (math_function(math.trunc), DOUBLE, 1),
+        'fmod': (math_function(math.fmod), DOUBLE, 2),
+        'sin': (math_function(math.sin), DOUBLE, 1),
+        'cos': (math_function(math.cos), DOUBLE, 1),
+        'tan': (math_function(math.tan), DOUBLE, 1),
+        'asin': (math_function(math.asin), DOUBLE, 1),
+        'acos': (math_function(math.acos), DOUBLE, 1),
+        'atan': (math_function(math.atan), DOUBLE, 1),
+        'atan2': (math_function(math.atan2), DOUBLE, 2),
+        'exp': (math_function(math.exp), DOUBLE, 1),
+        'log': (math_function(math.log), DOUBLE, 1),
+        'log10': (math_function(math.log10), DOUBLE, 1),
+        'log2': (math_function(math.log2), DOUBLE, 1),
+        'hypot': (math_function(math.hypot), DOUBLE, 2),
+        'fmax': (math_function(max), DOUBLE, 2),
+        'fmin': (math_function(min), DOUBLE, 2)
+    }
+    return library
+
+
+LIBRARY = _library()
+
+
+# --- Parser / compiler -----------------------------------------------------
+
+def _decode_literal(text, line, column):
+    """Bytes of a string or char literal body (without quotes)"""
+    out = bytearray()
+    position = 0
+    for match in ESCAPE_PATTERN.finditer(text):
+        out += text[position:match.start()].encode('utf-8')
+        escape = match.group(1)
+        if escape[0] == 'x':
+            out.append(int(escape[1:], 16) & 0xFF)
+        elif escape[0] in '01234567':
+            out.append(int(escape, 8) & 0xFF)
+        elif escape in ESCAPES:
+            out.append(ESCAPES[escape])
+        else:
+            raise ParseError(f"unknown escape sequence: '\\{escape}'", line, column)
+        position = match.end()
+    out += text[position:].encode('utf-8')
+    return bytes(out)
+
+
+def _integer_literal(text, line, column):
+    """Value and type of an integer constant"""
+    lowered = text.lower()
+    digits = lowered.rstrip('ul')
+    suffix = lowered[len(digits):]
+    try:
+        if digits.startswith('0x'):
+            value = int(digits, 16)
+        elif digits.startswith('0b'):
+            value = int(digits, 2)
+        elif len(digits) > 1 and digits.startswith('0'):
+            value = int(digits, 8)
+        else:
+            value = int(digits)
+    except ValueError:
+        raise ParseError(f"invalid suffix or digits in integer constant '{text}'", line, column)
+    is_long = 'l' in suffix or value > 0x7FFFFFFF
+    unsigned = 'u' in suffix
+    return value, CType('int', 64 if is_long else 32, signed=not unsigned)
+
+
+class Parser:
+    """Recursive-descent parser that compiles straight to closures"""
+
+    def __init__(self, code):
+        source = tokenize_c(code)
+        if source.errors:
+            line, column, message = source.errors[0]
+            raise ParseError(message, line, column)
+        self.tokens = self._preprocess(source.tokens)
+        self.position = 0
+        self.functions = {}
+        self.globals = {}
+        self.global_slots = 0
+        self.global_inits = []
+        self.scopes = []
+        self.function = None
+        self.slot_count = 0
+        self.loop_depth = 0
+        self.switch_depth = 0
+        self.literal_count = 0
+        self.pending_calls = []
+
+    # Preprocessing
+
+    def _preprocess(self, tokens):
+        macros = {name: None for name in PREDEFINED_MACROS}
+        expanded = []
+        for token in tokens:
+            if token.kind == 'directive':
+                self._directive(token, macros)
+            elif token.kind == 'identifier' and token.text in macros:
+                expanded.extend(self._expand(token, macros, set()))
+            else:
+                expanded.append(token)
+        expanded.append(Token('eof', '', tokens[-1].line if tokens else 1, 0))
+        return expanded
+
+    def _directive(self, token, macros):
+        match = re.match(r'#\s*(\w*)\s*(.*)', token.text, re.DOTALL)
+        name, rest = match.group(1), match.group(2).replace('\\\n', ' ')
+        if name in ('include', 'pragma', ''):
+            return
+        if name == 'define':
+            definition = re.match(r'([A-Za-z_]\w*)(\()?\s*(.*)', rest, re.DOTALL)
+            if not definition:
+                raise ParseError('macro names must be identifiers', token.line, token.column)
+            if definition.group(2):
+                raise ParseError('function-like macros are not supported by the interpreter',
+                                 token.line, token.column)
+            body = tokenize_c(definition.group(3))
+            macros[definition.group(1)] = [Token(item.kind, item.text, token.line, token.column)
+                                           for item in body.tokens]
+            return
+        if name == 'undef':
+            macros.pop(rest.strip(), None)
+            return
+        raise ParseError(f"preprocessor directive '#{name}' is not supported by the interpreter",
+                         token.line, token.column)
+
+    def _expand(self, token, macros, active):
+        body = macros[token.text]
+        if body is None:
+            body = tokenize_c(PREDEFINED_MACROS[token.text]).tokens
+        out = []
+        for item in body:
+            item = Token(item.kind, item.text, token.line, token.column)
+            if item.kind == 'identifier' and item.text in macros and item.text not in active:
+                out.extend(self._expand(item, macros, active | {token.text}))
+            else:
+                out.append(item)
+        return out
+
+    # Token helpers
+
+    def peek(self, offset=0):
+        return self.tokens[min(self.position + offset, len(self.tokens) - 1)]
+
+    def advance(self):
+        token = self.tokens[self.position]
+        if token.kind != 'eof':
+            self.position += 1
+        return token
+
+    def accept(self, text):
+        token = self.peek()
+        if token.text == text and token.kind in ('punct', 'identifier'):
+            self.position += 1
+            return True
+        return False
+
+    def expect(self, text):
+        token = self.peek()
+        if token.text != text or token.kind not in ('punct', 'identifier'):
+            self.error(f"expected '{text}' before {self.describe(token)}", token)
+        self.position += 1
+        return token
+
+    def describe(self, token):
+        return 'end of input' if token.kind == 'eof' else f"'{token.text}'"
+
+    def error(self, message, token=None):
+        token = token or self.peek()
+        raise ParseError(message, token.line, token.column)
+
+    def expect_identifier(self):
+        token = self.peek()
+        if token.kind != 'identifier':
+            self.error(f'expected identifier before {self.describe(token)}', token)
+        self.position += 1
+        return token
+
+    # Scopes
+
+    def lookup(self, name):
+        for scope in reversed(self.scopes):
+            if name in scope:
+                return scope[name]
+        return self.globals.get(name)
+
+    def new_slot(self):
+        self.slot_count += 1
+        return self.slot_count
+
+    def declare(self, name, ctype, token, static=False):
+        if self.function is None or static:
+            self.global_slots += 1
+            symbol = Symbol(name, 'global', ctype, self.global_slots)
+        else:
+            symbol = Symbol(name, 'local', ctype, self.new_slot())
+        scope = self.scopes[-1] if self.function is not None else self.globals
+        if name in scope and self.function is not None:
+            self.error(f"redeclaration of '{name}'", token)
+        scope[name] = symbol
+        return symbol
+
+    # Types
+
+    def at_type(self, offset=0):
+        token = self.peek(offset)
+        return token.kind == 'identifier' and (token.text in TYPE_WORDS or token.text in QUALIFIERS
+                                               or token.text in UNSUPPORTED_KEYWORDS)
+
+    def parse_specifiers(self):
+        """Base type plus whether 'static' was given"""
+        words = []
+        static = False
+        while True:
+            token = self.peek()
+            if token.kind != 'identifier':
+                break
+            if token.text in UNSUPPORTED_KEYWORDS:
+                self.error(f"'{token.text}' is not supported by the interpreter", token)
+            if token.text in QUALIFIERS:
+                static = static or token.text == 'static'
+            elif token.text in TYPE_WORDS:
+                words.append(token.text)
+            else:
+                break
+            self.position += 1
+        if not words:
+            self.error(f'expected a type before {self.describe(self.peek())}')
+
+        unsigned = 'unsigned' in words
+        if 'void' in words:
+            return VOID, static
+        if '_Bool' in words or 'bool' in words:
+            return BOOL, static
+        if 'size_t' in words:
+            return ULONG, static
+        if 'float' in words:
+            return FLOAT, static
+        if 'double' in words:
+            return DOUBLE, static
+        if 'char' in words:
+            return (UCHAR if unsigned else CHAR), static
+        if 'short' in words:
+            return (USHORT if unsigned else SHORT), static
+        if 'long' in words:
+            return (ULONG if unsigned else LONG), static
+        return (UINT if unsigned else INT), static
+
+    def parse_pointers(self, ctype):
+        while self.accept('*'):
+            while self.peek().text in ('const', 'volatile'):
+                self.advance()
+            ctype = pointer_to(ctype)
+        return ctype
+
+    def parse_abstract_type(self):
+        """A type name as used in casts and sizeof"""
+        base, _ = self.parse_specifiers()
+        ctype = self.parse_pointers(base)
+        while self.accept('['):
+            length = self.constant(self.parse_expression()) if self.peek().text != ']' else None
+            self.expect(']')
+            ctype = array_of(ctype, length)
+        return ctype
+
+    def constant(self, expr):
+        """Fold a constant expression at compile time, or None"""
+        try:
+            value = expr.value([None])
+        except Exception:
+            return None
+        return value if type(value) in (int, float) else None
+
+    # Top level
+
+    def parse_program(self):
+        self.scopes = []
+        while self.peek().kind != 'eof':
+            if self.accept(';'):
+                continue
+            self.parse_external()
+
+        for function, token in self.pending_calls:
+            if function.body is None:
+                self.error(f"undefined reference to '{function.name}'", token)
+        main = self.functions.get('main')
+        if main is None or main.body is None:
+            raise ParseError("undefined reference to 'main'", 1, 1)
+        return Program(main, self.global_inits, self.global_slots)
+
+    def parse_external(self):
+        base, static = self.parse_specifiers()
+        while True:
+            ctype = self.parse_pointers(base)
+            name_token = self.expect_identifier()
+            if self.accept('('):
+                params = self.parse_parameters()
+                function = self.declare_function(name_token, ctype, params)
+                if self.peek().text == '{':
+                    if function.body is not None:
+                        self.error(f"redefinition of '{name_token.text}'", name_token)
+                    self.parse_function_body(function, params)
+                    return
+            else:
+                self.parse_declarator_rest(name_token, ctype, static)
+            if not self.accept(','):
+                break
+        self.expect_semicolon()
+
+    def parse_parameters(self):
+        params = []
+        if self.accept(')'):
+            return None
+        if self.peek().text == 'void' and self.peek(1).text == ')':
+            self.advance()
+            self.expect(')')
+            return params
+        while True:
+            base, _ = self.parse_specifiers()
+            ctype = self.parse_pointers(base)
+            name = self.expect_identifier() if self.peek().kind == 'identifier' else None
+            dims = []
+            while self.accept('['):
+                # Bounds may name earlier parameters (int m[rows][cols]); rows
+                # carry their runtime dimensions, so the bound is only skipped
+                while self.peek().text != ']' and self.peek().kind != 'eof':
+                    self.advance()
+                self.expect(']')
+                dims.append(None)
+            for length in reversed(dims[1:]):
+                ctype = array_of(ctype, length)
+            if dims:
+                # Array parameters are pointers to their first element
+                ctype = pointer_to(ctype)
+            params.append((name, ctype))
+            if not self.accept(','):
+                break
+        self.expect(')')
+        return params
+
+    def declare_function(self, name_token, return_type, params):
+        name = name_token.text
+        if name in LIBRARY:
+            function = self.functions.get(name)
+            if function is None:
+                # A prototype of a library function (e.g. written out instead of #include)
+                return Function(name, return_type, params, name_token.line)
+        function = self.functions.get(name)
+        if function is None:
+            function = Function(name, return_type, params, name_token.line)
+            self.functions[name] = function
+        elif params is not None:
+            function.params = params
+        return function
+
+    def parse_function_body(self, function, params):
+        self.function = function
+        self.slot_count = 0
+        self.scopes = [{}]
+        function.params = params or []
+        function.param_slots = []
+        function.param_converters = []
+        for name, ctype in function.params:
+            if name is None:
+                self.error('parameter name omitted')
+            symbol = self.declare(name.text, ctype, name)
+            function.param_slots.append(symbol.slot)
+            function.param_converters.append(converter(ctype))
+        function.body = self.parse_block(new_scope=False)
+        function.slot_count = self.slot_count
+        self.function = None
+        self.scopes = []
+
+    # Declarations
+
+    def parse_declaration(self):
+        """A local declaration statement; returns its statement closure"""
+        base, static = self.parse_specifiers()
+        statements = []
+        while True:
+            ctype = self.parse_pointers(base)
+            name_token = self.expect_identifier()
+            if self.peek().text == '(':
+                self.error('nested function declarations are not supported', name_token)
+            statement = self.parse_declarator_rest(name_token, ctype, static)
+            if statement is not None:
+                statements.append(statement)
+            if not self.accept(','):
+                break
+        self.expect_semicolon()
+        if len(statements) == 1:
+            return statements[0]
+
+        def declarations(frame):
+            for statement in statements:
+                statement(frame)
+        return declarations
+
+    def parse_declarator_rest(self, name_token, ctype, static):
+        """
+        Array suffixes and initializer for a declared name. Globals and static
+        locals are initialized once at startup; locals return a statement.
+        """
+        length_exprs = []
+        while self.accept('['):
+            if self.peek().text == ']':
+                length_exprs.append(None)
+            else:
+                length_expr = self.parse_expression()
+                if not length_expr.ctype.is_integer:
+                    self.error(f"size of array '{name_token.text}' has non-integer type", name_token)
+                length_exprs.append(length_expr)
+            self.expect(']')
+        if ctype is VOID and not length_exprs:
+            self.error(f"variable '{name_token.text}' declared void", name_token)
+
+        initializer = None
+        if self.accept('='):
+            initializer = self.parse_initializer()
+
+        if length_exprs:
+            return self.declare_array(name_token, ctype, length_exprs, initializer, static)
+
+        symbol = self.declare(name_token.text, ctype, name_token, static)
+        convert = converter(ctype)
+        slot = symbol.slot
+        zero = zero_value(ctype)
+        if initializer is not None:
+            if type(initializer) is list:
+                if len(initializer) != 1 or type(initializer[0]) is list:
+                    self.error('braces around scalar initializer', name_token)
+                initializer = initializer[0]
+            self.check_assignable(ctype, initializer.ctype, name_token)
+            value = initializer.value
+
+            def declare_scalar(frame):
+                frame[slot] = [convert(value(frame))]
+        else:
+            def declare_scalar(frame):
+                frame[slot] = [zero]
+
+        if symbol.kind == 'global':
+            self.global_inits.append(declare_scalar)
+            return None
+        return declare_scalar
+
+    def parse_initializer(self):
+        """An Expr, or a (nested) list of them for a braced initializer"""
+        if self.accept('{'):
+            items = []
+            while not self.accept('}'):
+                items.append(self.parse_initializer())
+                if not self.accept(','):
+                    self.expect('}')
+                    break
+            return items
+        return self.parse_assignment()
+
+    def declare_array(self, name_token, element_type, length_exprs, initializer, static):
+        lengths = [None if expr is None else self.constant(expr) for expr in length_exprs]
+        if None in lengths[1:]:
+            if any(expr is None for expr in length_exprs[1:]):
+                self.error(f"array type of '{name_token.text}' has incomplete element type", name_token)
+        if initializer is not None and any(length is None and expr is not None
+                                           for length, expr in zip(lengths, length_exprs)):
+            self.error('variable-sized object may not be initialized', name_token)
+
+        inner = tuple(lengths[1:])
+        # Only initialized (hence fixed-size) arrays need the row stride
+        stride = math.prod(inner) if None not in inner else 1
+        is_char = element_type.kind == 'int' and element_type.bits == 8
+        assignments = []
+        if initializer is not None:
+            if type(initializer) is not list:
+                if not (is_char and initializer.literal is not None and len(lengths) == 1):
+                    self.error('array initializer must be a braced list', name_token)
+                initializer = [initializer]
+                string_init = True
+            else:
+                string_init = False
+            if length_exprs[0] is None:
+                lengths[0] = 1 << 62
+            self.flatten_initializer(tuple(lengths), initializer, 0, assignments, element_type,
+                                     name_token, string_init)
+            if length_exprs[0] is None:
+                used = max((index + (len(item.literal) + 1 if kind == 'string' else 1)
+                            for index, kind, item in assignments), default=0)
+                lengths[0] = -(-used // stride)
+        elif length_exprs[0] is None:
+            self.error(f"array size missing in '{name_token.text}'", name_token)
+
+        ctype = element_type
+        for length in reversed(lengths):
+            ctype = array_of(ctype, length)
+        symbol = self.declare(name_token.text, ctype, name_token, static)
+        slot = symbol.slot
+        if symbol.kind == 'local':
+            self.function.has_arrays = True
+
+        zero = zero_value(element_type)
+        convert = converter(element_type)
+        line = name_token.line
+        first_length = length_exprs[0].value if lengths[0] is None else None
+        row_lengths = [expr.value if length is None else (lambda frame, length=length: length)
+                       for expr, length in zip(length_exprs[1:], lengths[1:])]
+        fixed_cells = None if lengths[0] is None or None in lengths else math.prod(lengths)
+
+        def declare(frame):
+            machine = frame[0]
+            if fixed_cells is not None:
+                cells = fixed_cells
+                dims = inner
+            else:
+                dims = tuple(length(frame) for length in row_lengths)
+                count = lengths[0] if first_length is None else first_length(frame)
+                if count <= 0 or any(dim <= 0 for dim in dims):
+                    raise ProgramError(f"size of array '{name_token.text}' is not positive", line)
+                cells = count * (math.prod(dims) if dims else 1)
+            old = frame[slot]
+            if type(old) is Pointer:
+                machine.free(len(old.buffer))
+            machine.allocate(cells, line)
+            buffer = [zero] * cells
+            for index, kind, item in assignments:
+                if kind == 'string':
+                    data = item.literal
+                    room = min(len(data) + 1, stride if len(lengths) > 1 else cells - index)
+                    buffer[index:index + room] = [_signed_byte(byte) for byte in data + b'\0'][:room]
+                else:
+                    buffer[index] = convert(item.value(frame)) if convert else item.value(frame)
+            frame[slot] = Pointer(buffer, 0, dims)
+
+        if symbol.kind == 'global':
+            self.global_inits.append(declare)
+            return None
+        return declare
+
+    def flatten_initializer(self, dims, items, base, out, element_type, token, string_init=False):
+        """Flat (index, kind, expr) assignments for a braced array initializer"""
+        is_char = element_type.kind == 'int' and element_type.bits == 8
+        if len(dims) == 1:
+            if string_init or (len(items) == 1 and type(items[0]) is not list and is_char
+                               and items[0].literal is not None):
+                data = items[0].literal
+                if len(data) > dims[0]:
+                    self.error('initializer-string for array of chars is too long', token)
+                out.append((base, 'string', items[0]))
+                return
+            if len(items) > dims[0]:
+                self.error('excess elements in array initializer', token)
+            for index, item in enumerate(items):
+                if type(item) is list:
+                    if len(item) != 1 or type(item[0]) is list:
+                        self.error('braces around scalar initializer', token)
+                    item = item[0]
+                self.check_assignable(element_type, item.ctype, token)
+                out.append((base + index, 'value', item))
+            return
+
+        stride = math.prod(dims[1:])
+        total = dims[0] * stride
+        position = 0
+        for item in items:
+            is_row = type(item) is list or (is_char and len(dims) == 2 and item.literal is not None)
+            if is_row and position % stride:
+                position += stride - position % stride
+            if position >= total:
+                self.error('excess elements in array initializer', token)
+            if type(item) is list:
+                self.flatten_initializer(dims[1:], item, base + position, out, element_type, token)
+                position += stride
+            elif is_row:
+                self.flatten_initializer(dims[1:], [item], base + position, out, element_type, token)
+                position += stride
+            else:
+                self.check_assignable(element_type, item.ctype, token)
+                out.append((base + position, 'value', item))
+                position += 1
+
+    def check_assignable(self, target, source, token):
+        if target.is_arithmetic and source.is_pointer:
+            self.error(f"initialization of '{target}' from '{decay(source)}' makes integer from pointer",
+                       token)
+
+    # Statements
+
+    def parse_block(self, new_scope=True):
+        self.expect('{')
+        if new_scope:
+            self.scopes.append({})
+        statements = []
+        while not self.accept('}'):
+            if self.peek().kind == 'eof':
+                self.error("expected '}' at end of input")
+            statement = self.parse_statement()
+            if statement is not None:
+                statements.append(statement)
+        if new_scope:
+            self.scopes.pop()
+        return self.sequence(statements)
+
+    def sequence(self, statements):
+        statements = tuple(statements)
+
+        def block(frame):
+            machine = frame[0]
+            for statement in statements:
+                machine.steps += 1
+                if machine.steps > machine.limit:
+                    machine.check_budget()
+                status = statement(frame)
+                if status:
+                    return status
+            return None
+        return block
+
+    def parse_statement(self):
+        token = self.peek()
+        text = token.text
+        if token.kind == 'punct':
+            if text == '{':
+                return self.parse_block()
+            if text == ';':
+                self.advance()
+                return None
+        elif token.kind == 'identifier':
+            if self.at_type():
+                return self.parse_declaration()
+            handler = {
+                'if': self.parse_if,
+                'while': self.parse_while,
+                'do': self.parse_do,
+                'for': self.parse_for,
+                'switch': self.parse_switch,
+                'return': self.parse_return,
+                'break': self.parse_break,
+                'continue': self.parse_continue,
+                'case': self.parse_case_outside,
+                'default': self.parse_case_outside
+            }.get(text)
+            if handler is not None:
+                return handler()
+            if self.peek(1).text == ':' and self.peek(1).kind == 'punct':
+                self.error('labels and goto are not supported by the interpreter', token)
+
+        expr = self.parse_expression()
+        self.expect_semicolon()
+        value = expr.value
+
+        def expression_statement(frame):
+            value(frame)
+        return expression_statement
+
+    def expect_semicolon(self):
+        token = self.peek()
+        if token.text != ';':
+            previous = self.tokens[self.position - 1] if self.position else token
+            raise ParseError(f"expected ';' before {self.describe(token)}", previous.line,
+                             previous.column + len(previous.text))
+        self.advance()
+
+    def parse_condition(self):
+        self.expect('(')
+        expr = self.parse_expression()
+        self.expect(')')
+        return expr.value
+
+    def parse_substatement(self):
+        statement = self.parse_statement()
+        if statement is None:
+            return lambda frame: None
+        return statement
+
+    def parse_if(self):
+        self.advance()
+        condition = self.parse_condition()
+        then = self.parse_substatement()
+        if self.accept('else'):
+            otherwise = self.parse_substatement()
+
+            def if_else(frame):
+                if condition(frame):
+                    return then(frame)
+                return otherwise(frame)
+            return if_else
+
+        def if_statement(frame):
+            if condition(frame):
+                return then(frame)
+        return if_statement
+
+    def parse_loop_body(self):
+        self.loop_depth += 1
+        body = self.parse_substatement()
+        self.loop_depth -= 1
+        return body
+
+    def parse_while(self):
+        self.advance()
+        condition = self.parse_condition()
+        body = self.parse_loop_body()
+
+        def while_loop(frame):
+            machine = frame[0]
+            while condition(frame):
+                machine.steps += 1
+                if machine.steps > machine.limit:
+                    machine.check_budget()
+                status = body(frame)
+                if status:
+                    if status == BREAK:
+                        break
+                    if status == RETURN:
+                        return status
+            return None
+        return while_loop
+
+    def parse_do(self):
+        self.advance()
+        body = self.parse_loop_body()
+        self.expect('while')
+        condition = self.parse_condition()
+        self.expect_semicolon()
+
+        def do_while(frame):
+            machine = frame[0]
+            while True:
+                machine.steps += 1
+                if machine.steps > machine.limit:
+                    machine.check_budget()
+                status = body(frame)
+                if status:
+                    if status == BREAK:
+                        break
+                    if status == RETURN:
+                        return status
+                if not condition(frame):
+                    break
+            return None
+        return do_while
+
+    def parse_for(self):
+        self.advance()
+        self.expect('(')
+        self.scopes.append({})
+        init = None
+        if self.at_type():
+            init = self.parse_declaration()
+        elif not self.accept(';'):
+            init_expr = self.parse_expression().value
+            self.expect_semicolon()
+
+            def init(frame):
+                init_expr(frame)
+        condition = None
+        if not self.accept(';'):
+            condition = self.parse_expression().value
+            self.expect_semicolon()
+        step = None
+        if self.peek().text != ')':
+            step = self.parse_expression().value
+        self.expect(')')
+        body = self.parse_loop_body()
+        self.scopes.pop()
+
+        def for_loop(frame):
+            machine = frame[0]
+            if init is not None:
+                init(frame)
+            while condition is None or condition(frame):
+                machine.steps += 1
+                if machine.steps > machine.limit:
+                    machine.check_budget()
+                status = body(frame)
+                if status:
+                    if status == BREAK:
+                        break
+                    if status == RETURN:
+                        return status
+                if step is not None:
+                    step(frame)
+            return None
+        return for_loop
+
+    def parse_switch(self):
+        switch_token = self.advance()
+        control_expr = self.parse_condition_expr()
+        if not control_expr.ctype.is_integer:
+            self.error('switch quantity not an integer', switch_token)
+        control = control_expr.value
+        self.expect('{')
+        self.scopes.append({})
+        self.switch_depth += 1
+        statements = []
+        cases = {}
+        default = None
+        while not self.accept('}'):
+            token = self.peek()
+            if token.text == 'case':
+                self.advance()
+                value = self.constant(self.parse_conditional())
+                if type(value) is not int:
+                    self.error('case label does not reduce to an integer constant', token)
+                if value in cases:
+                    self.error('duplicate case value', token)
+                self.expect(':')
+                cases[value] = len(statements)
+            elif token.text == 'default':
+                self.advance()
+                self.expect(':')
+                if default is not None:
+                    self.error("multiple default labels in one switch", token)
+                default = len(statements)
+            elif token.kind == 'eof':
+                self.error("expected '}' at end of input")
+            else:
+                statement = self.parse_statement()
+                if statement is not None:
+                    statements.append(statement)
+        self.switch_depth -= 1
+        self.scopes.pop()
+        statements = tuple(statements)
+
+        def switch(frame):
+            machine = frame[0]
+            start = cases.get(control(frame), default)
+            if start is None:
+                return None
+            for statement in statements[start:]:
+                machine.steps += 1
+                if machine.steps > machine.limit:
+                    machine.check_budget()
+                status = statement(frame)
+                if status:
+                    return None if status == BREAK else status
+            return None
+        return switch
+
+    def parse_condition_expr(self):
+        self.expect('(')
+        expr = self.parse_expression()
+        self.expect(')')
+        return expr
+
+    def parse_case_outside(self):
+        self.error(f"'{self.peek().text}' label not within a switch statement")
+
+    def parse_return(self):
+        token = self.advance()
+        function = self.function
+        if self.accept(';'):
+            def return_void(frame):
+                frame[0].retval = None
+                return RETURN
+            return return_void
+        expr = self.parse_expression()
+        self.expect_semicolon()
+        if function.return_type is VOID:
+            self.error("'return' with a value, in function returning void", token)
+        self.check_assignable(function.return_type, expr.ctype, token)
+        value = expr.value
+        convert = function.return_converter
+
+        def return_value(frame):
+            frame[0].retval = convert(value(frame)) if convert else value(frame)
+            return RETURN
+        return return_value
+
+    def parse_break(self):
+        token = self.advance()
+        self.expect_semicolon()
+        if not self.loop_depth and not self.switch_depth:
+            self.error('break statement not within loop or switch', token)
+        return lambda frame: BREAK
+
+    def parse_continue(self):
+        token = self.advance()
+        self.expect_semicolon()
+        if not self.loop_depth:
+            self.error('continue statement not within a loop', token)
+        return lambda frame: CONTINUE
+
+    # Expressions
+
+    def parse_expression(self):
+        expr = self.parse_assignment()
+        while self.peek().text == ',' and self.peek().kind == 'punct':
+            self.advance()
+            left = expr.value
+            right_expr = self.parse_assignment()
+            right = right_expr.value
+
+            def comma(frame, left=left, right=right):
+                left(frame)
+                return right(frame)
+            expr = Expr(comma, right_expr.ctype)
+        return expr
+
+    def parse_assignment(self):
+        token = self.peek()
+        left = self.parse_conditional()
+        operator_token = self.peek()
+        if operator_token.kind != 'punct' or operator_token.text not in ASSIGNMENT_OPERATORS:
+            return left
+        self.advance()
+        right = self.parse_assignment()
+        if left.address is None:
+            self.error('lvalue required as left operand of assignment', token)
+
+        convert = converter(left.ctype)
+        address = left.address
+        slot = left.slot
+        if operator_token.text == '=':
+            self.check_assignable(left.ctype, right.ctype, operator_token)
+            value = right.value
+            if slot is not None and convert is not None:
+                def assign_local(frame):
+                    result = frame[slot][0] = convert(value(frame))
+                    return result
+                return Expr(assign_local, left.ctype)
+
+            def assign(frame):
+                buffer, index = address(frame)
+                result = convert(value(frame)) if convert else value(frame)
+                buffer[index] = result
+                return result
+            return Expr(assign, left.ctype)
+
+        operator_text = operator_token.text[:-1]
+        combined = self.binary(operator_text, Expr(lambda frame: None, left.ctype), right, operator_token)
+        compute = combined.compute
+        value = right.value
+        if same_type(combined.ctype, left.ctype):
+            # compute() already wrapped the result to this type
+            convert = None
+        if slot is not None:
+            def compound_assign_local(frame):
+                cell = frame[slot]
+                result = compute(cell[0], value(frame))
+                if convert:
+                    result = convert(result)
+                cell[0] = result
+                return result
+            return Expr(compound_assign_local, left.ctype)
+
+        def compound_assign(frame):
+            buffer, index = address(frame)
+            result = compute(buffer[index], value(frame))
+            if convert:
+                result = convert(result)
+            buffer[index] = result
+            return result
+        return Expr(compound_assign, left.ctype)
+
+    def parse_conditional(self):
+        condition = self.parse_binary(1)
+        if not self.accept('?'):
+            return condition
+        then = self.parse_expression()
+        self.expect(':')
+        otherwise = self.parse_conditional()
+        if then.ctype.is_arithmetic and otherwise.ctype.is_arithmetic:
+            ctype = arithmetic_type(then.ctype, otherwise.ctype)
+        else:
+            ctype = decay(then.ctype if then.ctype.is_pointer else otherwise.ctype)
+        test, first, second = condition.value, then.value, otherwise.value
+        if ctype.is_floating:
+            def conditional(frame):
+                return float(first(frame) if test(frame) else second(frame))
+        else:
+            def conditional(frame):
+                return first(frame) if test(frame) else second(frame)
+        return Expr(conditional, ctype)
+
+    def parse_binary(self, min_precedence):
+        left = self.parse_unary()
+        while True:
+            token = self.peek()
+            precedence = BINARY_PRECEDENCE.get(token.text) if token.kind == 'punct' else None
+            if precedence is None or precedence < min_precedence:
+                return left
+            self.advance()
+            right = self.parse_binary(precedence + 1)
+            left = self.binary(token.text, left, right, token)
+
+    def binary(self, operator_text, left, right, token):
+        """
+        Compile left <op> right. The returned Expr also carries
+        compute(a, b) for compound assignment.
+        """
+        lt, rt = decay(left.ctype), decay(right.ctype)
+        line = token.line
+        lv, rv = left.value, right.value
+
+        if operator_text in ('&&', '||'):
+            if operator_text == '&&':
+                def logical(frame):
+                    return 1 if lv(frame) and rv(frame) else 0
+            else:
+                def logical(frame):
+                    return 1 if lv(frame) or rv(frame) else 0
+            return self.with_compute(Expr(logical, INT), None)
+
+        if lt.kind == 'ptr' or rt.kind == 'ptr':
+            return self.pointer_binary(operator_text, left, right, lt, rt, token)
+
+        if not (lt.is_arithmetic and rt.is_arithmetic):
+            self.error(f"invalid operands to binary {operator_text} (have '{lt}' and '{rt}')", token)
+
+        result_type = arithmetic_type(lt, rt)
+        if operator_text in ('%', '<<', '>>', '&', '|', '^') and result_type.is_floating:
+            self.error(f"invalid operands to binary {operator_text} (have '{lt}' and '{rt}')", token)
+
+        if operator_text in COMPARISONS:
+            if result_type.kind == 'int' and not result_type.signed and lt.signed != rt.signed:
+                # -1 < 1u is false in C: the signed side converts to unsigned
+                wrap = converter(result_type)
+                lv, rv = (lambda frame: wrap(left.value(frame))), (lambda frame: wrap(right.value(frame)))
+            return self.with_compute(Expr(COMPARISONS[operator_text](lv, rv), INT), None)
+        compute = self.arithmetic(operator_text, result_type, line)
+        if operator_text in ('+', '-', '*'):
+            expr = Expr(self.direct_arithmetic(operator_text, lv, rv, result_type), result_type)
+        else:
+            def evaluate(frame):
+                return compute(lv(frame), rv(frame))
+            expr = Expr(evaluate, result_type)
+        if operator_text == '*':
+            expr.element_size = left.element_size or right.element_size
+        return self.with_compute(expr, compute)
+
+    def direct_arithmetic(self, operator_text, lv, rv, result_type):
+        """+, - and * without the compute() indirection; these dominate loops"""
+        if result_type.is_floating:
+            if operator_text == '+':
+                return lambda frame: lv(frame) + rv(frame)
+            if operator_text == '-':
+                return lambda frame: lv(frame) - rv(frame)
+            return lambda frame: lv(frame) * rv(frame)
+        low, high = integer_bounds(result_type)
+        wrap = converter(result_type)
+        if operator_text == '+':
+            return lambda frame: value if low <= (value := lv(frame) + rv(frame)) <= high else wrap(value)
+        if operator_text == '-':
+            return lambda frame: value if low <= (value := lv(frame) - rv(frame)) <= high else wrap(value)
+        return lambda frame: value if low <= (value := lv(frame) * rv(frame)) <= high else wrap(value)
+
+    def with_compute(self, expr, compute):
+        expr.compute = compute
+        return expr
+
+    def arithmetic(self, operator_text, result_type, line):
+        """compute(a, b) for an arithmetic, bitwise or shift operator"""
+        wrap = converter(result_type) if result_type.kind == 'int' else None
+
+        if wrap:
+            low, high = integer_bounds(result_type)
+        if operator_text == '+':
+            if wrap:
+                return lambda a, b: value if low <= (value := a + b) <= high else wrap(value)
+            return lambda a, b: float(a + b)
+        if operator_text == '-':
+            if wrap:
+                return lambda a, b: value if low <= (value := a - b) <= high else wrap(value)
+            return lambda a, b: float(a - b)
+        if operator_text == '*':
+            if wrap:
+                return lambda a, b: value if low <= (value := a * b) <= high else wrap(value)
+            return lambda a, b: float(a * b)
+        if operator_text == '/':
+            if wrap:
+                def divide(a, b):
+                    if b == 0:
+                        raise ProgramError('division by zero', line, SIGFPE_STATUS)
+                    quotient = abs(a) // abs(b)
+                    return wrap(-quotient if (a < 0) != (b < 0) else quotient)
+                return divide
+
+            def divide_float(a, b):
+                if b == 0:
+                    if a == 0 or a != a:
+                        return math.nan
+                    return math.copysign(math.inf, a) * math.copysign(1.0, b)
+                return a / b
+            return divide_float
+        if operator_text == '%':
+            def remainder(a, b):
+                if b > 0 and a >= 0:
+                    return a % b
+                if b == 0:
+                    raise ProgramError('division by zero', line, SIGFPE_STATUS)
+                quotient = abs(a) // abs(b)
+                quotient = -quotient if (a < 0) != (b < 0) else quotient
+                return wrap(a - b * quotient)
+            return remainder
+        if operator_text == '<<':
+            return lambda a, b: wrap(a << b) if 0 <= b < 64 else 0
+        if operator_text == '>>':
+            return lambda a, b: wrap(a >> b) if 0 <= b < 64 else (0 if a >= 0 else -1)
+        if operator_text == '&':
+            return lambda a, b: wrap(a & b)
+        if operator_text == '|':
+            return lambda a, b: wrap(a | b)
+        return lambda a, b: wrap(a ^ b)
+
+    def pointer_binary(self, operator_text, left, right, lt, rt, token):
+        lv, rv = left.value, right.value
+        line = token.line
+
+        if operator_text in ('==', '!=', '<', '<=', '>', '>='):
+            return self.with_compute(Expr(COMPARISONS[operator_text](lv, rv), INT), None)
+
+        if operator_text == '+' and (lt.kind == 'ptr') != (rt.kind == 'ptr'):
+            pointer_type = lt if lt.kind == 'ptr' else rt
+            integer_type = rt if lt.kind == 'ptr' else lt
+            if not integer_type.is_integer:
+                self.error(f"invalid operands to binary + (have '{lt}' and '{rt}')", token)
+
+            def add(a, b):
+                if type(a) is not Pointer:
+                    a, b = b, a
+                return _check_pointer(a, line).moved(b)
+            return self.with_compute(Expr(lambda frame: add(lv(frame), rv(frame)), pointer_type), add)
+
+        if operator_text == '-' and lt.kind == 'ptr' and rt.is_integer:
+            def subtract(a, b):
+                return _check_pointer(a, line).moved(-b)
+            return self.with_compute(Expr(lambda frame: subtract(lv(frame), rv(frame)), lt), subtract)
+
+        if operator_text == '-' and lt.kind == 'ptr' and rt.kind == 'ptr':
+            def difference(a, b):
+                return _check_pointer(a, line)._distance(_check_pointer(b, line)) // a.stride
+            return self.with_compute(Expr(lambda frame: difference(lv(frame), rv(frame)), LONG), difference)
+
+        self.error(f"invalid operands to binary {operator_text} (have '{lt}' and '{rt}')", token)
+
+    def parse_unary(self):
+        token = self.peek()
+        text = token.text
+        if token.kind == 'punct':
+            if text in ('++', '--'):
+                self.advance()
+                operand = self.parse_unary()
+                return self.increment(operand, 1 if text == '++' else -1, prefix=True, token=token)
+            if text in ('-', '+', '!', '~'):
+                self.advance()
+                return self.unary(text, self.parse_unary(), token)
+            if text == '*':
+                self.advance()
+                operand = self.parse_unary()
+                return self.index(operand, Expr(lambda frame: 0, INT), token)
+            if text == '&':
+                self.advance()
+                operand = self.parse_unary()
+                return self.address_of(operand, token)
+            if text == '(' and self.at_type(1):
+                self.advance()
+                ctype = self.parse_abstract_type()
+                self.expect(')')
+                return self.cast(ctype, self.parse_unary(), token)
+        elif text == 'sizeof':
+            self.advance()
+            return self.parse_sizeof(token)
+        return self.parse_postfix()
+
+    def unary(self, operator_text, operand, token):
+        ctype = decay(operand.ctype)
+        value = operand.value
+        if operator_text == '!':
+            return Expr(lambda frame: 0 if value(frame) else 1, INT)
+        if not ctype.is_arithmetic or operator_text == '~' and not ctype.is_integer:
+            self.error(f"wrong type argument to unary {'minus' if operator_text == '-' else operator_text}", token)
+        result_type = arithmetic_type(ctype, INT)
+        if operator_text == '+':
+            return Expr(value, result_type)
+        wrap = converter(result_type) if result_type.kind == 'int' else None
+        if operator_text == '-':
+            if wrap:
+                return Expr(lambda frame: wrap(-value(frame)), result_type)
+            return Expr(lambda frame: -value(frame), result_type)
+        return Expr(lambda frame: wrap(~value(frame)), result_type)
+
+    def cast(self, ctype, operand, token):
+        value = operand.value
+        if ctype is VOID:
+            return Expr(value, VOID)
+        if ctype.kind == 'ptr':
+            return Expr(value, ctype, element_size=ctype.target.size())
+        if decay(operand.ctype).kind == 'ptr':
+            self.error(f"cast from pointer to '{ctype}' is not supported by the interpreter", token)
+        convert = converter(ctype)
+        return Expr(lambda frame: convert(value(frame)), ctype)
+
+    def parse_sizeof(self, token):
+        if self.peek().text == '(' and self.at_type(1):
+            self.advance()
+            ctype = self.parse_abstract_type()
+            self.expect(')')
+            size = ctype.size()
+            return Expr(lambda frame: size, ULONG, element_size=size)
+        operand = self.parse_unary()
+        size = operand.ctype.size()
+        if size is not None:
+            return Expr(lambda frame: size, ULONG, element_size=size)
+        # A variable-length array: its storage knows how big it is
+        value = operand.value
+        element_size = operand.ctype.element().size()
+        return Expr(lambda frame: (len(value(frame).buffer) - value(frame).offset) * element_size, ULONG)
+
+    def address_of(self, operand, token):
+        if operand.ctype.kind == 'array':
+            return Expr(operand.value, pointer_to(operand.ctype))
+        if operand.address is None:
+            self.error('lvalue required as unary \'&\' operand', token)
+        address = operand.address
+
+        def take_address(frame):
+            buffer, index = address(frame)
+            return Pointer(buffer, index)
+        return Expr(take_address, pointer_to(operand.ctype))
+
+    def increment(self, operand, delta, prefix, token):
+        if operand.address is None:
+            self.error(f"lvalue required as {'increment' if delta > 0 else 'decrement'} operand", token)
+        address = operand.address
+        ctype = operand.ctype
+        line = token.line
+        if ctype.kind == 'ptr':
+            def step(value):
+                return _check_pointer(value, line).moved(delta)
+        elif ctype.is_arithmetic:
+            convert = converter(ctype)
+
+            def step(value):
+                return convert(value + delta)
+        else:
+            self.error(f"wrong type argument to {'increment' if delta > 0 else 'decrement'}", token)
+
+        slot = operand.slot
+        if slot is not None and ctype.kind == 'int':
+            # i++ on a local int: the hottest statement in most loops
+            low, high = integer_bounds(ctype)
+
+            def increment_local(frame):
+                cell = frame[slot]
+                old = cell[0]
+                new = old + delta
+                cell[0] = new if low <= new <= high else convert(new)
+                return new if prefix else old
+            return Expr(increment_local, ctype)
+
+        if prefix:
+            def pre(frame):
+                buffer, index = address(frame)
+                result = buffer[index] = step(buffer[index])
+                return result
+            return Expr(pre, ctype)
+
+        def post(frame):
+            buffer, index = address(frame)
+            old = buffer[index]
+            buffer[index] = step(old)
+            return old
+        return Expr(post, ctype)
+
+    def index(self, base, offset, token):
+        """base[offset] (and *base, as base[0])"""
+        if decay(offset.ctype).kind == 'ptr' and decay(base.ctype).kind != 'ptr':
+            base, offset = offset, base
+        base_type = decay(base.ctype)
+        if base_type.kind != 'ptr':
+            self.error('subscripted value is neither array nor pointer', token)
+        if not offset.ctype.is_integer:
+            self.error('array subscript is not an integer', token)
+        target = base_type.target
+        if target is VOID:
+            self.error("dereferencing 'void *' pointer", token)
+        pointer_of, index_of = base.value, offset.value
+        line = token.line
+
+        if target.kind == 'array':
+            # A row of a multi-dimensional array: still an array
+            def row(frame):
+                pointer = _check_pointer(pointer_of(frame), line)
+                moved = pointer.moved(index_of(frame))
+                if not 0 <= moved.offset < len(pointer.buffer):
+                    raise ProgramError('array index out of bounds', line)
+                return Pointer(pointer.buffer, moved.offset, pointer.inner[1:])
+            return Expr(row, target)
+
+        def address(frame):
+            pointer = pointer_of(frame)
+            if type(pointer) is not Pointer:
+                raise ProgramError('null or invalid pointer dereferenced', line)
+            position = pointer.offset + index_of(frame)
+            if not 0 <= position < len(pointer.buffer):
+                raise ProgramError(f'array index out of bounds (index {position} of {len(pointer.buffer)})',
+                                   line)
+            return pointer.buffer, position
+
+        def value(frame):
+            buffer, position = address(frame)
+            return buffer[position]
+        return Expr(value, target, address)
+
+    def parse_postfix(self):
+        expr = self.parse_primary()
+        while True:
+            token = self.peek()
+            if token.kind != 'punct':
+                return expr
+            if token.text == '[':
+                self.advance()
+                offset = self.parse_expression()
+                self.expect(']')
+                expr = self.index(expr, offset, token)
+            elif token.text in ('++', '--'):
+                self.advance()
+                expr = self.increment(expr, 1 if token.text == '++' else -1, prefix=False, token=token)
+            elif token.text in ('.', '->'):
+                self.error('struct member access is not supported by the interpreter', token)
+            elif token.text == '(':
+                self.error('called object is not a function', token)
+            else:
+                return expr
+
+    def parse_primary(self):
+        token = self.advance()
+        kind = token.kind
+        if kind == 'number':
+            return self.number(token)
+        if kind == 'char':
+            data = _decode_literal(token.text[1:-1], token.line, token.column)
+            if not data:
+                self.error('empty character constant', token)
+            value = _signed_byte(data[-1]) if len(data) == 1 else int.from_bytes(data[-4:], 'big')
+            return Expr(lambda frame: value, INT)
+        if kind == 'string':
+            data = _decode_literal(token.text[1:-1], token.line, token.column)
+            while self.peek().kind == 'string':
+                following = self.advance()
+                data += _decode_literal(following.text[1:-1], following.line, following.column)
+            self.literal_count += 1
+            key = self.literal_count
+
+            def literal(frame):
+                return frame[0].literal(key, data)
+            return Expr(literal, array_of(CHAR, len(data) + 1), literal=data)
+        if kind == 'identifier':
+            if self.peek().text == '(' and self.peek().kind == 'punct':
+                return self.call(token)
+            return self.variable(token)
+        if kind == 'punct' and token.text == '(':
+            expr = self.parse_expression()
+            self.expect(')')
+            return expr
+        self.error(f'expected expression before {self.describe(token)}', token)
+
+    def number(self, token):
+        text = token.text
+        lowered = text.lower()
+        is_hex = lowered.startswith('0x')
+        if not is_hex and ('.' in text or 'e' in lowered) or is_hex and 'p' in lowered:
+            ctype = FLOAT if lowered.endswith('f') else DOUBLE
+            try:
+                value = float(lowered.rstrip('fl')) if not is_hex else float.fromhex(lowered.rstrip('fl'))
+            except ValueError:
+                self.error(f"invalid floating constant '{text}'", token)
+            if ctype is FLOAT:
+                value = _float32(value)
+            return Expr(lambda frame: value, ctype)
+        value, ctype = _integer_literal(text, token.line, token.column)
+        return Expr(lambda frame: value, ctype)
+
+    def variable(self, token):
+        name = token.text
+        symbol = self.lookup(name)
+        if symbol is None:
+            if name in self.functions or name in LIBRARY:
+                self.error(f"function pointers are not supported by the interpreter ('{name}')", token)
+            self.error(f"'{name}' undeclared (first use in this function)" if self.function
+                       else f"'{name}' undeclared here (not in a function)", token)
+        slot = symbol.slot
+        ctype = symbol.ctype
+
+        if symbol.kind == 'local':
+            if ctype.kind == 'array':
+                return Expr(lambda frame: frame[slot], ctype)
+            expr = Expr(lambda frame: frame[slot][0], ctype, lambda frame: (frame[slot], 0))
+            expr.slot = slot
+            return expr
+
+        if ctype.kind == 'array':
+            return Expr(lambda frame: frame[0].globals[slot], ctype)
+        return Expr(lambda frame: frame[0].globals[slot][0], ctype,
+                    lambda frame: (frame[0].globals[slot], 0))
+
+    def call(self, name_token):
+        name = name_token.text
+        self.expect('(')
+        args = []
+        if not self.accept(')'):
+            while True:
+                args.append(self.parse_assignment())
+                if not self.accept(','):
+                    break
+            self.expect(')')
+        line = name_token.line
+
+        if self.lookup(name) is not None:
+            self.error('called object is not a function', name_token)
+
+        function = self.functions.get(name)
+        if function is None and name in LIBRARY:
+            return self.library_call(name, args, name_token)
+        if function is None:
+            # Called before its definition without a prototype: C89 implicit int
+            function = Function(name, INT, None, line)
+            self.functions[name] = function
+        self.pending_calls.append((function, name_token))
+
+        if function.params is not None and len(args) != len(function.params):
+            problem = 'too many' if len(args) > len(function.params) else 'too few'
+            self.error(f"{problem} arguments to function '{name}'", name_token)
+        values = tuple(arg.value for arg in args)
+
+        def invoke(frame):
+            machine = frame[0]
+            return machine.invoke(function, [value(frame) for value in values], line)
+        return Expr(invoke, function.return_type)
+
+    def library_call(self, name, args, token):
+        implementation, return_type, arity = LIBRARY[name]
+        if arity is not None and len(args) != arity:
+            problem = 'too many' if len(args) > arity else 'too few'
+            self.error(f"{problem} arguments to function '{name}'", token)
+        if name in ('printf', 'scanf') and (not args or decay(args[0].ctype).kind != 'ptr'):
+            self.error(f"format argument of '{name}' is not a string", token)
+        values = tuple(arg.value for arg in args)
+        line = token.line
+
+        if name == 'printf' and args[0].literal is not None:
+            # Constant format: skip reading it back out of the literal's buffer
+            fmt = args[0].literal
+            rest = values[1:]
+
+            def printf_literal(frame):
+                machine = frame[0]
+                data = format_printf(fmt, [value(frame) for value in rest], line)
+                machine.write(data)
+                return len(data)
+            return Expr(printf_literal, INT)
+
+        if name in ('malloc', 'calloc', 'realloc'):
+            size_arg = args[-1] if name != 'calloc' else args[1]
+            element_size = size_arg.element_size or 1
+            count_values = values
+
+            def allocate(frame):
+                arguments = [value(frame) for value in count_values]
+                # Storage is one cell per element: turn the byte count into elements
+                if name == 'calloc':
+                    arguments = [arguments[0], 1] if element_size > 1 else arguments
+                    arguments[0] = arguments[0] * (1 if element_size > 1 else arguments[1])
+                else:
+                    arguments[-1] = -(-arguments[-1] // element_size)
+                return implementation(frame[0], arguments, line)
+            return Expr(allocate, return_type)
+
+        def library(frame):
+            return implementation(frame[0], [value(frame) for value in values], line)
+        return Expr(library, return_type)
+
+
+@lru_cache(maxsize=32)
+def compile_c(code):
+    """Parse and compile C source into a Program; raises ParseError"""
+    return Parser(code).parse_program()
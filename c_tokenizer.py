@@ -0,0 +1,127 @@
+"""
+Single-pass tokenizer for C and C++ source.
+
+tokenize_c() walks the source once with one anchored pattern, skipping
+whitespace and comments, keeping each preprocessor line as a single
+'directive' token, and pairing brackets with a stack as it goes. Every scan
+is linear: block comments are closed with str.find and string/char literals
+stop at the end of the line, so unterminated literals and comments can't
+cause backtracking. The result is cached, so the validator, the diagnostics
+endpoint and the interpreter share one tokenization of a buffer.
+"""
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+Token = namedtuple('Token', 'kind text line column')
+
+OPENERS = {'(': ')', '[': ']', '{': '}'}
+CLOSERS = {')': '(', ']': '[', '}': '{'}
+
+TOKEN_PATTERN = re.compile(r'''
+    (?P<space>[ \t\r\f\v]+)
+  | (?P<newline>\n)
+  | (?P<line_comment>//[^\n]*)
+  | (?P<block_comment>/\*)
+  | (?P<string>"(?:[^"\\\n]|\\.)*(?P<string_end>")?)
+  | (?P<char>'(?:[^'\\\n]|\\.)*(?P<char_end>')?)
+  | (?P<number>\.?\d(?:[eEpP][+-]|[\w.])*)
+  | (?P<identifier>[A-Za-z_]\w*)
+  | (?P<punct>\.\.\.|<<=|>>=|->|\+\+|--|<<|>>|<=|>=|==|!=|&&|\|\||::|[-+*/%&|^]=|[{}()\[\];,.<>=+\-*/%&|^!~?:])
+  | (?P<other>.)
+''', re.VERBOSE | re.DOTALL)
+
+# A directive runs to the end of the line, including backslash continuations
+DIRECTIVE_PATTERN = re.compile(r'#(?:[^\n\\]|\\.)*', re.DOTALL)
+
+
+class TokenizedSource:
+    """
+    Tokens plus bracket structure: pairs maps the index of every matched
+    bracket to its partner; unmatched lists indexes of brackets without one.
+    A closer pairs with the nearest open bracket of its kind, so one stray
+    '(' doesn't unbalance the enclosing braces. errors holds
+    (line, column, message) for unterminated literals and comments.
+    """
+
+    def __init__(self, tokens, pairs, unmatched, errors):
+        self.tokens = tokens
+        self.pairs = pairs
+        self.unmatched = unmatched
+        self.errors = errors
+
+
+@lru_cache(maxsize=64)
+def tokenize_c(code):
+    """Tokenize C/C++ source; see TokenizedSource"""
+    tokens = []
+    pairs = {}
+    unmatched = []
+    errors = []
+    stack = []
+    # Openers of each kind on the stack, so recovery never searches it
+    open_counts = dict.fromkeys(OPENERS, 0)
+
+    position = 0
+    line = 1
+    line_start = 0
+    at_line_start = True
+    length = len(code)
+
+    while position < length:
+        if at_line_start and code[position] == '#':
+            match = DIRECTIVE_PATTERN.match(code, position)
+            kind = 'directive'
+        else:
+            match = TOKEN_PATTERN.match(code, position)
+            kind = match.lastgroup
+        text = match.group()
+        column = position - line_start + 1
+        end = match.end()
+
+        if kind == 'block_comment':
+            close = code.find('*/', position + 2)
+            if close < 0:
+                errors.append((line, column, 'unterminated comment'))
+                end = length
+            else:
+                end = close + 2
+            text = code[position:end]
+        elif kind == 'string' and match.group('string_end') is None:
+            errors.append((line, column, 'missing terminating " character'))
+        elif kind == 'char' and match.group('char_end') is None:
+            errors.append((line, column, "missing terminating ' character"))
+
+        if kind == 'newline':
+            at_line_start = True
+        elif kind not in ('space', 'line_comment', 'block_comment'):
+            at_line_start = False
+            index = len(tokens)
+            tokens.append(Token(kind, text, line, column))
+            if kind == 'punct':
+                if text in OPENERS:
+                    stack.append(index)
+                    open_counts[text] += 1
+                elif text in CLOSERS:
+                    if open_counts[CLOSERS[text]]:
+                        # Openers left unclosed inside this pair are the unmatched ones
+                        while tokens[stack[-1]].text != CLOSERS[text]:
+                            unclosed = stack.pop()
+                            open_counts[tokens[unclosed].text] -= 1
+                            unmatched.append(unclosed)
+                        opener = stack.pop()
+                        open_counts[CLOSERS[text]] -= 1
+                        pairs[opener] = index
+                        pairs[index] = opener
+                    else:
+                        unmatched.append(index)
+
+        newlines = text.count('\n')
+        if newlines:
+            line += newlines
+            line_start = position + text.rindex('\n') + 1
+        position = end
+
+    unmatched.extend(stack)
+    unmatched.sort()
+    return TokenizedSource(tokens, pairs, unmatched, errors)
@@ -1,50 +1,220 @@
 
 import re
 import subprocess
-import tempfile
 import os
 import time
 import shutil
+from functools import lru_cache
+
+import c_interpreter
+import java_runner
+import python_zygote
+from c_tokenizer import tokenize_c
+from compile_cache import compile_cache, compiler_version
+from precompiled_headers import precompiled_headers
+from workspace import workspace_pool
+from process_runner import MAX_OUTPUT_BYTES, ProcessResult, run_process, stage_stats
+
+# Compiler tiers per language, fastest first. Interactive runs use the first
+# 'fast' tier that is installed; grading, and code a fast tier rejects, use 'full'.
+COMPILER_TIERS = {
+    'c': [
+        {'tier': 'fast', 'compiler': 'tcc', 'flags': []},
+        {'tier': 'fast', 'compiler': 'gcc', 'flags': ['-O0', '-pipe']},
+        {'tier': 'full', 'compiler': 'gcc', 'flags': ['-O2', '-pipe']}
+    ],
+    'cpp': [
+        {'tier': 'fast', 'compiler': 'g++', 'flags': ['-std=c++17', '-O0', '-pipe']},
+        {'tier': 'full', 'compiler': 'g++', 'flags': ['-std=c++17', '-O2', '-pipe']}
+    ]
+}
+
+SOURCE_NAMES = {'c': 'main.c', 'cpp': 'main.cpp'}
+
+# -x names for source read from stdin
+SOURCE_LANGUAGE = {'c': 'c', 'cpp': 'c++'}
+
+def _discover_tiers():
+    """Keep the tiers whose compiler is installed"""
+    return {
+        language: [tier for tier in tiers if shutil.which(tier['compiler'])]
+        for language, tiers in COMPILER_TIERS.items()
+    }
+
+AVAILABLE_TIERS = _discover_tiers()
 
-def execute_c_code(code, compile_only=False):
+def select_tiers(language, grading=False):
     """
-    Compile and optionally execute C code using GCC.
-    Returns real compilation errors and execution results.
+    Tiers to try in order: the fastest interactive tier, then the full tier as
+    fallback when it uses a different compiler. Grading uses the full tier only.
+    """
+    tiers = AVAILABLE_TIERS.get(language, [])
+    fast = [tier for tier in tiers if tier['tier'] == 'fast'][:1]
+    full = [tier for tier in tiers if tier['tier'] == 'full'][:1]
+    if grading:
+        return full or fast
+    if fast and full and fast[0]['compiler'] == full[0]['compiler']:
+        # Same compiler, so a rejection would only be repeated
+        return fast
+    return fast + full
+
+def _native_toolchains():
+    """(language, compiler, flags) for the gcc/g++ tiers in use"""
+    toolchains = []
+    for language in AVAILABLE_TIERS:
+        for tier in select_tiers(language) + select_tiers(language, grading=True):
+            toolchain = (language, tier['compiler'], tier['flags'])
+            if tier['compiler'] in ('gcc', 'g++') and toolchain not in toolchains:
+                toolchains.append(toolchain)
+    return toolchains
+
+# Precompiled headers are built for each of these
+NATIVE_TOOLCHAINS = _native_toolchains()
+
+@lru_cache(maxsize=None)
+def toolchain_fingerprint(language):
+    """
+    Identify the tools an interactive run of language goes through
+    (compiler or runtime, version and flags), for keying cached run results.
+    """
+    if language == 'c' and not AVAILABLE_TIERS['c']:
+        return 'interpreter'
+    if language in ('c', 'cpp'):
+        parts = []
+        for tier in select_tiers(language):
+            compiler_path = shutil.which(tier['compiler']) or tier['compiler']
+            parts.append(' '.join([compiler_path, compiler_version(compiler_path)] + tier['flags']))
+        return '|'.join(parts)
+    tool = {'python': 'python3', 'java': 'javac'}.get(language)
+    tool_path = shutil.which(tool) if tool else None
+    if tool_path is None:
+        return ''
+    return f'{tool_path} {compiler_version(tool_path)}'
+
+def _compile_native(code, language, compiler, flags, source_name, work_dir, syntax_only=False):
+    """
+    Compile code with gcc/g++ inside work_dir, consulting the compile cache.
+    syntax_only runs the front end alone (-fsyntax-only): no code generation,
+    no link and no binary written.
+    Returns {'returncode', 'stderr', 'binary_path', 'cache', 'precompiled_header', 'stats'}.
+    """
+    lookup_started = time.monotonic()
+    compiler_path = shutil.which(compiler)
+    pch_flags = precompiled_headers.flags_for(language, compiler, flags, code)
+    if syntax_only:
+        flags = flags + ['-fsyntax-only']
+    cache_key = compile_cache.make_key(code, compiler_path, pch_flags + flags)
+
+    entry = compile_cache.lookup(cache_key)
+    if entry is not None:
+        stats = stage_stats(time.monotonic() - lookup_started)
+        stats['cached'] = True
+        return {
+            'returncode': entry['returncode'],
+            'stderr': entry['stderr'],
+            'binary_path': entry['binary_path'],
+            'cache': 'hit',
+            'precompiled_header': bool(pch_flags),
+            'stats': stats
+        }
+
+    # Feed the source on stdin; the line marker keeps diagnostics pointing at source_name
+    exec_path = os.path.join(work_dir, 'main')
+    output_flags = [] if syntax_only else ['-o', 'main']
+
+    def compile_with(extra_flags):
+        return run_process(
+            [compiler_path] + extra_flags + flags + ['-x', SOURCE_LANGUAGE[language], '-'] + output_flags,
+            input_text=f'# 1 "{source_name}"\n{code}',
+            timeout=10,
+            cwd=work_dir
+        )
+
+    compile_process = compile_with(pch_flags)
+    if compile_process.returncode != 0 and pch_flags and precompiled_headers.owns(compile_process.stderr):
+        # Diagnostics from inside the headers name the bundle; report the plain compile's instead
+        pch_flags = []
+        compile_process = compile_with(pch_flags)
+
+    succeeded = compile_process.returncode == 0 and not syntax_only
+    compile_cache.store(cache_key, compile_process.returncode, compile_process.stderr,
+                        exec_path if succeeded else None)
+    return {
+        'returncode': compile_process.returncode,
+        'stderr': compile_process.stderr,
+        'binary_path': exec_path if succeeded else None,
+        'cache': 'miss',
+        'precompiled_header': bool(pch_flags),
+        'stats': compile_process.stats
+    }
+
+def _compile_tiered(code, language, work_dir, grading=False, syntax_only=False):
+    """
+    Compile with the selected tiers, falling through to the next tier when one
+    rejects the code. Returns the last _compile_native result plus 'tier' and 'compiler'.
+    Syntax-only checks use the first gcc/g++ tier, since tcc has no front-end-only
+    mode; without one they fall back to a full compile with the selected tiers.
+    """
+    tiers = select_tiers(language, grading)
+    if syntax_only:
+        front_end = [tier for tier in tiers if tier['compiler'] in ('gcc', 'g++')][:1]
+        if front_end:
+            tiers = front_end
+        else:
+            syntax_only = False
+    if not tiers:
+        return {
+            'returncode': 127,
+            'stderr': f'{language} compiler not found',
+            'binary_path': None,
+            'cache': None,
+            'precompiled_header': False,
+            'stats': stage_stats(0.0),
+            'tier': None,
+            'compiler': None
+        }
+    for tier in tiers:
+        compiled = _compile_native(code, language, tier['compiler'], tier['flags'], SOURCE_NAMES[language], work_dir,
+                                   syntax_only)
+        compiled['tier'] = tier['tier']
+        compiled['compiler'] = tier['compiler']
+        if compiled['returncode'] == 0:
+            break
+    return compiled
+
+def _execute_native(code, language, compile_only, on_output=None, stdin=None):
+    """
+    Shared compile-and-run path for C and C++.
     """
     result = {
         'output': '',
         'error': '',
         'execution_time': 0.0,
-        'success': False
+        'success': False,
+        'stages': {}
     }
 
-    start_time = time.time()
-
-    # Check if GCC is available
-    if not shutil.which('gcc'):
-        return execute_c_code_simulation(code, compile_only)
+    start_time = time.monotonic()
 
     try:
-        # Create temporary files for source and executable
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.c', delete=False) as source_file:
-            source_file.write(code)
-            source_path = source_file.name
-
-        # Create executable path
-        exec_path = source_path.replace('.c', '')
+        # Borrow a pooled workspace for the executable
+        temp_dir = workspace_pool.acquire()
 
         try:
-            # Compile the C code
-            compile_process = subprocess.run(
-                ['gcc', source_path, '-o', exec_path],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-
-            if compile_process.returncode != 0:
+            # Compile-only requests just need diagnostics, so skip code generation and linking
+            compiled = _compile_tiered(code, language, temp_dir, syntax_only=compile_only)
+            exec_path = compiled['binary_path']
+            result['compiler_tier'] = compiled['tier']
+            result['compiler'] = compiled['compiler']
+            result['compile_cache'] = compiled['cache']
+            result['precompiled_header'] = compiled['precompiled_header']
+            result['stages']['compile'] = compiled['stats']
+            # Kept on success too, for the warnings
+            result['compiler_output'] = compiled['stderr']
+
+            if compiled['returncode'] != 0:
                 # Compilation failed
-                result['error'] = f"Compilation Error:\n{compile_process.stderr}"
+                result['error'] = f"Compilation Error:\n{compiled['stderr']}"
                 result['success'] = False
             else:
                 result['success'] = True
@@ -54,133 +224,66 @@ def execute_c_code(code, compile_only=False):
                     # Compilation successful, now execute
                     try:
                         # Prepare input for programs that need it
-                        test_input = prepare_test_input(code)
-                        
-                        exec_process = subprocess.run(
+                        test_input = prepare_test_input(code) if stdin is None else stdin
+
+                        exec_process = run_process(
                             [exec_path],
-                            input=test_input,
-                            capture_output=True,
-                            text=True,
-                            timeout=5
+                            input_text=test_input,
+                            timeout=5,
+                            on_output=on_output,
+                            capture=on_output is None,
+                            sliced=True
                         )
 
-                        if exec_process.returncode == 0:
-                            result['output'] = exec_process.stdout
-                            result['success'] = True
-                        else:
-                            result['error'] = f"Runtime Error:\n{exec_process.stderr}"
-                            if exec_process.stdout:
-                                result['output'] = exec_process.stdout
+                        record_run(result, exec_process)
 
-                    except subprocess.TimeoutExpired:
+                    except subprocess.TimeoutExpired as e:
+                        result['stages']['run'] = getattr(e, 'stats', None)
                         result['error'] = "Execution timeout - program took too long to run"
 
         finally:
-            # Clean up temporary files
-            try:
-                if os.path.exists(source_path):
-                    os.unlink(source_path)
-                if os.path.exists(exec_path):
-                    os.unlink(exec_path)
-            except OSError:
-                pass
+            # Scrub the workspace and return it to the pool
+            workspace_pool.release(temp_dir)
 
-    except subprocess.TimeoutExpired:
+    except subprocess.TimeoutExpired as e:
+        result['stages']['compile'] = getattr(e, 'stats', None)
         result['error'] = "Compilation timeout"
     except Exception as e:
         result['error'] = f'Execution error: {str(e)}'
 
-    result['execution_time'] = round(time.time() - start_time, 3)
+    result['execution_time'] = round(time.monotonic() - start_time, 3)
     return result
 
-def execute_cpp_code(code, compile_only=False):
+def execute_c_code(code, compile_only=False, on_output=None, stdin=None):
     """
-    Compile and optionally execute C++ code using g++.
+    Compile and optionally execute C code using GCC, or the in-process
+    interpreter when no C compiler is installed.
+    Returns real compilation errors and execution results.
+    on_output(stream, text) receives program output as it is produced.
+    stdin is fed to the program; when None, input is guessed from the source.
     """
-    result = {
-        'output': '',
-        'error': '',
-        'execution_time': 0.0,
-        'success': False
-    }
+    # Check if a C compiler is available
+    if not AVAILABLE_TIERS['c']:
+        return execute_c_code_interpreted(code, compile_only, on_output, stdin)
 
-    start_time = time.time()
+    return _execute_native(code, 'c', compile_only, on_output, stdin)
 
+def execute_cpp_code(code, compile_only=False, on_output=None, stdin=None):
+    """
+    Compile and optionally execute C++ code using g++.
+    """
     # Check if g++ is available
-    if not shutil.which('g++'):
-        result['error'] = 'g++ compiler not found. Please install g++.'
-        result['execution_time'] = round(time.time() - start_time, 3)
-        return result
-
-    try:
-        # Create temporary files for source and executable
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.cpp', delete=False) as source_file:
-            source_file.write(code)
-            source_path = source_file.name
-
-        # Create executable path
-        exec_path = source_path.replace('.cpp', '')
-
-        try:
-            # Compile the C++ code
-            compile_process = subprocess.run(
-                ['g++', '-std=c++17', source_path, '-o', exec_path],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-
-            if compile_process.returncode != 0:
-                # Compilation failed
-                result['error'] = f"Compilation Error:\n{compile_process.stderr}"
-                result['success'] = False
-            else:
-                result['success'] = True
-                if compile_only:
-                    result['output'] = 'Compilation successful'
-                else:
-                    # Execute the compiled code
-                    try:
-                        test_input = prepare_test_input(code)
-                        
-                        exec_process = subprocess.run(
-                            [exec_path],
-                            input=test_input,
-                            capture_output=True,
-                            text=True,
-                            timeout=5
-                        )
-
-                        if exec_process.returncode == 0:
-                            result['output'] = exec_process.stdout
-                            result['success'] = True
-                        else:
-                            result['error'] = f"Runtime Error:\n{exec_process.stderr}"
-                            if exec_process.stdout:
-                                result['output'] = exec_process.stdout
-
-                    except subprocess.TimeoutExpired:
-                        result['error'] = "Execution timeout - program took too long to run"
-
-        finally:
-            # Clean up temporary files
-            try:
-                if os.path.exists(source_path):
-                    os.unlink(source_path)
-                if os.path.exists(exec_path):
-                    os.unlink(exec_path)
-            except OSError:
-                pass
-
-    except subprocess.TimeoutExpired:
-        result['error'] = "Compilation timeout"
-    except Exception as e:
-        result['error'] = f'Execution error: {str(e)}'
+    if not AVAILABLE_TIERS['cpp']:
+        return {
+            'output': '',
+            'error': 'g++ compiler not found. Please install g++.',
+            'execution_time': 0.0,
+            'success': False
+        }
 
-    result['execution_time'] = round(time.time() - start_time, 3)
-    return result
+    return _execute_native(code, 'cpp', compile_only, on_output, stdin)
 
-def execute_python_code(code, compile_only=False):
+def execute_python_code(code, compile_only=False, on_output=None, stdin=None):
     """
     Execute Python code (Python doesn't require separate compilation).
     """
@@ -188,34 +291,38 @@ def execute_python_code(code, compile_only=False):
         'output': '',
         'error': '',
         'execution_time': 0.0,
-        'success': False
+        'success': False,
+        'stages': {}
     }
 
-    start_time = time.time()
+    start_time = time.monotonic()
 
     # Check if Python is available
     if not shutil.which('python3') and not shutil.which('python'):
         result['error'] = 'Python interpreter not found. Please install Python.'
-        result['execution_time'] = round(time.time() - start_time, 3)
+        result['execution_time'] = round(time.monotonic() - start_time, 3)
         return result
 
     try:
-        # Create temporary file for source
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as source_file:
-            source_file.write(code)
-            source_path = source_file.name
+        # Borrow a pooled workspace; the source file is only written when a new interpreter needs it
+        work_dir = workspace_pool.acquire()
+        source_path = os.path.join(work_dir, 'main.py')
+
+        def write_source():
+            with open(source_path, 'w') as source_file:
+                source_file.write(code)
 
         try:
             if compile_only:
                 # For Python, compilation means syntax checking
                 python_cmd = 'python3' if shutil.which('python3') else 'python'
-                compile_process = subprocess.run(
+                write_source()
+                compile_process = run_process(
                     [python_cmd, '-m', 'py_compile', source_path],
-                    capture_output=True,
-                    text=True,
                     timeout=5
                 )
                 
+                result['stages']['compile'] = compile_process.stats
                 if compile_process.returncode == 0:
                     result['success'] = True
                     result['output'] = 'Syntax check passed'
@@ -225,45 +332,59 @@ def execute_python_code(code, compile_only=False):
             else:
                 # Execute the Python code
                 python_cmd = 'python3' if shutil.which('python3') else 'python'
-                test_input = prepare_test_input(code)
-                
-                exec_process = subprocess.run(
-                    [python_cmd, source_path],
-                    input=test_input,
-                    capture_output=True,
-                    text=True,
-                    timeout=5
-                )
+                test_input = prepare_test_input(code) if stdin is None else stdin
 
-                if exec_process.returncode == 0:
-                    result['output'] = exec_process.stdout
-                    result['success'] = True
-                else:
-                    result['error'] = f"Runtime Error:\n{exec_process.stderr}"
-                    if exec_process.stdout:
-                        result['output'] = exec_process.stdout
+                exec_process = None
+                if python_zygote.enabled():
+                    # Fork from the warm zygote instead of starting a new interpreter
+                    try:
+                        outcome = python_zygote.zygote_client.run(
+                            code, test_input, timeout=5,
+                            on_output=on_output, capture=on_output is None
+                        )
+                    except python_zygote.ZygoteUnavailable:
+                        outcome = None
+                    if outcome is not None:
+                        if outcome['timed_out']:
+                            result['stages']['run'] = outcome['stats']
+                            raise subprocess.TimeoutExpired(python_cmd, 5)
+                        exec_process = ProcessResult(
+                            [python_cmd, source_path],
+                            outcome['returncode'],
+                            outcome['stdout'],
+                            outcome['stderr'],
+                            output_truncated=outcome['output_truncated'],
+                            output_bytes=outcome['output_bytes'],
+                            stats=outcome['stats']
+                        )
+
+                if exec_process is None:
+                    write_source()
+                    exec_process = run_process(
+                        [python_cmd, source_path],
+                        input_text=test_input,
+                        timeout=5,
+                        on_output=on_output,
+                        capture=on_output is None,
+                        sliced=True
+                    )
+
+                record_run(result, exec_process)
 
         finally:
-            # Clean up temporary files
-            try:
-                if os.path.exists(source_path):
-                    os.unlink(source_path)
-                # Remove compiled bytecode file if it exists
-                compiled_path = source_path + 'c'
-                if os.path.exists(compiled_path):
-                    os.unlink(compiled_path)
-            except OSError:
-                pass
+            # Scrub the source and any bytecode, and return the workspace to the pool
+            workspace_pool.release(work_dir)
 
-    except subprocess.TimeoutExpired:
+    except subprocess.TimeoutExpired as e:
+        result['stages'].setdefault('compile' if compile_only else 'run', getattr(e, 'stats', None))
         result['error'] = "Execution timeout - program took too long to run"
     except Exception as e:
         result['error'] = f'Execution error: {str(e)}'
 
-    result['execution_time'] = round(time.time() - start_time, 3)
+    result['execution_time'] = round(time.monotonic() - start_time, 3)
     return result
 
-def execute_java_code(code, compile_only=False):
+def execute_java_code(code, compile_only=False, on_output=None, stdin=None):
     """
     Compile and optionally execute Java code.
     """
@@ -271,15 +392,16 @@ def execute_java_code(code, compile_only=False):
         'output': '',
         'error': '',
         'execution_time': 0.0,
-        'success': False
+        'success': False,
+        'stages': {}
     }
 
-    start_time = time.time()
+    start_time = time.monotonic()
 
     # Check if Java is available
     if not shutil.which('javac') or not shutil.which('java'):
         result['error'] = 'Java compiler/runtime not found. Please install JDK.'
-        result['execution_time'] = round(time.time() - start_time, 3)
+        result['execution_time'] = round(time.monotonic() - start_time, 3)
         return result
 
     try:
@@ -287,27 +409,34 @@ def execute_java_code(code, compile_only=False):
         class_name_match = re.search(r'public\s+class\s+(\w+)', code)
         if not class_name_match:
             result['error'] = 'No public class found in Java code'
-            result['execution_time'] = round(time.time() - start_time, 3)
+            result['execution_time'] = round(time.monotonic() - start_time, 3)
             return result
         
         class_name = class_name_match.group(1)
-        
-        # Create temporary directory and source file
-        temp_dir = tempfile.mkdtemp()
+
+        if java_runner.enabled():
+            # Compile in memory and run on a warm JVM
+            try:
+                return _execute_java_on_jvm(code, class_name, compile_only, result, start_time, stdin)
+            except java_runner.JvmUnavailable:
+                pass
+
+        # Borrow a pooled workspace for the source and class files
+        temp_dir = workspace_pool.acquire()
         source_path = os.path.join(temp_dir, f'{class_name}.java')
-        
-        with open(source_path, 'w') as source_file:
-            source_file.write(code)
 
         try:
+            with open(source_path, 'w') as source_file:
+                source_file.write(code)
+
             # Compile the Java code
-            compile_process = subprocess.run(
+            compile_process = run_process(
                 ['javac', source_path],
-                capture_output=True,
-                text=True,
                 timeout=10,
                 cwd=temp_dir
             )
+            result['stages']['compile'] = compile_process.stats
+            result['compiler_output'] = compile_process.stderr
 
             if compile_process.returncode != 0:
                 # Compilation failed
@@ -320,41 +449,325 @@ def execute_java_code(code, compile_only=False):
                 else:
                     # Execute the compiled Java code
                     try:
-                        test_input = prepare_test_input(code)
+                        test_input = prepare_test_input(code) if stdin is None else stdin
                         
-                        exec_process = subprocess.run(
+                        exec_process = run_process(
                             ['java', class_name],
-                            input=test_input,
-                            capture_output=True,
-                            text=True,
+                            input_text=test_input,
                             timeout=5,
-                            cwd=temp_dir
+                            cwd=temp_dir,
+                            on_output=on_output,
+                            capture=on_output is None,
+                            sliced=True
                         )
 
-                        if exec_process.returncode == 0:
-                            result['output'] = exec_process.stdout
-                            result['success'] = True
-                        else:
-                            result['error'] = f"Runtime Error:\n{exec_process.stderr}"
-                            if exec_process.stdout:
-                                result['output'] = exec_process.stdout
+                        record_run(result, exec_process)
 
-                    except subprocess.TimeoutExpired:
+                    except subprocess.TimeoutExpired as e:
+                        result['stages']['run'] = getattr(e, 'stats', None)
                         result['error'] = "Execution timeout - program took too long to run"
 
         finally:
-            # Clean up temporary directory
+            # Scrub the workspace and return it to the pool
+            workspace_pool.release(temp_dir)
+
+    except subprocess.TimeoutExpired as e:
+        result['stages']['compile'] = getattr(e, 'stats', None)
+        result['error'] = "Compilation timeout"
+    except Exception as e:
+        result['error'] = f'Execution error: {str(e)}'
+
+    result['execution_time'] = round(time.monotonic() - start_time, 3)
+    return result
+
+def _execute_java_on_jvm(code, class_name, compile_only, result, start_time, stdin=None):
+    """
+    Run a Java submission on the persistent JVM pool.
+    Raises java_runner.JvmUnavailable so the caller can fall back to javac/java.
+    """
+    test_input = prepare_test_input(code) if stdin is None else stdin
+    try:
+        outcome = java_runner.jvm_pool.run(class_name, code, test_input, compile_only)
+        result['stages']['compile'] = outcome['compile_stats']
+        result['compiler_output'] = outcome['diagnostics']
+    except java_runner.JvmTimeout as e:
+        if e.stage == 'compile':
+            result['error'] = "Compilation timeout"
+        else:
+            result['success'] = True
+            result['error'] = "Execution timeout - program took too long to run"
+    else:
+        if not outcome['compiled']:
+            # Compilation failed
+            result['error'] = f"Compilation Error:\n{outcome['diagnostics']}"
+            result['success'] = False
+        else:
+            result['success'] = True
+            if compile_only:
+                result['output'] = 'Compilation successful'
+            else:
+                record_run(result, ProcessResult(
+                    ['java', class_name],
+                    outcome['returncode'],
+                    outcome['stdout'],
+                    outcome['stderr'],
+                    output_truncated=outcome['output_truncated'],
+                    output_bytes=outcome['output_bytes'],
+                    stats=outcome['run_stats']
+                ))
+
+    result['execution_time'] = round(time.monotonic() - start_time, 3)
+    return result
+
+def record_run(result, exec_process):
+    """
+    Fill the result dict from a finished run stage.
+    """
+    result['output_truncated'] = exec_process.output_truncated
+    result['output_bytes'] = exec_process.output_bytes
+    result['stages']['run'] = exec_process.stats
+
+    if exec_process.output_truncated:
+        # The program was stopped once it passed the output cap
+        result['output'] = exec_process.stdout
+        result['error'] = f"Output limit exceeded - program printed more than {MAX_OUTPUT_BYTES} bytes"
+    elif exec_process.returncode == 0:
+        result['output'] = exec_process.stdout
+        result['success'] = True
+    else:
+        result['error'] = f"Runtime Error:\n{exec_process.stderr}"
+        if exec_process.stdout:
+            result['output'] = exec_process.stdout
+
+class CompiledProgram:
+    """
+    A submission compiled once and runnable many times with different stdin.
+    Holds a pooled workspace until close().
+    """
+
+    def __init__(self, language, code, work_dir, argv=None, class_name=None, interpreted=None):
+        self.language = language
+        self.code = code
+        self.work_dir = work_dir
+        self.argv = argv
+        self.class_name = class_name
+        self.interpreted = interpreted
+
+    def run(self, stdin='', timeout=5, on_output=None, line_buffered=False):
+        """
+        Run the program once; returns a ProcessResult with stats.
+        line_buffered makes stdout reach on_output line by line where the
+        runtime allows it (C stdio via stdbuf, Python).
+        Raises subprocess.TimeoutExpired.
+        """
+        if self.language == 'python' and self.argv is None:
             try:
-                shutil.rmtree(temp_dir)
-            except OSError:
-                pass
+                outcome = python_zygote.zygote_client.run(
+                    self.code, stdin, timeout=timeout,
+                    on_output=on_output, capture=on_output is None,
+                    line_buffered=line_buffered
+                )
+            except python_zygote.ZygoteUnavailable:
+                # Fall back to a fresh interpreter for this and later runs
+                self.argv = _write_python_source(self.code, self.work_dir)
+                return self.run(stdin, timeout, on_output, line_buffered)
+            if outcome['timed_out']:
+                error = subprocess.TimeoutExpired('python3', timeout)
+                error.stats = outcome['stats']
+                raise error
+            return ProcessResult(
+                ['python3', 'main.py'],
+                outcome['returncode'],
+                outcome['stdout'],
+                outcome['stderr'],
+                output_truncated=outcome['output_truncated'],
+                output_bytes=outcome['output_bytes'],
+                stats=outcome['stats']
+            )
+
+        if self.interpreted is not None:
+            return _run_interpreted(self.interpreted, stdin, timeout, on_output)
+
+        if self.language == 'java' and self.argv is None:
+            # The JVM keeps the classes compiled by compile_program, so this only runs main()
+            try:
+                outcome = java_runner.jvm_pool.run(self.class_name, self.code, stdin, run_timeout=timeout)
+            except java_runner.JvmTimeout:
+                raise subprocess.TimeoutExpired(['java', self.class_name], timeout)
+            return ProcessResult(
+                ['java', self.class_name],
+                outcome['returncode'],
+                outcome['stdout'],
+                outcome['stderr'],
+                output_truncated=outcome['output_truncated'],
+                output_bytes=outcome['output_bytes'],
+                stats=outcome['run_stats']
+            )
 
-    except subprocess.TimeoutExpired:
+        return run_process(
+            _line_buffered_argv(self.language, self.argv) if line_buffered else self.argv,
+            input_text=stdin,
+            timeout=timeout,
+            cwd=self.work_dir,
+            on_output=on_output,
+            capture=on_output is None,
+            sliced=True
+        )
+
+    def close(self):
+        """Return the workspace to the pool"""
+        if self.work_dir is not None:
+            workspace_pool.release(self.work_dir)
+            self.work_dir = None
+
+def _line_buffered_argv(language, argv):
+    """argv adjusted so the program's stdout is flushed at least at every newline"""
+    if language == 'python':
+        return argv[:1] + ['-u'] + argv[1:]
+    if language in ('c', 'cpp') and shutil.which('stdbuf'):
+        return ['stdbuf', '-oL'] + argv
+    # The JVM's System.out already flushes on println
+    return argv
+
+def _write_python_source(code, work_dir):
+    """Write main.py into work_dir and return the argv that runs it"""
+    python_cmd = 'python3' if shutil.which('python3') else 'python'
+    source_path = os.path.join(work_dir, 'main.py')
+    with open(source_path, 'w') as source_file:
+        source_file.write(code)
+    return [python_cmd, source_path]
+
+def compile_program(language, code, grading=False):
+    """
+    Compile a submission once for repeated runs; grading builds with the full compiler tier.
+    Returns (result, program): result is the compile-only result dict and
+    program is a CompiledProgram, or None when compilation failed.
+    The caller must close() the program.
+    """
+    result = {
+        'output': '',
+        'error': '',
+        'execution_time': 0.0,
+        'success': False,
+        'stages': {}
+    }
+
+    start_time = time.monotonic()
+    work_dir = workspace_pool.acquire()
+    program = None
+
+    try:
+        if language == 'c' and not AVAILABLE_TIERS['c']:
+            interpreted, result['stages']['compile'], error = _parse_interpreted(code)
+            result['compiler'] = 'interpreter'
+            if error:
+                result['error'] = f"Compilation Error:\n{error}"
+            else:
+                program = CompiledProgram(language, code, work_dir, interpreted=interpreted)
+
+        elif language in ('c', 'cpp'):
+            if not AVAILABLE_TIERS[language]:
+                compiler = 'gcc' if language == 'c' else 'g++'
+                result['error'] = f'{compiler} compiler not found. Please install {compiler}.'
+            else:
+                compiled = _compile_tiered(code, language, work_dir, grading)
+                result['compiler_tier'] = compiled['tier']
+                result['compiler'] = compiled['compiler']
+                result['compile_cache'] = compiled['cache']
+                result['precompiled_header'] = compiled['precompiled_header']
+                result['stages']['compile'] = compiled['stats']
+                if compiled['returncode'] != 0:
+                    result['error'] = f"Compilation Error:\n{compiled['stderr']}"
+                else:
+                    program = CompiledProgram(language, code, work_dir, argv=[compiled['binary_path']])
+
+        elif language == 'python':
+            try:
+                compile(code, 'main.py', 'exec')
+            except SyntaxError as e:
+                result['error'] = f'Syntax error: {str(e)}'
+            else:
+                # Runs go to the zygote when it is enabled
+                argv = None if python_zygote.enabled() else _write_python_source(code, work_dir)
+                program = CompiledProgram(language, code, work_dir, argv=argv)
+
+        elif language == 'java':
+            class_name_match = re.search(r'public\s+class\s+(\w+)', code)
+            if not shutil.which('javac') or not shutil.which('java'):
+                result['error'] = 'Java compiler/runtime not found. Please install JDK.'
+            elif not class_name_match:
+                result['error'] = 'No public class found in Java code'
+            else:
+                class_name = class_name_match.group(1)
+                outcome = None
+                if java_runner.enabled():
+                    try:
+                        outcome = java_runner.jvm_pool.run(class_name, code, compile_only=True)
+                    except java_runner.JvmUnavailable:
+                        outcome = None
+                if outcome is not None:
+                    result['stages']['compile'] = outcome['compile_stats']
+                    if not outcome['compiled']:
+                        result['error'] = f"Compilation Error:\n{outcome['diagnostics']}"
+                    else:
+                        program = CompiledProgram(language, code, work_dir, class_name=class_name)
+                else:
+                    source_path = os.path.join(work_dir, f'{class_name}.java')
+                    with open(source_path, 'w') as source_file:
+                        source_file.write(code)
+                    compile_process = run_process(['javac', source_path], timeout=10, cwd=work_dir)
+                    result['stages']['compile'] = compile_process.stats
+                    if compile_process.returncode != 0:
+                        result['error'] = f"Compilation Error:\n{compile_process.stderr}"
+                    else:
+                        program = CompiledProgram(language, code, work_dir,
+                                                  argv=['java', '-cp', work_dir, class_name])
+
+        else:
+            result['error'] = f'Unsupported language: {language}'
+
+    except subprocess.TimeoutExpired as e:
+        result['stages']['compile'] = getattr(e, 'stats', None)
+        result['error'] = "Compilation timeout"
+    except java_runner.JvmTimeout:
         result['error'] = "Compilation timeout"
     except Exception as e:
         result['error'] = f'Execution error: {str(e)}'
+    finally:
+        if program is None:
+            workspace_pool.release(work_dir)
+
+    if program is not None:
+        result['success'] = True
+        result['output'] = 'Compilation successful'
+    result['execution_time'] = round(time.monotonic() - start_time, 3)
+    return result, program
 
-    result['execution_time'] = round(time.time() - start_time, 3)
+def run_compiled(program, stdin=None, on_output=None):
+    """
+    Run a CompiledProgram once and return the usual result dict.
+    stdin is fed to the program; when None, input is guessed from the source.
+    """
+    result = {
+        'output': '',
+        'error': '',
+        'execution_time': 0.0,
+        'success': True,
+        'stages': {}
+    }
+
+    start_time = time.monotonic()
+    test_input = prepare_test_input(program.code) if stdin is None else stdin
+    try:
+        record_run(result, program.run(test_input, on_output=on_output))
+    except subprocess.TimeoutExpired as e:
+        result['stages']['run'] = getattr(e, 'stats', None)
+        result['error'] = "Execution timeout - program took too long to run"
+    except Exception as e:
+        result['success'] = False
+        result['error'] = f'Execution error: {str(e)}'
+
+    result['execution_time'] = round(time.monotonic() - start_time, 3)
     return result
 
 def prepare_test_input(code):
@@ -380,177 +793,307 @@ def prepare_test_input(code):
     
     return test_input
 
-def execute_c_code_simulation(code):
+def _parse_interpreted(code):
     """
-    Fallback simulation when GCC is not available.
+    Parse C for the interpreter: (program, compile stats, error). The error
+    is in gcc's file:line:column format so diagnostics can place it.
+    """
+    started = time.monotonic()
+    try:
+        program, error = c_interpreter.compile_c(code), None
+    except c_interpreter.ParseError as e:
+        program, error = None, f"main.c:{e.line}:{e.column}: error: {e.message}"
+    return program, stage_stats(time.monotonic() - started), error
+
+def _run_interpreted(program, stdin, timeout=5, on_output=None):
+    """
+    Run an interpreted program like run_process: returns a ProcessResult and
+    raises subprocess.TimeoutExpired when the time or instruction budget runs out.
+    """
+    outcome = program.run(stdin, timeout=timeout, on_output=on_output, capture=on_output is None)
+    if outcome['timed_out']:
+        error = subprocess.TimeoutExpired(['main.c'], timeout)
+        error.stats = outcome['stats']
+        raise error
+    return ProcessResult(
+        ['main.c'],
+        outcome['returncode'],
+        outcome['stdout'],
+        outcome['stderr'],
+        output_truncated=outcome['output_truncated'],
+        output_bytes=outcome['output_bytes'],
+        stats=outcome['stats']
+    )
+
+def execute_c_code_interpreted(code, compile_only=False, on_output=None, stdin=None):
+    """
+    Fallback when no C compiler is installed: parse and run the program in
+    the in-process interpreter (see c_interpreter for the supported subset).
     """
     result = {
         'output': '',
         'error': '',
         'execution_time': 0.0,
-        'success': False
+        'success': False,
+        'stages': {},
+        'compiler': 'interpreter'
     }
 
-    start_time = time.time()
+    start_time = time.monotonic()
 
     try:
-        # Perform basic syntax validation
-        validation_errors = validate_c_syntax_advanced(code)
-        if validation_errors:
-            result['error'] = "Compilation Error:\n" + "\n".join(validation_errors)
-            result['execution_time'] = round(time.time() - start_time, 3)
-            return result
-
-        # Basic syntax validation
-        if not code.strip():
-            result['error'] = 'Error: Empty code provided'
-            return result
-
-        # Check for basic C program structure
-        if '#include <stdio.h>' not in code:
-            result['error'] = 'Error: Missing #include <stdio.h> header'
-            return result
-
-        if 'int main()' not in code and 'int main(void)' not in code:
-            result['error'] = 'Error: Missing main() function'
-            return result
-
-        # Simulate different program outputs based on code patterns
-        output = simulate_c_program_output(code)
-        result['output'] = output
-        result['success'] = True
+        program, result['stages']['compile'], error = _parse_interpreted(code)
+        if error:
+            result['error'] = f"Compilation Error:\n{error}"
+        else:
+            result['success'] = True
+            if compile_only:
+                result['output'] = 'Compilation successful'
+            else:
+                test_input = prepare_test_input(code) if stdin is None else stdin
+                try:
+                    record_run(result, _run_interpreted(program, test_input, on_output=on_output))
+                except subprocess.TimeoutExpired as e:
+                    result['stages']['run'] = getattr(e, 'stats', None)
+                    result['error'] = "Execution timeout - program took too long to run"
 
     except Exception as e:
         result['error'] = f'Execution error: {str(e)}'
 
-    result['execution_time'] = round(time.time() - start_time, 3)
+    result['execution_time'] = round(time.monotonic() - start_time, 3)
     return result
 
-def validate_c_syntax_advanced(code):
+# Names that start a declaration; the next identifier at that nesting depth is declared
+DECLARATION_TYPES = {
+    'int', 'float', 'double', 'char', 'long', 'short', 'unsigned', 'signed', 'void',
+    'bool', 'auto', 'const', 'static', 'size_t'
+}
+TAG_KEYWORDS = {'struct', 'union', 'enum', 'class'}
+
+# Keywords that can start a statement followed by an identifier that is not declared there
+STATEMENT_KEYWORDS = {
+    'return', 'goto', 'case', 'else', 'do', 'sizeof', 'throw', 'delete', 'new',
+    'typedef', 'using', 'namespace', 'public', 'private', 'protected'
+}
+
+# Identifiers that are never user variables: keywords and common library names
+KNOWN_NAMES = {
+    'sizeof', 'return', 'true', 'false', 'nullptr', 'stdin', 'stdout', 'stderr',
+    'printf', 'scanf', 'std', 'this'
+}
+
+# Error wording for an unmatched bracket
+BRACKET_KINDS = {
+    '{': 'braces { }', '}': 'braces { }',
+    '(': 'parentheses ( )', ')': 'parentheses ( )',
+    '[': 'brackets [ ]', ']': 'brackets [ ]'
+}
+
+DEFINE_PATTERN = re.compile(r'#\s*define\s+([A-Za-z_]\w*)')
+
+def _declared_names(tokens):
     """
-    Advanced C syntax validation that catches common errors.
+    Names declared anywhere in the file: variables, parameters, functions,
+    typedefs and macros. One pass with a declaration state per bracket depth.
+    A struct/union/enum/class body keeps its statement's state, so the
+    declarators after its closing brace (typedef struct { ... } Item;) are
+    registered, and `Name name` at the start of a statement declares name.
     """
+    declared = set()
+    type_names = set(DECLARATION_TYPES)
+    states = {}
+    typedefs = set()
+    aggregates = set()
+    # Depth of each open aggregate body -> whether its statement is a typedef
+    bodies = {}
+    depth = 0
+    previous = None
+    before_previous = None
+
+    for token in tokens:
+        text = token.text
+        if token.kind == 'directive':
+            match = DEFINE_PATTERN.match(text)
+            if match:
+                declared.add(match.group(1))
+        elif token.kind == 'identifier':
+            state = states.get(depth)
+            if text == 'typedef':
+                typedefs.add(depth)
+            elif text in TAG_KEYWORDS:
+                states[depth] = 'tag'
+                aggregates.add(depth)
+            elif text in type_names:
+                states[depth] = 'expect'
+            elif state == 'tag':
+                # struct Name: the tag behaves like a type name from here on
+                type_names.add(text)
+                states[depth] = 'expect'
+            elif state == 'expect':
+                declared.add(text)
+                if depth in typedefs:
+                    type_names.add(text)
+                states[depth] = 'declared'
+            elif (state is None and previous is not None and previous.kind == 'identifier'
+                  and previous.text not in STATEMENT_KEYWORDS
+                  and (before_previous is None or before_previous.text in (';', '{', '}'))):
+                # Name name; with a type from a header or a class declared elsewhere
+                declared.add(text)
+                states[depth] = 'declared'
+        elif text in ('(', '['):
+            depth += 1
+            states.pop(depth, None)
+        elif text == '{':
+            if depth in aggregates:
+                # The declarators after the body belong to this statement
+                bodies[depth + 1] = depth in typedefs
+            else:
+                states.pop(depth, None)
+                typedefs.discard(depth)
+            depth += 1
+            states.pop(depth, None)
+            typedefs.discard(depth)
+            aggregates.discard(depth)
+        elif text in (')', ']', '}'):
+            states.pop(depth, None)
+            typedefs.discard(depth)
+            aggregates.discard(depth)
+            typedef = bodies.pop(depth, None) if text == '}' else None
+            depth = max(depth - 1, 0)
+            if typedef is not None:
+                states[depth] = 'expect'
+                aggregates.discard(depth)
+                if typedef:
+                    typedefs.add(depth)
+        elif text == ',' and states.get(depth) == 'declared':
+            states[depth] = 'expect'
+        elif text == ';':
+            states.pop(depth, None)
+            typedefs.discard(depth)
+            aggregates.discard(depth)
+        before_previous, previous = previous, token
+
+    return declared
+
+def _call_arguments(source, open_index):
+    """(start, end) token ranges of the top-level arguments of the call whose '(' is at open_index"""
+    close = source.pairs.get(open_index)
+    if close is None:
+        return []
+    arguments = []
+    start = index = open_index + 1
+    while index < close:
+        text = source.tokens[index].text
+        if text in ('(', '[', '{') and index in source.pairs:
+            # Skip nested groups; their commas belong to inner calls
+            index = source.pairs[index] + 1
+            continue
+        if text == ',':
+            arguments.append((start, index))
+            start = index + 1
+        index += 1
+    arguments.append((start, close))
+    return arguments
+
+def _undeclared_arguments(source, declared):
+    """Identifiers passed to printf/scanf that are never declared in the file"""
+    tokens = source.tokens
     errors = []
-    
-    # Check for undeclared variables
-    declared_vars = set()
-    lines = code.split('\n')
-    
-    # Extract variable declarations
-    for line in lines:
-        line = line.strip()
-        # Match variable declarations like "int var;", "float x, y;"
-        var_decl_match = re.findall(r'\b(?:int|float|double|char|long|short)\s+([a-zA-Z_][a-zA-Z0-9_]*(?:\s*,\s*[a-zA-Z_][a-zA-Z0-9_]*)*)', line)
-        for match in var_decl_match:
-            # Split by comma to handle multiple declarations
-            vars_in_line = [v.strip() for v in match.split(',')]
-            declared_vars.update(vars_in_line)
-    
-    # Check for variable usage
-    for i, line in enumerate(lines):
-        line_num = i + 1
-        line = line.strip()
-        
-        # Skip comments and preprocessor directives
-        if line.startswith('//') or line.startswith('#') or line.startswith('/*'):
+    for index, token in enumerate(tokens):
+        if token.text not in ('printf', 'scanf') or index + 1 >= len(tokens) or tokens[index + 1].text != '(':
             continue
-            
-        # Check scanf usage for undeclared variables
-        scanf_matches = re.findall(r'scanf\s*\([^,]+,\s*&([a-zA-Z_][a-zA-Z0-9_]*)', line)
-        for var in scanf_matches:
-            if var not in declared_vars:
-                errors.append(f"Line {line_num}: '{var}' undeclared (first use in this function)")
-        
-        # Check printf usage for undeclared variables (simplified)
-        printf_vars = re.findall(r'printf\s*\([^)]*,\s*([a-zA-Z_][a-zA-Z0-9_]*)', line)
-        for var in printf_vars:
-            if var not in declared_vars and var not in ['printf', 'scanf']:
-                errors.append(f"Line {line_num}: '{var}' undeclared (first use in this function)")
-    
-    # Check for balanced braces
-    brace_count = code.count('{') - code.count('}')
-    if brace_count != 0:
-        errors.append('Mismatched braces { }')
-
-    # Check for balanced parentheses
-    paren_count = code.count('(') - code.count(')')
-    if paren_count != 0:
-        errors.append('Mismatched parentheses ( )')
-
-    # Check for missing semicolons
-    for i, line in enumerate(lines):
-        line_num = i + 1
-        line = line.strip()
-        if line and not line.startswith('#') and not line.startswith('//') and not line.startswith('/*'):
-            # Check statements that should end with semicolon
-            if (('printf' in line or 'scanf' in line or 'return' in line) and 
-                not line.endswith(';') and not line.endswith('{') and not line.endswith('}')):
-                errors.append(f"Line {line_num}: expected ';' before end of line")
-
+        for start, end in _call_arguments(source, index + 1)[1:]:
+            # scanf takes &name; printf takes the name itself
+            if token.text == 'scanf':
+                if end - start < 2 or tokens[start].text != '&':
+                    continue
+                start += 1
+            argument = tokens[start]
+            if argument.kind != 'identifier' or start + 1 < end and tokens[start + 1].text == '(':
+                continue
+            name = argument.text
+            # All-caps names are taken to be macros from a header
+            if name in declared or name in KNOWN_NAMES or name.isupper():
+                continue
+            errors.append(f"Line {argument.line}: '{name}' undeclared (first use in this function)")
     return errors
 
-def simulate_c_program_output(code):
+def _ends_expression(token):
+    return token.kind in ('identifier', 'number', 'string', 'char') or token.text in (')', ']', '++', '--')
+
+def _missing_semicolons(source):
     """
-    Simulate C program output based on code patterns.
-    This is a simplified simulation for educational purposes.
+    printf/scanf calls and return statements that run into the next
+    statement (or the closing brace) without a ';'. Bracketed groups are
+    jumped over, so every token is visited a constant number of times.
     """
-    output = ""
-
-    # Extract printf statements and simulate their output
-    printf_pattern = r'printf\s*\(\s*"([^"]*)"(?:\s*,\s*([^)]*))?\s*\)'
-    matches = re.findall(printf_pattern, code)
-
-    for match in matches:
-        format_string = match[0]
-        variables = match[1] if match[1] else ""
-
-        # Replace common format specifiers with example values
-        output_line = format_string
-        output_line = output_line.replace('\\n', '\n')
-
-        # Handle basic format specifiers
-        if '%s' in output_line and 'name' in variables.lower():
-            output_line = output_line.replace('%s', 'John')
-        elif '%s' in output_line:
-            output_line = output_line.replace('%s', 'string')
-
-        if '%d' in output_line:
-            # Try to extract numbers from variables or use default
-            numbers = re.findall(r'\d+', variables)
-            if numbers:
-                output_line = output_line.replace('%d', numbers[0])
-            else:
-                output_line = output_line.replace('%d', '42')
+    tokens = source.tokens
+    count = len(tokens)
+    errors = []
+    index = 0
+
+    while index < count:
+        token = tokens[index]
+        previous = tokens[index - 1].text if index else ';'
+        is_statement = previous in (';', '{', '}', ')', ':', 'else') and (
+            token.text == 'return'
+            or token.text in ('printf', 'scanf') and index + 1 < count and tokens[index + 1].text == '('
+        )
+        if not is_statement:
+            index += 1
+            continue
 
-        if '%f' in output_line:
-            output_line = output_line.replace('%f', '3.14')
+        cursor = index
+        while True:
+            if tokens[cursor].text in ('(', '[', '{'):
+                if cursor not in source.pairs:
+                    # Unbalanced; reported as a bracket error instead
+                    cursor = count
+                    break
+                cursor = source.pairs[cursor]
+            last = tokens[cursor]
+            following = tokens[cursor + 1] if cursor + 1 < count else None
+            if following is not None and following.text == ';':
+                break
+            runs_on = (
+                following is None
+                or following.text == '}'
+                or cursor > index and following.line > last.line and _ends_expression(last)
+                and following.kind in ('identifier', 'number', 'char')
+            )
+            if runs_on:
+                errors.append(f"Line {last.line}: expected ';' before end of line")
+                break
+            cursor += 1
+        index = cursor + 1
 
-        output += output_line
+    return errors
 
-    # Handle specific common patterns
-    if 'Hello, World!' in code:
-        return 'Hello, World!'
+def validate_c_syntax_advanced(code):
+    """
+    Advanced C syntax validation that catches common errors.
+    All checks share one tokenization (see c_tokenizer), so validation is
+    linear in the size of the code and ignores braces in strings and comments.
+    """
+    source = tokenize_c(code)
+    errors = [f"Line {line}: {message}" for line, column, message in source.errors]
 
-    # Simulate user input scenarios
-    if 'scanf' in code:
-        if 'name' in code.lower() and 'age' in code.lower():
-            return 'Enter your name: John\nEnter your age: 25\nHello John, you are 25 years old!'
-        elif 'num1' in code and 'num2' in code:
-            return 'Enter first number: 10\nEnter second number: 5\nSum: 15\nDifference: 5\nProduct: 50'
-        elif 'number' in code and ('even' in code or 'odd' in code):
-            return 'Enter a number: 7\n7 is odd'
+    # Check for undeclared variables
+    errors.extend(_undeclared_arguments(source, _declared_names(source.tokens)))
 
-    # Simulate loop outputs
-    if 'for' in code or 'while' in code:
-        if re.search(r'i\s*<=?\s*[n5]', code) or re.search(r'i\s*<\s*[n5]', code):
-            return 'Enter a number: 5\n1\n2\n3\n4\n5'
+    # Check for balanced braces, parentheses and brackets
+    reported = set()
+    for index in source.unmatched:
+        token = source.tokens[index]
+        kind = BRACKET_KINDS[token.text]
+        if kind not in reported:
+            reported.add(kind)
+            errors.append(f"Line {token.line}: Mismatched {kind}")
 
-    # If we have output from printf simulation, return it
-    if output.strip():
-        return output.strip()
+    # Check for missing semicolons
+    errors.extend(_missing_semicolons(source))
 
-    # Default case
-    return 'Program executed successfully (no output)'
+    return errors
 
 def validate_c_syntax(code):
     """
@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from functools import lru_cache
+
+# Cache location and size budget can be tuned per deployment
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'colunn-compile-cache')
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+@lru_cache(maxsize=None)
+def compiler_version(compiler_path):
+    """
+    Return the first line of `<compiler> --version`, memoized per path.
+    """
+    try:
+        process = subprocess.run(
+            [compiler_path, '--version'],
+            capture_output=True,
+            text=True,
+            timeout=10
+        )
+        lines = (process.stdout or process.stderr).splitlines()
+        return lines[0].strip() if lines else ''
+    except (OSError, subprocess.TimeoutExpired):
+        return ''
+
+
+class CompileCache:
+    """
+    Content-addressed on-disk cache of compiler results.
+
+    Entries are keyed by a hash of the source, compiler path, compiler
+    version and flags. Both successful binaries and failing diagnostics are
+    stored; the least recently used entries are evicted once the cache grows
+    past its byte budget.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=None):
+        self.cache_dir = cache_dir or os.environ.get('COLUNN_COMPILE_CACHE_DIR', DEFAULT_CACHE_DIR)
+        self.max_bytes = max_bytes or int(os.environ.get('COLUNN_COMPILE_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def make_key(self, code, compiler_path, flags):
+        """Build the cache key for a source/compiler/flags combination"""
+        digest = hashlib.sha256()
+        for part in (code, compiler_path, compiler_version(compiler_path), '\0'.join(flags)):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def _paths(self, key):
+        return (os.path.join(self.cache_dir, f'{key}.json'),
+                os.path.join(self.cache_dir, f'{key}.bin'))
+
+    def lookup(self, key):
+        """
+        Return the cached entry for key or None.
+        Entries look like {'returncode': int, 'stderr': str, 'binary_path': str or None};
+        successful syntax-only checks have no binary.
+        """
+        meta_path, binary_path = self._paths(key)
+        try:
+            with open(meta_path) as meta_file:
+                entry = json.load(meta_file)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        if entry.get('returncode') == 0 and entry.get('has_binary', True):
+            if not os.path.exists(binary_path):
+                with self._lock:
+                    self.misses += 1
+                return None
+            entry['binary_path'] = binary_path
+        else:
+            entry['binary_path'] = None
+
+        # Refresh timestamps so eviction sees this entry as recently used
+        try:
+            os.utime(meta_path)
+        except OSError:
+            pass
+
+        with self._lock:
+            self.hits += 1
+        return entry
+
+    def store(self, key, returncode, stderr, binary_path=None):
+        """Record a compiler result; the binary is copied into the cache when present"""
+        meta_path, cached_binary_path = self._paths(key)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+            # Write the binary first; the metadata file marks the entry complete
+            if returncode == 0 and binary_path:
+                fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+                os.close(fd)
+                shutil.copy2(binary_path, tmp_path)
+                os.replace(tmp_path, cached_binary_path)
+
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w') as meta_file:
+                json.dump({'returncode': returncode, 'stderr': stderr,
+                           'has_binary': bool(returncode == 0 and binary_path)}, meta_file)
+            os.replace(tmp_path, meta_path)
+        except OSError:
+            return
+
+        self._evict()
+
+    def _evict(self):
+        """Remove least recently used entries until the cache fits its budget"""
+        entries = []
+        total_size = 0
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return
+
+        for name in names:
+            if not name.endswith('.json'):
+                continue
+            key = name[:-len('.json')]
+            meta_path, binary_path = self._paths(key)
+            try:
+                meta_stat = os.stat(meta_path)
+            except OSError:
+                continue
+            size = meta_stat.st_size
+            try:
+                size += os.path.getsize(binary_path)
+            except OSError:
+                pass
+            entries.append((meta_stat.st_mtime, key, size))
+            total_size += size
+
+        if total_size <= self.max_bytes:
+            return
+
+        entries.sort()
+        for _, key, size in entries:
+            if total_size <= self.max_bytes:
+                break
+            for path in self._paths(key):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            total_size -= size
+
+    def stats(self):
+        """Return hit/miss counters"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+
+compile_cache = CompileCache()
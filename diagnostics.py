@@ -0,0 +1,212 @@
+"""
+Editor diagnostics (markers) for the code editor.
+
+The editor asks for diagnostics after every edit, so each check is tiered:
+a cheap structural pass runs in-process first (validate_c_syntax_advanced
+for C-family code, the Python parser for Python). Its structural findings
+(unbalanced delimiters, unterminated literals and comments) are exact and
+answer on their own; anything else it reports, or a clean buffer, is
+escalated to a syntax-only compiler check, which has the final word.
+Finished results are cached by content hash, so an unchanged buffer costs a
+dictionary lookup; lint-only answers are cached under their own key.
+
+A diagnostic is {'line', 'column', 'end_line', 'end_column', 'severity',
+'message', 'source'} with 1-based positions, ready to map onto Monaco markers.
+"""
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from code_executor import SOURCE_NAMES, validate_c_syntax_advanced
+
+DEFAULT_CACHE_SIZE = 512
+
+# file:line[:column]: severity: message, as printed by gcc, g++, tcc and javac
+COMPILER_LINE = re.compile(r'^([^:\n]+):(\d+):(?:(\d+):)?\s*(fatal error|error|warning|note):\s*(.*)$')
+JAVA_CLASS = re.compile(r'public\s+class\s+(\w+)')
+LINT_LINE = re.compile(r'^Line (\d+): (.*)$')
+
+# Lint findings exact enough to report without asking the compiler
+RELIABLE_LINT = re.compile(r'^(Mismatched |unterminated comment|missing terminating )')
+
+SEVERITIES = {'fatal error': 'error', 'error': 'error', 'warning': 'warning', 'note': 'info'}
+
+
+def content_key(language, code, stage='compiler'):
+    """Cache key for a buffer's result from stage ('compiler' or 'lint')"""
+    digest = hashlib.sha256()
+    digest.update(stage.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(language.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(code.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _diagnostic(line, column, message, severity='error', source='lint', end_line=None, end_column=None):
+    return {
+        'line': line,
+        'column': column,
+        'end_line': end_line or line,
+        'end_column': end_column or column + 1,
+        'severity': severity,
+        'message': message,
+        'source': source
+    }
+
+
+def lint_c_family(code):
+    """The cheap pass for C and C++: validate_c_syntax_advanced as diagnostics"""
+    last_line = code.count('\n') + 1
+    diagnostics = []
+    for error in validate_c_syntax_advanced(code):
+        match = LINT_LINE.match(error)
+        if match:
+            diagnostics.append(_diagnostic(int(match.group(1)), 1, match.group(2)))
+        else:
+            # Balance errors have no single position; report them at the end of the buffer
+            diagnostics.append(_diagnostic(last_line, 1, error))
+    return diagnostics
+
+
+def lint_python(code):
+    """The Python parser is the whole check for Python: it is in-process and exact"""
+    try:
+        compile(code, 'main.py', 'exec', dont_inherit=True)
+    except SyntaxError as e:
+        line = e.lineno or 1
+        column = e.offset or 1
+        return [_diagnostic(line, column, e.msg, source='python',
+                            end_line=getattr(e, 'end_lineno', None),
+                            end_column=getattr(e, 'end_offset', None))]
+    except ValueError as e:
+        # e.g. source containing null bytes
+        return [_diagnostic(1, 1, str(e), source='python')]
+    return []
+
+
+def source_file_name(language, code):
+    """The file name the compiler reports the submission's own code under"""
+    if language == 'java':
+        match = JAVA_CLASS.search(code)
+        return f'{match.group(1)}.java' if match else None
+    return SOURCE_NAMES.get(language)
+
+
+def parse_compiler_output(text, source, file_name):
+    """
+    Diagnostics in file_name from gcc/g++/tcc/javac output; lines about
+    other files (system headers) are skipped. Caret lines give javac its column.
+    """
+    lines = text.splitlines()
+    diagnostics = []
+    for index, line in enumerate(lines):
+        match = COMPILER_LINE.match(line)
+        if not match or os.path.basename(match.group(1)) != file_name:
+            continue
+        column = int(match.group(3)) if match.group(3) else None
+        if column is None and index + 2 < len(lines) and lines[index + 2].strip() == '^':
+            column = lines[index + 2].index('^') + 1
+        diagnostics.append(_diagnostic(int(match.group(2)), column or 1, match.group(5),
+                                       severity=SEVERITIES[match.group(4)], source=source))
+    return diagnostics
+
+
+class DiagnosticsChecker:
+    """
+    Tiered, content-hash-cached diagnostics.
+    """
+
+    def __init__(self, cache_size=None):
+        self.cache_size = cache_size or int(os.environ.get('COLUNN_DIAGNOSTICS_CACHE', DEFAULT_CACHE_SIZE))
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.lint_only = 0
+        self.escalated = 0
+
+    def _cached(self, *keys):
+        """The entry stored under the first of keys that has one, or None"""
+        with self._lock:
+            for key in keys:
+                entry = self._cache.get(key)
+                if entry is not None:
+                    self.hits += 1
+                    self._cache.move_to_end(key)
+                    return entry
+            self.misses += 1
+            return None
+
+    def _store(self, key, entry):
+        with self._lock:
+            self._cache[key] = entry
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def check(self, language, code, compile_check=None):
+        """
+        Diagnostics for code. compile_check(language, code) returns an
+        executor compile-only result dict; it runs unless the cheap pass found
+        a structural error. Without it (e.g. the server is busy) only the
+        cheap pass runs and only structural errors are cached, so a later
+        call can escalate.
+        Returns {'diagnostics', 'stage', 'cached'}.
+        """
+        key = content_key(language, code)
+        lint_key = content_key(language, code, 'lint')
+        entry = self._cached(key, lint_key)
+        if entry is not None:
+            return dict(entry, cached=True)
+
+        if language == 'python':
+            entry = {'diagnostics': lint_python(code), 'stage': 'parser'}
+            self._store(key, entry)
+            with self._lock:
+                self.lint_only += 1
+            return dict(entry, cached=False)
+
+        diagnostics = lint_c_family(code) if language in ('c', 'cpp') else []
+        reliable = [diagnostic for diagnostic in diagnostics if RELIABLE_LINT.match(diagnostic['message'])]
+        if reliable or compile_check is None:
+            entry = {'diagnostics': reliable or diagnostics, 'stage': 'lint'}
+            if reliable:
+                self._store(lint_key, entry)
+                with self._lock:
+                    self.lint_only += 1
+            return dict(entry, cached=False)
+
+        result = compile_check(language, code)
+        with self._lock:
+            self.escalated += 1
+        source = result.get('compiler') or ('javac' if language == 'java' else language)
+        # compiler_output has the warnings of a successful compile as well
+        output = result.get('compiler_output') or result.get('error', '')
+        diagnostics = parse_compiler_output(output, source, source_file_name(language, code))
+        entry = {'diagnostics': diagnostics, 'stage': 'compiler'}
+        if not diagnostics and not result.get('success'):
+            # A failure without file:line output (no public class, no JDK, a
+            # timeout) may not be about the code, so it isn't cached
+            message = result.get('error') or 'Compilation failed'
+            entry['diagnostics'] = [_diagnostic(1, 1, message.replace('Compilation Error:\n', '', 1),
+                                                source=source)]
+        else:
+            self._store(key, entry)
+        return dict(entry, cached=False)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._cache),
+                'cache_size': self.cache_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'lint_only': self.lint_only,
+                'escalated': self.escalated
+            }
+
+
+diagnostics_checker = DiagnosticsChecker()
@@ -0,0 +1,243 @@
+"""
+Test-case grading for tasks.
+
+A submission is compiled once with compile_program(); the program is then
+run against every test case in parallel (each in an admission slot of its
+own when served through routes.grade_admitted) and each case's stdout is compared
+with its expected output, ignoring line-ending style and trailing whitespace.
+
+With early exit (the default; COLUNN_GRADING_EARLY_EXIT=0 turns it off)
+stdout is compared as it streams in (line-buffered where the runtime allows)
+and the program is killed at the first line that can no longer match, so a
+wrong answer costs milliseconds instead of the full time limit. Wrong
+answers report where they diverge.
+"""
+import os
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from code_executor import compile_program
+from process_runner import stage_stats
+
+RUN_TIMEOUT = 5
+
+# Parallel runs per grade; defaults to the number of CPUs
+GRADING_WORKERS = int(os.environ.get('COLUNN_GRADING_WORKERS', os.cpu_count() or 2))
+
+# Characters of context shown on each side of a divergence
+DIFF_CONTEXT = 30
+
+
+def normalize_output(text):
+    """Canonical form for comparison: \\n line endings, no trailing whitespace or blank lines"""
+    lines = text.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    return '\n'.join(line.rstrip() for line in lines).rstrip('\n')
+
+
+def _snippet(line, column):
+    """The part of line around column, or None for a missing line"""
+    if line is None:
+        return None
+    start = max(column - 1 - DIFF_CONTEXT, 0)
+    end = column - 1 + DIFF_CONTEXT
+    return ('...' if start else '') + line[start:end] + ('...' if end < len(line) else '')
+
+
+def divergence(line_number, expected_line, actual_line):
+    """
+    Compact diff for the first differing line: 1-based line and column plus
+    the expected and actual text around that column (None past the end).
+    """
+    column = 1
+    if expected_line is not None and actual_line is not None:
+        column = len(os.path.commonprefix([expected_line, actual_line])) + 1
+    return {
+        'line': line_number,
+        'column': column,
+        'expected': _snippet(expected_line, column),
+        'actual': _snippet(actual_line, column)
+    }
+
+
+def first_divergence(actual, expected):
+    """divergence() for two normalized outputs, or None when they are equal"""
+    actual_lines = actual.split('\n') if actual else []
+    expected_lines = expected.split('\n') if expected else []
+    for index in range(max(len(actual_lines), len(expected_lines))):
+        actual_line = actual_lines[index] if index < len(actual_lines) else None
+        expected_line = expected_lines[index] if index < len(expected_lines) else None
+        if actual_line != expected_line:
+            return divergence(index + 1, expected_line, actual_line)
+    return None
+
+
+class OutputMismatch(Exception):
+    """Raised from the output callback to stop a run that can no longer pass"""
+
+    def __init__(self, diff):
+        super().__init__(f"Output diverges at line {diff['line']}, column {diff['column']}")
+        self.diff = diff
+
+
+class OutputMatcher:
+    """
+    on_output callback that checks stdout against the expected output as it
+    arrives, under normalize_output() rules, and raises OutputMismatch as soon
+    as the result is certain to differ: a finished line that isn't the
+    expected one, a partial line that can't become it, or anything but
+    whitespace past the end of the expected output.
+    """
+
+    def __init__(self, expected):
+        normalized = normalize_output(expected)
+        self.expected_lines = normalized.split('\n') if normalized else []
+        self.line = 0
+        self.partial = ''
+        # A chunk ending in \r may be the first half of \r\n
+        self.pending_cr = False
+        self.chunks = []
+
+    def _expected(self, index):
+        return self.expected_lines[index] if index < len(self.expected_lines) else ''
+
+    def _mismatch(self, actual_line):
+        expected_line = self.expected_lines[self.line] if self.line < len(self.expected_lines) else None
+        raise OutputMismatch(divergence(self.line + 1, expected_line, actual_line))
+
+    def __call__(self, stream, text):
+        if stream != 'stdout':
+            return
+        self.chunks.append(text)
+
+        if self.pending_cr:
+            text = '\r' + text
+        self.pending_cr = text.endswith('\r')
+        if self.pending_cr:
+            text = text[:-1]
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+
+        *complete, self.partial = (self.partial + text).split('\n')
+        for line in complete:
+            line = line.rstrip()
+            if line != self._expected(self.line):
+                self._mismatch(line)
+            self.line += 1
+
+        # The line so far must still be able to become the expected one
+        expected = self._expected(self.line)
+        if not expected.startswith(self.partial) and self.partial.rstrip() != expected:
+            self._mismatch(self.partial.rstrip())
+
+    def output(self):
+        """Everything received on stdout"""
+        return ''.join(self.chunks)
+
+
+def early_exit_enabled():
+    """Streaming comparison is on by default; COLUNN_GRADING_EARLY_EXIT=0 turns it off"""
+    return os.environ.get('COLUNN_GRADING_EARLY_EXIT', '1') != '0'
+
+
+def _run_case(program, index, case, timeout, early_exit=True):
+    """Run one test case and classify the outcome"""
+    started = time.monotonic()
+    outcome = {
+        'index': index,
+        'passed': False,
+        'status': '',
+        'output': '',
+        'error': '',
+        'execution_time': 0.0,
+        'stats': None
+    }
+
+    expected = case['expected_output'] or ''
+    matcher = OutputMatcher(expected) if early_exit else None
+    try:
+        process = program.run(case['stdin'] or '', timeout, on_output=matcher, line_buffered=early_exit)
+    except subprocess.TimeoutExpired as e:
+        outcome['status'] = 'timeout'
+        outcome['error'] = 'Execution timeout - program took too long to run'
+        outcome['stats'] = getattr(e, 'stats', None)
+    except OutputMismatch as e:
+        # The program was killed at the first line that could not match
+        outcome['status'] = 'wrong_answer'
+        outcome['output'] = matcher.output()
+        outcome['diff'] = e.diff
+        outcome['early_exit'] = True
+        outcome['stats'] = getattr(e, 'stats', None) or stage_stats(time.monotonic() - started)
+    else:
+        # Runners that don't stream (the warm JVM) still capture stdout
+        outcome['output'] = process.stdout or (matcher.output() if matcher else '')
+        outcome['stats'] = process.stats
+        if process.output_truncated:
+            outcome['status'] = 'output_limit'
+            outcome['error'] = 'Output limit exceeded'
+        elif process.returncode != 0:
+            outcome['status'] = 'runtime_error'
+            outcome['error'] = f"Runtime Error:\n{process.stderr}"
+        else:
+            diff = first_divergence(normalize_output(outcome['output']), normalize_output(expected))
+            if diff is None:
+                outcome['status'] = 'passed'
+                outcome['passed'] = True
+            else:
+                outcome['status'] = 'wrong_answer'
+                outcome['diff'] = diff
+
+    outcome['execution_time'] = round(time.monotonic() - started, 3)
+    return outcome
+
+
+def grade_submission(language, code, test_cases, timeout=RUN_TIMEOUT, early_exit=None):
+    """
+    Compile once and run against test_cases ([{'stdin', 'expected_output'}, ...]).
+    Returns the compile result extended with 'time_limit' (timeout), 'passed',
+    'total' and per-case 'cases'; 'success' is True only when every case passed. Wrong answers
+    carry 'diff' (see divergence()); early_exit defaults to early_exit_enabled().
+    """
+    start_time = time.monotonic()
+    result, program = compile_program(language, code, grading=True)
+    return grade_program(result, program, test_cases, timeout, early_exit, start_time=start_time)
+
+
+def grade_program(result, program, test_cases, timeout=RUN_TIMEOUT, early_exit=None, slot=None, start_time=None):
+    """
+    grade_submission for an existing compile_program(language, code,
+    grading=True) result and program, which is closed afterwards. Each test
+    case runs holding slot() when given (e.g. an admission slot), so cases
+    run in parallel only as far as slots allow.
+    """
+    if early_exit is None:
+        early_exit = early_exit_enabled()
+    if start_time is None:
+        start_time = time.monotonic()
+    slot = slot or nullcontext
+    result['time_limit'] = timeout
+    result['total'] = len(test_cases)
+    result['passed'] = 0
+    result['cases'] = []
+
+    if program is None:
+        result['execution_time'] = round(time.monotonic() - start_time, 3)
+        return result
+
+    def run_case(index, case):
+        with slot():
+            return _run_case(program, index, case, timeout, early_exit)
+
+    try:
+        workers = max(1, min(GRADING_WORKERS, len(test_cases)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(run_case, index, case) for index, case in enumerate(test_cases, start=1)]
+            result['cases'] = [future.result() for future in futures]
+    finally:
+        program.close()
+
+    result['passed'] = sum(1 for case in result['cases'] if case['passed'])
+    result['success'] = result['passed'] == result['total']
+    result['output'] = f"Passed {result['passed']} of {result['total']} test cases"
+    result['execution_time'] = round(time.monotonic() - start_time, 3)
+    return result
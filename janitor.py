@@ -0,0 +1,208 @@
+"""
+Background cleanup of what executions leave behind.
+
+Timeouts kill a run's whole session, but a program can still escape it
+(setsid() in a forked child), and a worker that dies mid-run leaks its
+children and workspaces. Every COLUNN_JANITOR_INTERVAL seconds the janitor:
+
+- kills processes carrying RUN_OWNER_ENV whose owning worker is gone, or
+  that have been alive longer than COLUNN_JANITOR_MAX_AGE seconds (far past
+  any compile or run timeout);
+- removes workspaces of workers that are no longer running, and overflow
+  workspaces older than the max age;
+- removes half-written cache files (*.tmp) older than the max age.
+
+Each sweep is idempotent, so every worker process can run its own janitor.
+"""
+import os
+import shutil
+import signal
+import threading
+import time
+
+from compile_cache import compile_cache
+from process_runner import RUN_OWNER_ENV
+from result_cache import result_cache
+from workspace import workspace_pool
+
+DEFAULT_INTERVAL = 30
+DEFAULT_MAX_AGE = 300
+
+PROC_ROOT = '/proc'
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _owner_pid(name):
+    """Worker pid in a workspace name (ws-<pid>-<n>, overflow-<pid>-<suffix>), or None"""
+    parts = name.split('-')
+    if len(parts) >= 3 and parts[0] in ('ws', 'overflow') and parts[1].isdigit():
+        return int(parts[1])
+    return None
+
+
+def _process_age(pid, uptime):
+    # starttime is field 22 of /proc/<pid>/stat, in clock ticks after boot;
+    # the command name (field 2) may contain spaces, so split after it
+    with open(os.path.join(PROC_ROOT, str(pid), 'stat')) as stat_file:
+        fields = stat_file.read().rsplit(')', 1)[1].split()
+    return uptime - int(fields[19]) / os.sysconf('SC_CLK_TCK')
+
+
+def _run_owner(pid):
+    """The RUN_OWNER_ENV value a process was started with, or None"""
+    marker = f'{RUN_OWNER_ENV}='.encode()
+    with open(os.path.join(PROC_ROOT, str(pid), 'environ'), 'rb') as environ_file:
+        for entry in environ_file.read().split(b'\0'):
+            if entry.startswith(marker):
+                value = entry[len(marker):]
+                return int(value) if value.isdigit() else None
+    return None
+
+
+class Janitor:
+    """
+    Periodic sweeper for stray executor processes, stale workspaces and
+    abandoned temp files.
+    """
+
+    def __init__(self, interval=None, max_age=None):
+        self.interval = interval or int(os.environ.get('COLUNN_JANITOR_INTERVAL', DEFAULT_INTERVAL))
+        self.max_age = max_age or int(os.environ.get('COLUNN_JANITOR_MAX_AGE', DEFAULT_MAX_AGE))
+        self._lock = threading.Lock()
+        self._started = False
+        self.sweeps = 0
+        self.processes_killed = 0
+        self.workspaces_removed = 0
+        self.temp_files_removed = 0
+        self.last_sweep = None
+
+    def start(self):
+        """Sweep in a daemon thread every interval seconds"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+
+        def loop():
+            while True:
+                time.sleep(self.interval)
+                try:
+                    self.sweep()
+                except Exception:
+                    pass
+
+        threading.Thread(target=loop, name='janitor', daemon=True).start()
+
+    def sweep(self):
+        """Run one cleanup pass; returns what it removed"""
+        cleaned = {
+            'processes_killed': self._kill_strays(),
+            'workspaces_removed': self._remove_stale_workspaces(),
+            'temp_files_removed': self._remove_temp_files()
+        }
+        with self._lock:
+            self.sweeps += 1
+            self.processes_killed += cleaned['processes_killed']
+            self.workspaces_removed += cleaned['workspaces_removed']
+            self.temp_files_removed += cleaned['temp_files_removed']
+            self.last_sweep = time.time()
+        return cleaned
+
+    def _kill_strays(self):
+        try:
+            with open(os.path.join(PROC_ROOT, 'uptime')) as uptime_file:
+                uptime = float(uptime_file.read().split()[0])
+            pids = [int(name) for name in os.listdir(PROC_ROOT) if name.isdigit()]
+        except OSError:
+            # No procfs to inspect
+            return 0
+
+        killed = 0
+        own_pid = os.getpid()
+        for pid in pids:
+            if pid == own_pid:
+                continue
+            try:
+                owner = _run_owner(pid)
+                if owner is None:
+                    continue
+                if _alive(owner) and _process_age(pid, uptime) <= self.max_age:
+                    continue
+                os.kill(pid, signal.SIGKILL)
+                killed += 1
+            except (OSError, ValueError, IndexError):
+                # Exited meanwhile, or not ours to inspect
+                continue
+        return killed
+
+    def _remove_stale_workspaces(self):
+        root = workspace_pool.root
+        try:
+            entries = list(os.scandir(root))
+        except OSError:
+            return 0
+
+        removed = 0
+        cutoff = time.time() - self.max_age
+        own_pid = os.getpid()
+        for entry in entries:
+            owner = _owner_pid(entry.name)
+            if owner == own_pid:
+                continue
+            try:
+                if not entry.is_dir(follow_symlinks=False):
+                    continue
+                if owner is not None:
+                    stale = not _alive(owner)
+                else:
+                    # Overflow directories from before they carried a pid
+                    stale = entry.name.startswith('overflow-') and entry.stat().st_mtime < cutoff
+            except OSError:
+                continue
+            if stale:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+        return removed
+
+    def _remove_temp_files(self):
+        removed = 0
+        cutoff = time.time() - self.max_age
+        for cache_dir in (compile_cache.cache_dir, result_cache.cache_dir):
+            try:
+                entries = list(os.scandir(cache_dir))
+            except OSError:
+                continue
+            for entry in entries:
+                if not entry.name.endswith('.tmp'):
+                    continue
+                try:
+                    if entry.stat().st_mtime < cutoff:
+                        os.unlink(entry.path)
+                        removed += 1
+                except OSError:
+                    continue
+        return removed
+
+    def stats(self):
+        with self._lock:
+            return {
+                'interval': self.interval,
+                'max_age': self.max_age,
+                'sweeps': self.sweeps,
+                'processes_killed': self.processes_killed,
+                'workspaces_removed': self.workspaces_removed,
+                'temp_files_removed': self.temp_files_removed,
+                'last_sweep': self.last_sweep
+            }
+
+
+janitor = Janitor()
@@ -0,0 +1,294 @@
+"""
+Persistent JVM runner for Java submissions.
+
+Keeps a small pool of long-lived JVMs running jvm/ColunnRunner.java, which
+compiles each submission in memory and runs its main() in a fresh class
+loader. A JVM is killed and replaced when a submission exceeds its
+wall-clock limit, calls System.exit(), leaves threads behind, or once it
+has served too many runs or grown too large.
+"""
+import hashlib
+import os
+import select
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from functools import lru_cache
+
+from compile_cache import compiler_version
+from process_runner import MAX_OUTPUT_BYTES
+
+RUNNER_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'jvm', 'ColunnRunner.java')
+
+DEFAULT_POOL_SIZE = 2
+DEFAULT_MAX_RUNS = 200
+DEFAULT_MAX_RSS_MB = 512
+
+
+class JvmUnavailable(Exception):
+    """Raised when the JVM service cannot be started or reached"""
+
+
+class JvmTimeout(Exception):
+    """Raised when a compile or run stage exceeds its wall-clock limit"""
+
+    def __init__(self, stage):
+        super().__init__(stage)
+        self.stage = stage
+
+
+def enabled():
+    """JVM runner is on by default when a JDK is present; COLUNN_JVM_RUNNER=0 turns it off"""
+    return (os.environ.get('COLUNN_JVM_RUNNER', '1') != '0'
+            and shutil.which('javac') is not None
+            and shutil.which('java') is not None)
+
+
+@lru_cache(maxsize=None)
+def _runner_classes_dir():
+    """Compile ColunnRunner.java once per source/JDK combination"""
+    javac_path = shutil.which('javac')
+    with open(RUNNER_SOURCE, 'rb') as source_file:
+        digest = hashlib.sha256(source_file.read())
+    digest.update(compiler_version(javac_path).encode('utf-8'))
+
+    classes_dir = os.path.join(tempfile.gettempdir(), f'colunn-jvm-{digest.hexdigest()[:16]}')
+    if os.path.exists(os.path.join(classes_dir, 'ColunnRunner.class')):
+        return classes_dir
+
+    build_dir = tempfile.mkdtemp(prefix='colunn-jvm-build-')
+    compile_process = subprocess.run(
+        [javac_path, '-d', build_dir, RUNNER_SOURCE],
+        capture_output=True,
+        text=True,
+        timeout=60
+    )
+    if compile_process.returncode != 0:
+        shutil.rmtree(build_dir, ignore_errors=True)
+        raise JvmUnavailable(f'Failed to build JVM runner:\n{compile_process.stderr}')
+
+    try:
+        os.rename(build_dir, classes_dir)
+    except OSError:
+        # Another worker finished first
+        shutil.rmtree(build_dir, ignore_errors=True)
+    return classes_dir
+
+
+class _PipeReader:
+    """Deadline-aware reader over a raw pipe fd"""
+
+    def __init__(self, fd):
+        self.fd = fd
+        self.buffer = bytearray()
+
+    def _fill(self, deadline, stage):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise JvmTimeout(stage)
+        ready, _, _ = select.select([self.fd], [], [], remaining)
+        if not ready:
+            raise JvmTimeout(stage)
+        data = os.read(self.fd, 65536)
+        if not data:
+            raise EOFError
+        self.buffer += data
+
+    def read_line(self, deadline, stage):
+        while b'\n' not in self.buffer:
+            self._fill(deadline, stage)
+        line, _, rest = bytes(self.buffer).partition(b'\n')
+        self.buffer = bytearray(rest)
+        return line.decode('ascii')
+
+    def read_exact(self, length, deadline, stage):
+        while len(self.buffer) < length:
+            self._fill(deadline, stage)
+        data = bytes(self.buffer[:length])
+        del self.buffer[:length]
+        return data
+
+
+class JvmRunner:
+    """One long-lived JVM process serving one submission at a time"""
+
+    def __init__(self):
+        java_path = shutil.which('java')
+        if not java_path:
+            raise JvmUnavailable('java not found')
+
+        jvm_options = os.environ.get('COLUNN_JVM_OPTS', '-XX:+UseSerialGC -Xshare:auto').split()
+        try:
+            self.process = subprocess.Popen(
+                [java_path] + jvm_options + ['-cp', _runner_classes_dir(), 'ColunnRunner'],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL
+            )
+        except OSError as e:
+            raise JvmUnavailable(str(e))
+
+        self.reader = _PipeReader(self.process.stdout.fileno())
+        self.runs = 0
+        self.heap_used = 0
+        self.dirty = False
+
+    def run(self, class_name, code, stdin_text='', compile_only=False, compile_timeout=10, run_timeout=5,
+            max_output=None):
+        """
+        Compile and optionally run one submission.
+        Returns {'compiled', 'diagnostics', 'stdout', 'stderr', 'returncode',
+        'output_truncated', 'output_bytes', 'compile_stats', 'run_stats'}; raises JvmTimeout.
+        Stats cover the submission's main thread inside the shared JVM, so
+        there is no per-run RSS or context-switch figure.
+        """
+        if max_output is None:
+            max_output = MAX_OUTPUT_BYTES
+        source = code.encode('utf-8')
+        stdin_bytes = (stdin_text or '').encode('utf-8')
+        header = (f'RUN {class_name} {int(compile_only)} {len(source)} {len(stdin_bytes)} '
+                  f'{max_output}\n').encode('ascii')
+
+        self.runs += 1
+        try:
+            self.process.stdin.write(header + source + stdin_bytes)
+            self.process.stdin.flush()
+
+            deadline = time.monotonic() + compile_timeout
+            _, compiled, diagnostics_length, compile_wall, compile_cpu, compile_cached = \
+                self.reader.read_line(deadline, 'compile').split()
+            diagnostics = self.reader.read_exact(int(diagnostics_length), deadline, 'compile')
+            outcome = {
+                'compiled': compiled == '1',
+                'diagnostics': diagnostics.decode('utf-8', errors='replace'),
+                'stdout': '',
+                'stderr': '',
+                'returncode': 0,
+                'output_truncated': False,
+                'output_bytes': 0,
+                'compile_stats': {
+                    'wall_time': round(int(compile_wall) / 1e9, 6),
+                    'cpu_time': round(int(compile_cpu) / 1e9, 6),
+                    'cached': compile_cached == '1'
+                },
+                'run_stats': None
+            }
+            if not outcome['compiled'] or compile_only:
+                return outcome
+
+            deadline = time.monotonic() + run_timeout
+            (_, exit_code, stdout_length, stderr_length, heap_used, leftover_threads,
+             truncated, output_bytes, run_wall, run_cpu, run_user) = self.reader.read_line(deadline, 'run').split()
+            stdout = self.reader.read_exact(int(stdout_length), deadline, 'run')
+            stderr = self.reader.read_exact(int(stderr_length), deadline, 'run')
+        except JvmTimeout:
+            self.close()
+            raise
+        except (OSError, EOFError, ValueError) as e:
+            self.close()
+            raise JvmUnavailable(f'JVM runner failed: {e}')
+
+        returncode = int(exit_code)
+        if returncode == -1:
+            # The submission called System.exit(); the JVM is going away
+            try:
+                returncode = self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                returncode = 1
+            self.close()
+        elif int(leftover_threads) > 0:
+            # Threads started by the submission are still running
+            self.dirty = True
+
+        self.heap_used = int(heap_used)
+        outcome.update({
+            'stdout': stdout.decode('utf-8', errors='replace'),
+            'stderr': stderr.decode('utf-8', errors='replace'),
+            'returncode': returncode,
+            'output_truncated': truncated == '1',
+            'output_bytes': int(output_bytes),
+            'run_stats': {
+                'wall_time': round(int(run_wall) / 1e9, 6),
+                'user_cpu': round(int(run_user) / 1e9, 6),
+                'sys_cpu': round((int(run_cpu) - int(run_user)) / 1e9, 6),
+                'heap_used_bytes': self.heap_used
+            }
+        })
+        return outcome
+
+    def rss_bytes(self):
+        """Resident set size of the JVM from /proc, or 0 when unavailable"""
+        try:
+            with open(f'/proc/{self.process.pid}/status') as status_file:
+                for line in status_file:
+                    if line.startswith('VmRSS:'):
+                        return int(line.split()[1]) * 1024
+        except (OSError, ValueError):
+            pass
+        return 0
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def close(self):
+        if self.process.poll() is None:
+            self.process.kill()
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            pass
+        for stream in (self.process.stdin, self.process.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+
+class JvmPool:
+    """
+    Bounded pool of JVM runners with recycling after N runs or memory growth.
+    """
+
+    def __init__(self, size=None, max_runs=None, max_rss_mb=None):
+        self.size = size or int(os.environ.get('COLUNN_JVM_POOL_SIZE', DEFAULT_POOL_SIZE))
+        self.max_runs = max_runs or int(os.environ.get('COLUNN_JVM_MAX_RUNS', DEFAULT_MAX_RUNS))
+        self.max_rss_bytes = (max_rss_mb or int(os.environ.get('COLUNN_JVM_MAX_RSS_MB', DEFAULT_MAX_RSS_MB))) * 1024 * 1024
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._idle = []
+        self._lock = threading.Lock()
+        self.recycled = 0
+
+    def _take(self):
+        with self._lock:
+            while self._idle:
+                runner = self._idle.pop()
+                if runner.alive():
+                    return runner
+        return JvmRunner()
+
+    def _give(self, runner):
+        if (not runner.alive() or runner.dirty
+                or runner.runs >= self.max_runs
+                or runner.rss_bytes() > self.max_rss_bytes):
+            runner.close()
+            with self._lock:
+                self.recycled += 1
+            return
+        with self._lock:
+            self._idle.append(runner)
+
+    def run(self, class_name, code, stdin_text='', compile_only=False, compile_timeout=10, run_timeout=5,
+            max_output=None):
+        """Run a submission on a pooled JVM; see JvmRunner.run"""
+        with self._slots:
+            runner = self._take()
+            try:
+                return runner.run(class_name, code, stdin_text, compile_only, compile_timeout, run_timeout,
+                                  max_output)
+            finally:
+                self._give(runner)
+
+
+jvm_pool = JvmPool()
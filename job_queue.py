@@ -0,0 +1,318 @@
+"""
+Asynchronous execution queue.
+
+Web handlers submit work and return a job id immediately; a bounded pool of
+executor threads drains the queue. Executor capacity is sized separately from
+HTTP capacity via COLUNN_EXECUTOR_WORKERS and COLUNN_JOB_QUEUE_SIZE.
+
+The queue is shortest-job-first rather than FIFO. Each job belongs to a lane
+(interactive or grading, short or long): its cost is predicted from the
+execution_time of past jobs with the same (task, language, kind), and it is
+due at its submission time plus a delay that grows with the prediction
+(COLUNN_SJF_STRETCH times the cost, at most COLUNN_SJF_MAX_DELAY seconds)
+plus COLUNN_GRADING_LANE_DELAY for grading jobs. Workers take the job due
+first, so short jobs overtake long ones but a long job waits no longer than
+its delay once it is due. Jobs predicted to take more than
+COLUNN_SJF_SHORT_SECONDS are long, and COLUNN_SHORT_WORKERS workers are kept
+free of them so a burst of heavy jobs cannot hold every worker.
+
+Jobs live in the memory of the process that accepted them, so job mode
+expects clients to poll the same process (one gunicorn worker with threads,
+or sticky routing).
+"""
+import itertools
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+DEFAULT_QUEUE_SIZE = 256
+DEFAULT_RESULT_TTL = 600
+
+LANES = ('interactive', 'grading')
+
+DEFAULT_SHORT_SECONDS = 1.0
+DEFAULT_STRETCH = 10.0
+DEFAULT_MAX_DELAY = 30.0
+DEFAULT_GRADING_DELAY = 2.0
+
+# Predicted seconds for a (task, language, kind) with no history yet
+DEFAULT_COSTS = {'c': 0.3, 'cpp': 0.8, 'java': 1.5, 'python': 0.3}
+DEFAULT_COST = 1.0
+
+# Smoothing factor for the moving average of execution times
+EWMA_ALPHA = 0.3
+
+# Queue waits kept per lane for the percentiles in stats()
+WAIT_SAMPLES = 256
+
+
+class QueueFull(Exception):
+    """Raised when the pending queue has reached its bound"""
+
+
+class CostModel:
+    """
+    Moving average of execution time per (task id or None, language, kind),
+    falling back to the language's average across tasks for unseen keys.
+    """
+
+    def __init__(self):
+        self._costs = {}
+        self._lock = threading.Lock()
+
+    def predict(self, key):
+        if key is None:
+            return DEFAULT_COST
+        task, language, kind = key
+        with self._lock:
+            cost = self._costs.get(key)
+            if cost is None:
+                cost = self._costs.get((None, language, kind))
+        if cost is None:
+            cost = DEFAULT_COSTS.get(language, DEFAULT_COST)
+        return cost
+
+    def record(self, key, seconds):
+        if key is None:
+            return
+        task, language, kind = key
+        keys = [key] if task is None else [key, (None, language, kind)]
+        with self._lock:
+            for each in keys:
+                cost = self._costs.get(each)
+                self._costs[each] = seconds if cost is None else cost + EWMA_ALPHA * (seconds - cost)
+
+    def stats(self):
+        with self._lock:
+            return {'keys': len(self._costs)}
+
+
+def _percentile(samples, fraction):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 6)
+
+
+def _execution_time(result, elapsed):
+    """The job's own execution_time when its result reports one"""
+    if isinstance(result, dict) and isinstance(result.get('execution_time'), (int, float)):
+        return result['execution_time']
+    return elapsed
+
+
+class Job:
+    """A unit of queued work and its lifecycle timestamps"""
+
+    def __init__(self, fn, args, kwargs, lane='interactive', cost_key=None, predicted_cost=DEFAULT_COST):
+        self.id = uuid.uuid4().hex
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.lane = lane
+        self.cost_key = cost_key
+        self.predicted_cost = predicted_cost
+        self.short = True
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        # (due time on the monotonic clock, submission order); smallest runs first
+        self.sort_key = None
+        # Bumped on every status change so subscribers can wait for updates
+        self.version = 0
+
+    @property
+    def lane_name(self):
+        return f"{self.lane}-{'short' if self.short else 'long'}"
+
+    def to_dict(self, position=None):
+        data = {
+            'job_id': self.id,
+            'status': self.status,
+            'lane': self.lane_name,
+            'predicted_cost': round(self.predicted_cost, 3),
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+        if position is not None:
+            data['position'] = position
+        if self.status == 'done':
+            data['result'] = self.result
+        elif self.status == 'failed':
+            data['error'] = self.error
+        return data
+
+
+class JobQueue:
+    """
+    Shortest-job-first queue with aging, drained by a fixed pool of daemon
+    worker threads.
+    """
+
+    def __init__(self, workers=None, max_pending=None, result_ttl=None):
+        self.workers = workers or int(os.environ.get('COLUNN_EXECUTOR_WORKERS', os.cpu_count() or 2))
+        self.max_pending = max_pending or int(os.environ.get('COLUNN_JOB_QUEUE_SIZE', DEFAULT_QUEUE_SIZE))
+        self.result_ttl = result_ttl or int(os.environ.get('COLUNN_JOB_TTL', DEFAULT_RESULT_TTL))
+        self.short_seconds = float(os.environ.get('COLUNN_SJF_SHORT_SECONDS', DEFAULT_SHORT_SECONDS))
+        self.stretch = float(os.environ.get('COLUNN_SJF_STRETCH', DEFAULT_STRETCH))
+        self.max_delay = float(os.environ.get('COLUNN_SJF_MAX_DELAY', DEFAULT_MAX_DELAY))
+        self.grading_delay = float(os.environ.get('COLUNN_GRADING_LANE_DELAY', DEFAULT_GRADING_DELAY))
+        # With a single worker there is nothing to keep back
+        reserved = int(os.environ.get('COLUNN_SHORT_WORKERS', 1 if self.workers > 1 else 0))
+        self.long_workers = max(1, self.workers - reserved)
+        self.costs = CostModel()
+        self._pending = []
+        self._jobs = {}
+        self._running = 0
+        self._running_long = 0
+        self._order = itertools.count()
+        self._waits = {}
+        self._dispatched = {}
+        self._condition = threading.Condition()
+        self._threads = []
+
+    def _start_workers(self):
+        # Called with the condition held
+        if self._threads:
+            return
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f'executor-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _prune(self):
+        # Called with the condition held
+        cutoff = time.time() - self.result_ttl
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def submit(self, fn, *args, lane='interactive', cost_key=None, **kwargs):
+        """
+        Queue fn(*args, **kwargs) in lane ('interactive' or 'grading') and
+        return its Job. cost_key (task id or None, language, kind) selects the
+        history its cost is predicted from. Raises QueueFull.
+        """
+        predicted = self.costs.predict(cost_key)
+        job = Job(fn, args, kwargs, lane, cost_key, predicted)
+        job.short = predicted <= self.short_seconds
+        delay = min(predicted * self.stretch, self.max_delay)
+        if lane == 'grading':
+            delay += self.grading_delay
+        job.sort_key = (time.monotonic() + delay, next(self._order))
+        with self._condition:
+            self._prune()
+            if len(self._pending) >= self.max_pending:
+                raise QueueFull('Executor queue is full')
+            self._start_workers()
+            self._jobs[job.id] = job
+            self._pending.append(job)
+            self._condition.notify_all()
+        return job
+
+    def get(self, job_id):
+        with self._condition:
+            return self._jobs.get(job_id)
+
+    def position(self, job):
+        """Number of jobs due ahead of this one, or None once it has started"""
+        with self._condition:
+            if job.status != 'queued':
+                return None
+            return sum(1 for other in self._pending if other.sort_key < job.sort_key)
+
+    def _next_job(self):
+        """The pending job due first that may start now, or None"""
+        # Called with the condition held
+        long_allowed = self._running_long < self.long_workers
+        eligible = [job for job in self._pending if job.short or long_allowed]
+        return min(eligible, key=lambda job: job.sort_key, default=None)
+
+    def describe(self, job):
+        """Job status dict including its current queue position"""
+        return job.to_dict(self.position(job))
+
+    def wait_for_update(self, job, seen_version, timeout):
+        """Block until the job changes past seen_version or timeout; returns the new version"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while job.version == seen_version:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            return job.version
+
+    def _set_status(self, job, status):
+        # Called with the condition held
+        job.status = status
+        job.version += 1
+        self._condition.notify_all()
+
+    def _worker(self):
+        while True:
+            with self._condition:
+                job = self._next_job()
+                while job is None:
+                    self._condition.wait()
+                    job = self._next_job()
+                self._pending.remove(job)
+                self._running += 1
+                self._running_long += not job.short
+                job.started_at = time.time()
+                self._dispatched[job.lane_name] = self._dispatched.get(job.lane_name, 0) + 1
+                self._waits.setdefault(job.lane_name, deque(maxlen=WAIT_SAMPLES)).append(
+                    job.started_at - job.created_at)
+                self._set_status(job, 'running')
+
+            try:
+                result = job.fn(*job.args, **job.kwargs)
+                status = 'done'
+            except Exception as e:
+                job.error = str(e)
+                result = None
+                status = 'failed'
+
+            with self._condition:
+                self._running -= 1
+                self._running_long -= not job.short
+                job.result = result
+                job.finished_at = time.time()
+                self._set_status(job, status)
+            if status == 'done':
+                self.costs.record(job.cost_key, _execution_time(result, job.finished_at - job.started_at))
+
+    def stats(self):
+        with self._condition:
+            lanes = {}
+            for lane in LANES:
+                for size in ('short', 'long'):
+                    name = f'{lane}-{size}'
+                    waits = self._waits.get(name, ())
+                    lanes[name] = {
+                        'pending': sum(1 for job in self._pending if job.lane_name == name),
+                        'dispatched': self._dispatched.get(name, 0),
+                        'p50_wait': _percentile(waits, 0.5),
+                        'p95_wait': _percentile(waits, 0.95)
+                    }
+            return {
+                'workers': self.workers,
+                'long_workers': self.long_workers,
+                'pending': len(self._pending),
+                'running': self._running,
+                'running_long': self._running_long,
+                'max_pending': self.max_pending,
+                'tracked_jobs': len(self._jobs),
+                'lanes': lanes,
+                'cost_model': self.costs.stats()
+            }
+
+
+job_queue = JobQueue()
@@ -0,0 +1,413 @@
+import javax.tools.Diagnostic;
+import javax.tools.DiagnosticCollector;
+import javax.tools.FileObject;
+import javax.tools.ForwardingJavaFileManager;
+import javax.tools.JavaCompiler;
+import javax.tools.JavaFileObject;
+import javax.tools.SimpleJavaFileObject;
+import javax.tools.StandardJavaFileManager;
+import javax.tools.ToolProvider;
+import java.io.BufferedInputStream;
+import java.io.BufferedOutputStream;
+import java.io.ByteArrayInputStream;
+import java.io.ByteArrayOutputStream;
+import java.io.FileDescriptor;
+import java.io.FileInputStream;
+import java.io.FileOutputStream;
+import java.io.IOException;
+import java.io.InputStream;
+import java.io.OutputStream;
+import java.io.PrintStream;
+import java.lang.management.ManagementFactory;
+import java.lang.management.ThreadMXBean;
+import java.lang.reflect.InvocationTargetException;
+import java.lang.reflect.Method;
+import java.net.URI;
+import java.nio.charset.StandardCharsets;
+import java.util.ArrayList;
+import java.util.HashMap;
+import java.util.LinkedHashMap;
+import java.util.List;
+import java.util.Locale;
+import java.util.Map;
+
+/**
+ * Long-lived JVM service used by java_runner.py.
+ *
+ * Protocol (stdin/stdout of this process, lengths in bytes):
+ *   request:  RUN <className> <compileOnly 0|1> <sourceLength> <stdinLength> <maxOutput>\n<source><stdin>
+ *   reply:    COMPILED <ok 0|1> <diagnosticsLength> <wallNanos> <cpuNanos> <cached 0|1>\n<diagnostics>
+ *   then, if compiled and not compile-only:
+ *             DONE <exitCode> <stdoutLength> <stderrLength> <heapUsed> <leftoverThreads> <truncated 0|1>
+ *                  <outputBytes> <wallNanos> <cpuNanos> <userNanos>\n<stdout><stderr>   (one line)
+ *
+ * Each submission is compiled in memory and loaded by its own class loader.
+ * Compiled classes are kept for recently seen sources, so running the same
+ * program against several inputs compiles it once.
+ * Wall-clock limits are enforced by the Python side killing this process.
+ */
+public class ColunnRunner {
+    private static final InputStream PROTOCOL_IN = new BufferedInputStream(new FileInputStream(FileDescriptor.in));
+    private static final OutputStream PROTOCOL_OUT = new BufferedOutputStream(new FileOutputStream(FileDescriptor.out));
+    private static final ThreadMXBean THREADS = ManagementFactory.getThreadMXBean();
+    private static final int COMPILED_CACHE_SIZE = 64;
+
+    /** Recently compiled sources, least recently used first */
+    private static final Map<String, Compiled> COMPILED = new LinkedHashMap<>(16, 0.75f, true) {
+        @Override
+        protected boolean removeEldestEntry(Map.Entry<String, Compiled> eldest) {
+            return size() > COMPILED_CACHE_SIZE;
+        }
+    };
+
+    private static ByteArrayOutputStream currentOut;
+    private static ByteArrayOutputStream currentErr;
+    private static OutputBudget currentBudget;
+    private static long currentStartedNanos;
+    private static boolean responded = true;
+
+    public static void main(String[] args) throws Exception {
+        JavaCompiler compiler = ToolProvider.getSystemJavaCompiler();
+        StandardJavaFileManager standardFileManager =
+                compiler.getStandardFileManager(null, null, StandardCharsets.UTF_8);
+
+        // Report captured output if a submission calls System.exit()
+        Runtime.getRuntime().addShutdownHook(new Thread(() -> sendDone(-1, 0, 0, 0)));
+
+        String header;
+        while ((header = readLine()) != null) {
+            String[] parts = header.split(" ");
+            if (parts.length != 6 || !parts[0].equals("RUN")) {
+                return;
+            }
+            String className = parts[1];
+            boolean compileOnly = parts[2].equals("1");
+            String source = new String(readBytes(Integer.parseInt(parts[3])), StandardCharsets.UTF_8);
+            byte[] stdin = readBytes(Integer.parseInt(parts[4]));
+            long maxOutput = Long.parseLong(parts[5]);
+
+            long compileStarted = System.nanoTime();
+            long compileCpuStarted = THREADS.getCurrentThreadCpuTime();
+            String cacheKey = className + "\0" + source;
+            Compiled compiled = COMPILED.get(cacheKey);
+            boolean cached = compiled != null;
+            if (!cached) {
+                StringBuilder diagnostics = new StringBuilder();
+                Map<String, byte[]> classes = compile(compiler, standardFileManager, className, source, diagnostics);
+                compiled = new Compiled(classes, diagnostics.toString().getBytes(StandardCharsets.UTF_8));
+                COMPILED.put(cacheKey, compiled);
+            }
+            long compileWall = System.nanoTime() - compileStarted;
+            long compileCpu = THREADS.getCurrentThreadCpuTime() - compileCpuStarted;
+            writeHeader("COMPILED " + (compiled.classes != null ? 1 : 0) + " " + compiled.diagnostics.length
+                    + " " + compileWall + " " + compileCpu + " " + (cached ? 1 : 0));
+            PROTOCOL_OUT.write(compiled.diagnostics);
+            PROTOCOL_OUT.flush();
+
+            if (compiled.classes != null && !compileOnly) {
+                run(className, compiled.classes, stdin, maxOutput);
+            }
+        }
+    }
+
+    private static Map<String, byte[]> compile(JavaCompiler compiler, StandardJavaFileManager standardFileManager,
+                                               String className, String source, StringBuilder diagnostics) {
+        DiagnosticCollector<JavaFileObject> collector = new DiagnosticCollector<>();
+        MemoryFileManager fileManager = new MemoryFileManager(standardFileManager);
+        JavaFileObject sourceFile = new SourceFile(className, source);
+
+        boolean ok = compiler.getTask(null, fileManager, collector, null, null, List.of(sourceFile)).call();
+        formatDiagnostics(collector.getDiagnostics(), className, source, diagnostics);
+        if (!ok) {
+            return null;
+        }
+
+        Map<String, byte[]> classes = new HashMap<>();
+        for (Map.Entry<String, ByteArrayOutputStream> entry : fileManager.classes.entrySet()) {
+            classes.put(entry.getKey(), entry.getValue().toByteArray());
+        }
+        return classes;
+    }
+
+    /** Format diagnostics the way the javac command line does */
+    private static void formatDiagnostics(List<Diagnostic<? extends JavaFileObject>> diagnostics, String className,
+                                          String source, StringBuilder out) {
+        String[] lines = source.split("\n", -1);
+        int errors = 0;
+        int warnings = 0;
+        for (Diagnostic<? extends JavaFileObject> diagnostic : diagnostics) {
+            String kind;
+            if (diagnostic.getKind() == Diagnostic.Kind.ERROR) {
+                kind = "error";
+                errors++;
+            } else if (diagnostic.getKind() == Diagnostic.Kind.WARNING
+                    || diagnostic.getKind() == Diagnostic.Kind.MANDATORY_WARNING) {
+                kind = "warning";
+                warnings++;
+            } else {
+                kind = "note";
+            }
+
+            String[] messageLines = diagnostic.getMessage(Locale.getDefault()).split("\n");
+            long lineNumber = diagnostic.getLineNumber();
+            if (lineNumber == Diagnostic.NOPOS) {
+                out.append(kind).append(": ").append(messageLines[0]).append('\n');
+            } else {
+                out.append(className).append(".java:").append(lineNumber).append(": ")
+                        .append(kind).append(": ").append(messageLines[0]).append('\n');
+                if (lineNumber <= lines.length) {
+                    out.append(lines[(int) lineNumber - 1].replace("\r", "")).append('\n');
+                    long column = Math.max(diagnostic.getColumnNumber(), 1);
+                    out.append(" ".repeat((int) column - 1)).append("^\n");
+                }
+            }
+            for (int i = 1; i < messageLines.length; i++) {
+                out.append(messageLines[i]).append('\n');
+            }
+        }
+        if (errors > 0) {
+            out.append(errors).append(errors == 1 ? " error\n" : " errors\n");
+        }
+        if (warnings > 0) {
+            out.append(warnings).append(warnings == 1 ? " warning\n" : " warnings\n");
+        }
+    }
+
+    private static void run(String className, Map<String, byte[]> classes, byte[] stdin, long maxOutput)
+            throws Exception {
+        OutputBudget budget = new OutputBudget(maxOutput);
+        ByteArrayOutputStream out = new CappedOutputStream(budget);
+        ByteArrayOutputStream err = new CappedOutputStream(budget);
+        PrintStream outStream = new PrintStream(out, true, StandardCharsets.UTF_8);
+        PrintStream errStream = new PrintStream(err, true, StandardCharsets.UTF_8);
+        synchronized (ColunnRunner.class) {
+            currentOut = out;
+            currentErr = err;
+            currentBudget = budget;
+            currentStartedNanos = System.nanoTime();
+            responded = false;
+        }
+
+        System.setIn(new ByteArrayInputStream(stdin));
+        System.setOut(outStream);
+        System.setErr(errStream);
+
+        int[] exitCode = {0};
+        long[] cpuNanos = {0, 0};
+        ClassLoader loader = new MemoryClassLoader(classes);
+        ThreadGroup group = new ThreadGroup("submission");
+        Thread mainThread = new Thread(group, () -> {
+            try {
+                Class<?> mainClass = loader.loadClass(className);
+                Method mainMethod = mainClass.getMethod("main", String[].class);
+                mainMethod.invoke(null, (Object) new String[0]);
+            } catch (InvocationTargetException e) {
+                Throwable cause = e.getCause();
+                exitCode[0] = 1;
+                if (!(cause instanceof OutputLimitExceeded)) {
+                    trimReflectionFrames(cause);
+                    try {
+                        System.err.print("Exception in thread \"main\" ");
+                        cause.printStackTrace();
+                    } catch (OutputLimitExceeded ignored) {
+                        // The trace itself pushed output over the limit
+                    }
+                }
+            } catch (OutputLimitExceeded e) {
+                exitCode[0] = 1;
+            } catch (NoSuchMethodException e) {
+                System.err.println("Error: Main method not found in class " + className
+                        + ", please define the main method as:");
+                System.err.println("   public static void main(String[] args)");
+                exitCode[0] = 1;
+            } catch (Throwable t) {
+                t.printStackTrace();
+                exitCode[0] = 1;
+            } finally {
+                cpuNanos[0] = THREADS.getCurrentThreadCpuTime();
+                cpuNanos[1] = THREADS.getCurrentThreadUserTime();
+            }
+        }, "main");
+        mainThread.start();
+        mainThread.join();
+
+        outStream.flush();
+        errStream.flush();
+        sendDone(exitCode[0], group.activeCount(), cpuNanos[0], cpuNanos[1]);
+    }
+
+    /** Drop the runner's reflective frames below the user's main() */
+    private static void trimReflectionFrames(Throwable throwable) {
+        StackTraceElement[] frames = throwable.getStackTrace();
+        List<StackTraceElement> kept = new ArrayList<>();
+        for (StackTraceElement frame : frames) {
+            String name = frame.getClassName();
+            if (name.startsWith("jdk.internal.reflect.") || name.startsWith("java.lang.reflect.")) {
+                break;
+            }
+            kept.add(frame);
+        }
+        throwable.setStackTrace(kept.toArray(new StackTraceElement[0]));
+    }
+
+    private static synchronized void sendDone(int exitCode, int leftoverThreads, long cpuNanos, long userNanos) {
+        if (responded) {
+            return;
+        }
+        responded = true;
+        try {
+            byte[] out = currentOut.toByteArray();
+            byte[] err = currentErr.toByteArray();
+            Runtime runtime = Runtime.getRuntime();
+            long heapUsed = runtime.totalMemory() - runtime.freeMemory();
+            writeHeader("DONE " + exitCode + " " + out.length + " " + err.length + " " + heapUsed
+                    + " " + leftoverThreads + " " + (currentBudget.exceeded ? 1 : 0) + " " + currentBudget.used
+                    + " " + (System.nanoTime() - currentStartedNanos) + " " + cpuNanos + " " + userNanos);
+            PROTOCOL_OUT.write(out);
+            PROTOCOL_OUT.write(err);
+            PROTOCOL_OUT.flush();
+        } catch (IOException ignored) {
+            // The Python side has gone away; nothing left to report to
+        }
+    }
+
+    private static void writeHeader(String header) throws IOException {
+        PROTOCOL_OUT.write((header + "\n").getBytes(StandardCharsets.US_ASCII));
+    }
+
+    private static String readLine() throws IOException {
+        StringBuilder line = new StringBuilder();
+        int c;
+        while ((c = PROTOCOL_IN.read()) != '\n') {
+            if (c == -1) {
+                return null;
+            }
+            line.append((char) c);
+        }
+        return line.toString();
+    }
+
+    private static byte[] readBytes(int length) throws IOException {
+        byte[] data = PROTOCOL_IN.readNBytes(length);
+        if (data.length != length) {
+            throw new IOException("truncated request");
+        }
+        return data;
+    }
+
+    /** Class files (null when compilation failed) and formatted diagnostics for one source */
+    private static class Compiled {
+        final Map<String, byte[]> classes;
+        final byte[] diagnostics;
+
+        Compiled(Map<String, byte[]> classes, byte[] diagnostics) {
+            this.classes = classes;
+            this.diagnostics = diagnostics;
+        }
+    }
+
+    /** Thrown into the submission once it has printed more than its output budget */
+    private static class OutputLimitExceeded extends Error {
+        OutputLimitExceeded() {
+            super("Output limit exceeded", null, false, false);
+        }
+    }
+
+    /** Combined stdout+stderr byte budget for one run */
+    private static class OutputBudget {
+        final long limit;
+        long used;
+        boolean exceeded;
+
+        OutputBudget(long limit) {
+            this.limit = limit;
+        }
+    }
+
+    /** Keeps at most the budgeted bytes and stops the writer once it is spent */
+    private static class CappedOutputStream extends ByteArrayOutputStream {
+        private final OutputBudget budget;
+
+        CappedOutputStream(OutputBudget budget) {
+            this.budget = budget;
+        }
+
+        @Override
+        public synchronized void write(int b) {
+            write(new byte[]{(byte) b}, 0, 1);
+        }
+
+        @Override
+        public synchronized void write(byte[] b, int off, int len) {
+            int keep;
+            synchronized (budget) {
+                budget.used += len;
+                long over = budget.used - budget.limit;
+                if (over <= 0) {
+                    keep = len;
+                } else {
+                    keep = (int) Math.max(len - over, 0);
+                    budget.exceeded = true;
+                }
+            }
+            super.write(b, off, keep);
+            if (keep < len) {
+                throw new OutputLimitExceeded();
+            }
+        }
+    }
+
+    private static class SourceFile extends SimpleJavaFileObject {
+        private final String source;
+
+        SourceFile(String className, String source) {
+            super(URI.create("string:///" + className + Kind.SOURCE.extension), Kind.SOURCE);
+            this.source = source;
+        }
+
+        @Override
+        public CharSequence getCharContent(boolean ignoreEncodingErrors) {
+            return source;
+        }
+    }
+
+    private static class MemoryFileManager extends ForwardingJavaFileManager<StandardJavaFileManager> {
+        final Map<String, ByteArrayOutputStream> classes = new HashMap<>();
+
+        MemoryFileManager(StandardJavaFileManager fileManager) {
+            super(fileManager);
+        }
+
+        @Override
+        public JavaFileObject getJavaFileForOutput(Location location, String className, JavaFileObject.Kind kind,
+                                                   FileObject sibling) {
+            URI uri = URI.create("mem:///" + className.replace('.', '/') + kind.extension);
+            return new SimpleJavaFileObject(uri, kind) {
+                @Override
+                public OutputStream openOutputStream() {
+                    ByteArrayOutputStream out = new ByteArrayOutputStream();
+                    classes.put(className, out);
+                    return out;
+                }
+            };
+        }
+    }
+
+    private static class MemoryClassLoader extends ClassLoader {
+        private final Map<String, byte[]> classes;
+
+        MemoryClassLoader(Map<String, byte[]> classes) {
+            super(ClassLoader.getPlatformClassLoader());
+            this.classes = classes;
+        }
+
+        @Override
+        protected Class<?> findClass(String name) throws ClassNotFoundException {
+            byte[] bytes = classes.get(name);
+            if (bytes == null) {
+                throw new ClassNotFoundException(name);
+            }
+            return defineClass(name, bytes, 0, bytes.length);
+        }
+    }
+}
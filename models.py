@@ -27,6 +27,37 @@ class Task(db.Model):
     # Relationship to user progress
     progress = db.relationship('UserProgress', backref='task', lazy=True)
 
+    # Relationship to grading test cases
+    test_cases = db.relationship('TaskTestCase', backref='task', lazy=True,
+                                 order_by='TaskTestCase.order_index')
+
+    # Reference solutions (one per language) that calibrate the run time limit
+    references = db.relationship('TaskReference', backref='task', lazy=True)
+
+class TaskTestCase(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    task_id = db.Column(db.Integer, db.ForeignKey('task.id'), nullable=False)
+    stdin = db.Column(db.Text, default='')
+    expected_output = db.Column(db.Text, nullable=False)
+    order_index = db.Column(db.Integer, default=0)
+
+class TaskReference(db.Model):
+    """
+    A known-good solution for a task. time_limits.py benchmarks it against the
+    task's test cases; runtime is valid while fingerprint matches the current
+    machine and toolchain.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    task_id = db.Column(db.Integer, db.ForeignKey('task.id'), nullable=False)
+    language = db.Column(db.String(20), nullable=False, default='c')
+    code = db.Column(db.Text, nullable=False)
+    runtime = db.Column(db.Float)
+    fingerprint = db.Column(db.String(64))
+    calibration_error = db.Column(db.Text)
+    calibrated_at = db.Column(db.DateTime)
+
+    __table_args__ = (db.UniqueConstraint('task_id', 'language'),)
+
 class UserProgress(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -37,6 +68,90 @@ class UserProgress(db.Model):
     score = db.Column(db.Integer, default=0)
     completed_at = db.Column(db.DateTime)
 
+# Grading test cases for the default tasks, keyed by task title.
+# Expected output is stdout only; stdin is not echoed, so prompts run together.
+DEFAULT_TEST_CASES = {
+    'Hello, World!': [
+        {'stdin': '', 'expected_output': 'Hello, World!'}
+    ],
+    'Variables and User Input': [
+        {'stdin': 'John\n25\n', 'expected_output': 'Enter your name: Enter your age: Hello John, you are 25 years old!'},
+        {'stdin': 'Alice\n30\n', 'expected_output': 'Enter your name: Enter your age: Hello Alice, you are 30 years old!'}
+    ],
+    'Basic Math Operations': [
+        {'stdin': '10\n5\n', 'expected_output': 'Enter first number: Enter second number: Sum: 15\nDifference: 5\nProduct: 50'},
+        {'stdin': '7\n3\n', 'expected_output': 'Enter first number: Enter second number: Sum: 10\nDifference: 4\nProduct: 21'}
+    ],
+    'Conditional Statements': [
+        {'stdin': '7\n', 'expected_output': 'Enter a number: 7 is odd'},
+        {'stdin': '4\n', 'expected_output': 'Enter a number: 4 is even'}
+    ],
+    'Loops': [
+        {'stdin': '5\n', 'expected_output': 'Enter a number: 1\n2\n3\n4\n5'},
+        {'stdin': '3\n', 'expected_output': 'Enter a number: 1\n2\n3'}
+    ]
+}
+
+# Reference solutions for the default tasks, keyed by task title
+DEFAULT_REFERENCE_SOLUTIONS = {
+    'Hello, World!': '#include <stdio.h>\n\nint main() {\n    printf("Hello, World!\\n");\n    return 0;\n}\n',
+    'Variables and User Input': (
+        '#include <stdio.h>\n\nint main() {\n    char name[50];\n    int age;\n\n'
+        '    printf("Enter your name: ");\n    scanf("%49s", name);\n'
+        '    printf("Enter your age: ");\n    scanf("%d", &age);\n'
+        '    printf("Hello %s, you are %d years old!\\n", name, age);\n    return 0;\n}\n'
+    ),
+    'Basic Math Operations': (
+        '#include <stdio.h>\n\nint main() {\n    int num1, num2;\n\n'
+        '    printf("Enter first number: ");\n    scanf("%d", &num1);\n'
+        '    printf("Enter second number: ");\n    scanf("%d", &num2);\n'
+        '    printf("Sum: %d\\n", num1 + num2);\n    printf("Difference: %d\\n", num1 - num2);\n'
+        '    printf("Product: %d\\n", num1 * num2);\n    return 0;\n}\n'
+    ),
+    'Conditional Statements': (
+        '#include <stdio.h>\n\nint main() {\n    int number;\n\n'
+        '    printf("Enter a number: ");\n    scanf("%d", &number);\n'
+        '    if (number % 2 == 0) {\n        printf("%d is even\\n", number);\n'
+        '    } else {\n        printf("%d is odd\\n", number);\n    }\n    return 0;\n}\n'
+    ),
+    'Loops': (
+        '#include <stdio.h>\n\nint main() {\n    int n;\n\n'
+        '    printf("Enter a number: ");\n    scanf("%d", &n);\n'
+        '    for (int i = 1; i <= n; i++) {\n        printf("%d\\n", i);\n    }\n    return 0;\n}\n'
+    )
+}
+
+def add_default_test_cases(task):
+    """Attach the default test cases for a task, if it has any"""
+    for index, case in enumerate(DEFAULT_TEST_CASES.get(task.title, []), start=1):
+        db.session.add(TaskTestCase(task=task, order_index=index, **case))
+
+def initialize_default_test_cases():
+    """Add default test cases to existing tasks that have none"""
+    added = False
+    for task in Task.query.all():
+        if not task.test_cases and task.title in DEFAULT_TEST_CASES:
+            add_default_test_cases(task)
+            added = True
+    if added:
+        db.session.commit()
+
+def add_default_reference(task):
+    """Attach the default C reference solution for a task, if it has one"""
+    code = DEFAULT_REFERENCE_SOLUTIONS.get(task.title)
+    if code is not None:
+        db.session.add(TaskReference(task=task, language='c', code=code))
+
+def initialize_default_references():
+    """Add default reference solutions to existing tasks that have none"""
+    added = False
+    for task in Task.query.all():
+        if not task.references and task.title in DEFAULT_REFERENCE_SOLUTIONS:
+            add_default_reference(task)
+            added = True
+    if added:
+        db.session.commit()
+
 def initialize_default_tasks():
     """Initialize default C programming tasks if they don't exist"""
     if Task.query.count() == 0:
@@ -96,6 +211,8 @@ def initialize_default_tasks():
         for task_data in tasks:
             task = Task(**task_data)
             db.session.add(task)
+            add_default_test_cases(task)
+            add_default_reference(task)
         
         db.session.commit()
         print("Default tasks initialized successfully!")
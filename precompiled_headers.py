@@ -0,0 +1,273 @@
+"""
+Precompiled header bundles for the C and C++ toolchains.
+
+A bundle is a header that #includes a list of standard headers, compiled
+to a .gch next to it for every toolchain (compiler and flags; GCC only
+accepts a .gch built with matching options), under a directory keyed by
+compiler path, compiler version and flags, so a compiler upgrade simply
+builds a fresh set. A submission whose #include lines name exactly a
+bundle's headers is compiled with `-include <bundle>`; GCC then loads the
+.gch instead of parsing the headers again, and silently falls back to the
+plain header if the .gch does not match. A bundle is never used for a
+subset of its headers: the extra declarations can clash with the
+submission's own names.
+
+Bundles configured with COLUNN_PCH_C_BUNDLES and COLUNN_PCH_CPP_BUNDLES
+(bundles separated by ';', headers by ',') are built at startup; any other
+include set gets its bundle built in the background the first time it is
+seen, up to COLUNN_PCH_MAX_BUNDLES per toolchain. COLUNN_PCH=0 turns the
+feature off.
+"""
+import hashlib
+import os
+import queue
+import re
+import shutil
+import tempfile
+import threading
+
+from compile_cache import compiler_version
+from process_runner import run_process
+
+DEFAULT_PCH_DIR = os.path.join(tempfile.gettempdir(), 'colunn-pch')
+DEFAULT_MAX_BUNDLES = 64
+
+DEFAULT_BUNDLES = {
+    'c': 'stdio.h,stdlib.h,string.h,math.h,ctype.h,stdbool.h,limits.h',
+    'cpp': 'iostream,string,vector,algorithm;bits/stdc++.h'
+}
+
+HEADER_LANGUAGE = {'c': 'c-header', 'cpp': 'c++-header'}
+
+INCLUDE_PATTERN = re.compile(r'^\s*#\s*include\s*([<"])([^>"]+)[>"]')
+DIRECTIVE_PATTERN = re.compile(r'^\s*#\s*(\w+)')
+
+
+def enabled():
+    """Precompiled headers are on by default; COLUNN_PCH=0 turns them off"""
+    return os.environ.get('COLUNN_PCH', '1') != '0'
+
+
+def submission_includes(code):
+    """
+    Return the <system> headers the code includes, in order, or None when a
+    bundle can't stand in for them: a "local" include, or a preprocessor
+    directive (e.g. #define _GNU_SOURCE) ahead of the last include that could
+    change what the headers declare.
+    """
+    headers = []
+    directives_seen = False
+    for line in code.splitlines():
+        match = INCLUDE_PATTERN.match(line)
+        if match:
+            if match.group(1) == '"' or directives_seen:
+                return None
+            name = match.group(2).strip()
+            if name not in headers:
+                headers.append(name)
+            continue
+        if DIRECTIVE_PATTERN.match(line):
+            directives_seen = True
+    return headers
+
+
+class HeaderBundle:
+    """One header list and its compiled .gch"""
+
+    def __init__(self, headers):
+        self.headers = headers
+        self.header_path = None
+        self.size = 0
+        self.ready = False
+        self.failed = False
+
+    @property
+    def name(self):
+        digest = hashlib.sha256('\0'.join(sorted(self.headers)).encode('utf-8'))
+        return f'bundle-{digest.hexdigest()[:16]}.h'
+
+
+class Toolchain:
+    """A compiler and flags, and the bundles built for them by header set"""
+
+    def __init__(self, language, compiler_path, flags, bundle_dir):
+        self.language = language
+        self.compiler_path = compiler_path
+        self.flags = flags
+        self.bundle_dir = bundle_dir
+        self.bundles = {}
+
+
+class PrecompiledHeaders:
+    """
+    Builds and hands out precompiled header bundles for gcc and g++.
+    """
+
+    def __init__(self, pch_dir=None, max_bundles=None):
+        self.pch_dir = pch_dir or os.environ.get('COLUNN_PCH_DIR', DEFAULT_PCH_DIR)
+        self.max_bundles = max_bundles or int(os.environ.get('COLUNN_PCH_MAX_BUNDLES', DEFAULT_MAX_BUNDLES))
+        self.toolchains = {}
+        self.hits = 0
+        self.misses = 0
+        self.build_failures = 0
+        self._lock = threading.Lock()
+        self._requested = queue.Queue()
+        self._started = False
+
+    def _configured_bundles(self, language):
+        spec = os.environ.get(f'COLUNN_PCH_{language.upper()}_BUNDLES', DEFAULT_BUNDLES[language])
+        bundles = []
+        for bundle_spec in spec.split(';'):
+            headers = [name.strip() for name in bundle_spec.split(',') if name.strip()]
+            if headers:
+                bundles.append(HeaderBundle(headers))
+        return bundles
+
+    def _bundle_dir(self, language, compiler_path, flags):
+        digest = hashlib.sha256()
+        for part in (compiler_path, compiler_version(compiler_path), '\0'.join(flags)):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return os.path.join(self.pch_dir, f'{language}-{digest.hexdigest()[:16]}')
+
+    def _build_bundle(self, toolchain, bundle):
+        """Compile bundle's .gch for toolchain unless an earlier build left one"""
+        header_path = os.path.join(toolchain.bundle_dir, bundle.name)
+        gch_path = header_path + '.gch'
+        if not os.path.exists(gch_path):
+            with open(header_path, 'w') as header_file:
+                header_file.write(''.join(f'#include <{name}>\n' for name in bundle.headers))
+            tmp_path = f'{gch_path}.{os.getpid()}.tmp'
+            try:
+                build_process = run_process(
+                    [toolchain.compiler_path] + toolchain.flags
+                    + ['-x', HEADER_LANGUAGE[toolchain.language], header_path, '-o', tmp_path],
+                    timeout=120
+                )
+            except Exception:
+                build_process = None
+            if build_process is None or build_process.returncode != 0:
+                with self._lock:
+                    bundle.failed = True
+                    self.build_failures += 1
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+                return
+            os.replace(tmp_path, gch_path)
+
+        with self._lock:
+            bundle.header_path = header_path
+            bundle.size = os.path.getsize(gch_path)
+            bundle.ready = True
+
+    def _build(self, language, compiler, flags):
+        """Build one toolchain's configured bundles; returns their directory"""
+        compiler_path = shutil.which(compiler)
+        if not compiler_path:
+            return None
+
+        bundle_dir = self._bundle_dir(language, compiler_path, flags)
+        os.makedirs(bundle_dir, exist_ok=True)
+        toolchain = Toolchain(language, compiler_path, flags, bundle_dir)
+        bundles = self._configured_bundles(language)
+        for bundle in bundles:
+            toolchain.bundles[frozenset(bundle.headers)] = bundle
+        with self._lock:
+            # Submissions can request bundles while the configured ones build
+            self.toolchains[(language, compiler, tuple(flags))] = toolchain
+        for bundle in bundles:
+            self._build_bundle(toolchain, bundle)
+        return bundle_dir
+
+    def build(self, toolchains):
+        """Build the configured bundles for [(language, compiler, flags), ...] and drop stale ones"""
+        os.makedirs(self.pch_dir, exist_ok=True)
+        current = set()
+        for language, compiler, flags in toolchains:
+            try:
+                current.add(self._build(language, compiler, flags))
+            except OSError:
+                with self._lock:
+                    self.build_failures += 1
+
+        # Bundles from an older compiler or configuration are no longer usable
+        for name in os.listdir(self.pch_dir):
+            path = os.path.join(self.pch_dir, name)
+            if path not in current:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def build_requested(self, block=False):
+        """Build bundles flags_for() has asked for; with block, wait for requests forever"""
+        while True:
+            try:
+                toolchain, bundle = self._requested.get(block=block)
+            except queue.Empty:
+                return
+            try:
+                self._build_bundle(toolchain, bundle)
+            except OSError:
+                with self._lock:
+                    bundle.failed = True
+                    self.build_failures += 1
+
+    def start(self, toolchains):
+        """
+        Build bundles in the background for [(language, compiler, flags), ...],
+        then those requested by submissions. Submissions compile without a
+        bundle until theirs is ready.
+        """
+        with self._lock:
+            if self._started or not enabled():
+                return
+            self._started = True
+
+        def build_all():
+            self.build(toolchains)
+            self.build_requested(block=True)
+
+        threading.Thread(target=build_all, name='pch-builder', daemon=True).start()
+
+    def flags_for(self, language, compiler, flags, code):
+        """
+        Extra compiler flags that preload the bundle for code's exact include
+        set, or [] when it is not ready; a set seen for the first time is
+        queued for building.
+        """
+        includes = submission_includes(code)
+        with self._lock:
+            toolchain = self.toolchains.get((language, compiler, tuple(flags)))
+            if toolchain is None or not includes:
+                return []
+            bundle = toolchain.bundles.get(frozenset(includes))
+            if bundle is not None and bundle.ready:
+                self.hits += 1
+                return ['-include', bundle.header_path]
+
+            self.misses += 1
+            if bundle is None and len(toolchain.bundles) < self.max_bundles:
+                bundle = toolchain.bundles[frozenset(includes)] = HeaderBundle(includes)
+                self._requested.put((toolchain, bundle))
+        return []
+
+    def owns(self, text):
+        """Whether text (compiler output) mentions a bundle path"""
+        return self.pch_dir in text
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'build_failures': self.build_failures,
+                'max_bundles': self.max_bundles,
+                'bundles': {
+                    ' '.join((compiler,) + flags): [{'headers': bundle.headers, 'ready': bundle.ready}
+                                                    for bundle in toolchain.bundles.values()]
+                    for (language, compiler, flags), toolchain in self.toolchains.items()
+                }
+            }
+
+
+precompiled_headers = PrecompiledHeaders()
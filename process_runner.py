@@ -0,0 +1,371 @@
+"""
+Incremental process I/O for the executors.
+
+Unlike subprocess.run(capture_output=True), output is read chunk by chunk as
+the child produces it, so callers can forward it (streaming) instead of
+holding the whole thing in memory.
+
+Each child runs in its own session, so a timeout or output-cap kill takes
+down everything it forked, and whatever is left of the group when the child
+exits is killed too. Children carry RUN_OWNER_ENV (the worker's pid) in their
+environment so the janitor can find strays that escaped their group.
+
+Student programs (run_process(sliced=True)) are registered with the time
+slicer, which may pause them; their timeout then counts only the time they
+were allowed to run.
+"""
+import codecs
+import os
+import selectors
+import signal
+import subprocess
+import time
+
+from time_slicer import signal_group, time_slicer
+
+READ_CHUNK = 65536
+
+# Seconds output is still read after a child's leader exits and its group is killed
+LEADER_EXIT_GRACE = 0.2
+
+# Seconds between exit checks on the leader where pidfds are unavailable
+LEADER_POLL_INTERVAL = 0.02
+
+# Combined stdout+stderr a single process may produce before it is killed
+MAX_OUTPUT_BYTES = int(os.environ.get('COLUNN_MAX_OUTPUT_BYTES', 1024 * 1024))
+
+# Set in every child's environment to the pid of the worker that started it
+RUN_OWNER_ENV = 'COLUNN_RUN_OWNER'
+
+
+class PumpResult:
+    """Outcome of pump_output"""
+
+    def __init__(self, stdout, stderr, timed_out, truncated, output_bytes):
+        self.stdout = stdout
+        self.stderr = stderr
+        self.timed_out = timed_out
+        self.truncated = truncated
+        self.output_bytes = output_bytes
+
+
+class ProcessResult(subprocess.CompletedProcess):
+    """CompletedProcess plus output-cap bookkeeping and resource usage"""
+
+    def __init__(self, args, returncode, stdout, stderr, output_truncated=False, output_bytes=0, stats=None):
+        super().__init__(args, returncode, stdout, stderr)
+        self.output_truncated = output_truncated
+        self.output_bytes = output_bytes
+        self.stats = stats
+
+
+def stage_stats(wall_time, rusage=None):
+    """
+    Structured resource accounting for one compile or run stage.
+    rusage comes from wait4() for that child; CPU times are in seconds, RSS in KiB.
+    """
+    stats = {'wall_time': round(wall_time, 6)}
+    if rusage is not None:
+        stats.update({
+            'user_cpu': round(rusage.ru_utime, 6),
+            'sys_cpu': round(rusage.ru_stime, 6),
+            'max_rss_kb': rusage.ru_maxrss,
+            'voluntary_ctx_switches': rusage.ru_nvcsw,
+            'involuntary_ctx_switches': rusage.ru_nivcsw
+        })
+    return stats
+
+
+def child_environment():
+    """Environment for an executor child: ours plus the RUN_OWNER_ENV marker"""
+    env = dict(os.environ)
+    env[RUN_OWNER_ENV] = str(os.getpid())
+    return env
+
+
+def kill_group(pid):
+    """
+    SIGKILL the process group led by pid. Only call this while pid is still
+    unreaped (running or a zombie), so the group id can't have been reused.
+    """
+    signal_group(pid, signal.SIGKILL)
+
+
+def _exited(pid, block):
+    """Whether pid has exited, leaving it unreaped"""
+    options = os.WEXITED | os.WNOWAIT | (0 if block else os.WNOHANG)
+    return os.waitid(os.P_PID, pid, options) is not None
+
+
+def reap(process, timeout=None):
+    """
+    Wait for a Popen child like Popen.wait(), but via wait4() so its rusage is kept.
+    Processes left in the child's group when it exits are killed before it is
+    reaped. Returns the rusage (None where wait4 is unavailable); raises
+    subprocess.TimeoutExpired.
+    """
+    if not hasattr(os, 'wait4') or not hasattr(os, 'waitid'):
+        process.wait(timeout=timeout)
+        return None
+
+    if timeout is None:
+        _exited(process.pid, block=True)
+    else:
+        deadline = time.monotonic() + timeout
+        delay = 0.0005
+        while not _exited(process.pid, block=False):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise subprocess.TimeoutExpired(process.args, timeout)
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.05)
+
+    # The exited child is a zombie until reaped, so its group id is still ours
+    kill_group(process.pid)
+    _, status, rusage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return rusage
+
+
+def pump_output(stdin_fd, stdout_fd, stderr_fd, input_bytes, timeout, on_output=None, capture=True,
+                max_output=None, charged=None, leader=None):
+    """
+    Feed input_bytes to stdin_fd and read stdout_fd/stderr_fd until EOF, timeout
+    or until more than max_output bytes (default MAX_OUTPUT_BYTES) have been read.
+
+    on_output(stream, data) is called with 'stdout'/'stderr' and each raw chunk.
+    With capture=False stdout is forwarded but not kept; stderr is always kept.
+    Memory stays bounded by max_output whatever the child prints.
+    charged() returns the seconds to hold against timeout (default: wall time).
+    leader is the pid of an unreaped child leading its own process group:
+    when it exits, the rest of its group is killed so that pipes inherited by
+    background processes reach EOF, and reading stops LEADER_EXIT_GRACE
+    seconds later even if something outside the group still holds them.
+    Closes all three fds and returns a PumpResult; the caller must kill the
+    child when it reports timed_out or truncated.
+    """
+    if max_output is None:
+        max_output = MAX_OUTPUT_BYTES
+    if charged is None:
+        started = time.monotonic()
+        charged = lambda: time.monotonic() - started
+
+    selector = selectors.DefaultSelector()
+    streams = {stdout_fd: 'stdout', stderr_fd: 'stderr'}
+    chunks = {stdout_fd: [], stderr_fd: []}
+    selector.register(stdout_fd, selectors.EVENT_READ)
+    selector.register(stderr_fd, selectors.EVENT_READ)
+
+    if input_bytes:
+        os.set_blocking(stdin_fd, False)
+        selector.register(stdin_fd, selectors.EVENT_WRITE)
+    else:
+        os.close(stdin_fd)
+    pending_input = memoryview(input_bytes or b'')
+
+    leader_fd = None
+    if leader is not None and hasattr(os, 'pidfd_open'):
+        try:
+            leader_fd = os.pidfd_open(leader)
+            selector.register(leader_fd, selectors.EVENT_READ)
+        except OSError:
+            leader_fd = None
+    drain_deadline = None
+
+    def leader_exited():
+        nonlocal drain_deadline
+        # The leader is a zombie until its caller reaps it, so its group id is still ours
+        kill_group(leader)
+        drain_deadline = time.monotonic() + LEADER_EXIT_GRACE
+
+    timed_out = False
+    truncated = False
+    output_bytes = 0
+    try:
+        while any(fd != leader_fd for fd in selector.get_map()) and not truncated:
+            remaining = timeout - charged()
+            if remaining <= 0:
+                timed_out = True
+                break
+            wait = remaining
+            if drain_deadline is not None:
+                wait = drain_deadline - time.monotonic()
+                if wait <= 0:
+                    break
+            elif leader is not None and leader_fd is None:
+                # No pidfd: poll for the leader's exit
+                if _exited(leader, block=False):
+                    leader_exited()
+                    continue
+                wait = min(wait, LEADER_POLL_INTERVAL)
+
+            for key, _ in selector.select(wait):
+                fd = key.fd
+                if fd == leader_fd:
+                    selector.unregister(fd)
+                    os.close(fd)
+                    leader_fd = -1
+                    leader_exited()
+                    continue
+                if fd == stdin_fd:
+                    try:
+                        written = os.write(fd, pending_input[:READ_CHUNK])
+                        pending_input = pending_input[written:]
+                    except BrokenPipeError:
+                        pending_input = pending_input[:0]
+                    if not pending_input:
+                        selector.unregister(fd)
+                        os.close(fd)
+                    continue
+
+                data = os.read(fd, READ_CHUNK)
+                if not data:
+                    selector.unregister(fd)
+                    os.close(fd)
+                    continue
+
+                output_bytes += len(data)
+                if output_bytes > max_output:
+                    # Keep what fits under the cap and stop reading
+                    data = data[:max(len(data) - (output_bytes - max_output), 0)]
+                    truncated = True
+
+                if data:
+                    if on_output is not None:
+                        on_output(streams[fd], data)
+                    if capture or fd == stderr_fd:
+                        chunks[fd].append(data)
+                if truncated:
+                    break
+    finally:
+        for key in list(selector.get_map().values()):
+            selector.unregister(key.fd)
+            os.close(key.fd)
+        selector.close()
+
+    return PumpResult(b''.join(chunks[stdout_fd]), b''.join(chunks[stderr_fd]),
+                      timed_out, truncated, output_bytes)
+
+
+def text_output_callback(on_output):
+    """
+    Adapt a text callback on_output(stream, text) to raw byte chunks,
+    decoding UTF-8 incrementally so multi-byte characters aren't split.
+    """
+    if on_output is None:
+        return None
+
+    decoders = {
+        'stdout': codecs.getincrementaldecoder('utf-8')(errors='replace'),
+        'stderr': codecs.getincrementaldecoder('utf-8')(errors='replace')
+    }
+
+    def forward(stream, data):
+        text = decoders[stream].decode(data)
+        if text:
+            on_output(stream, text)
+
+    return forward
+
+
+def run_process(argv, input_text='', timeout=5, cwd=None, on_output=None, capture=True, max_output=None,
+                sliced=False):
+    """
+    Drop-in for subprocess.run(argv, input=..., capture_output=True, text=True, timeout=...)
+    that reads output incrementally into a bounded buffer.
+
+    on_output(stream, text) receives chunks as they are produced. A child that
+    exceeds max_output bytes is killed and the ProcessResult is marked
+    output_truncated. The result's stats hold wait4() resource usage and
+    monotonic wall time. Raises subprocess.TimeoutExpired (with .stats) after
+    killing the child's process group. An exception raised by on_output
+    propagates after the child is killed, with the run's .stats attached.
+
+    sliced=True registers a student program with the time slicer; its
+    timeout is then charged only while it is not paused, and stats report
+    paused_time.
+    """
+    started = time.monotonic()
+    stdin_read, stdin_write = os.pipe()
+    stdout_read, stdout_write = os.pipe()
+    stderr_read, stderr_write = os.pipe()
+
+    try:
+        process = subprocess.Popen(
+            argv,
+            stdin=stdin_read,
+            stdout=stdout_write,
+            stderr=stderr_write,
+            cwd=cwd,
+            env=child_environment(),
+            start_new_session=True
+        )
+    except BaseException:
+        for fd in (stdin_write, stdout_read, stderr_read):
+            os.close(fd)
+        raise
+    finally:
+        # The child holds its own copies of these ends
+        for fd in (stdin_read, stdout_write, stderr_write):
+            os.close(fd)
+
+    registered = time_slicer.register(process.pid) if sliced else None
+    charged = registered.charged if registered else lambda: time.monotonic() - started
+    try:
+        pumped = pump_output(
+            stdin_write, stdout_read, stderr_read,
+            (input_text or '').encode('utf-8'), timeout,
+            on_output=text_output_callback(on_output),
+            capture=capture,
+            max_output=max_output,
+            charged=charged,
+            leader=process.pid
+        )
+    except BaseException as error:
+        if registered:
+            time_slicer.unregister(registered)
+        kill_group(process.pid)
+        rusage = reap(process)
+        if isinstance(error, Exception) and getattr(error, 'stats', None) is None:
+            # An aborted run (the grader's wrong-answer exit) still reports its usage
+            error.stats = _with_paused_time(stage_stats(time.monotonic() - started, rusage), registered)
+        raise
+    # Resume a paused child before it is waited for (and before it can be reaped)
+    if registered:
+        time_slicer.unregister(registered)
+
+    timed_out = pumped.timed_out
+    rusage = None
+    if pumped.truncated:
+        kill_group(process.pid)
+        rusage = reap(process)
+    elif not timed_out:
+        # The child may close its pipes and keep running
+        try:
+            rusage = reap(process, timeout=max(timeout - charged(), 0))
+        except subprocess.TimeoutExpired:
+            timed_out = True
+
+    if timed_out:
+        kill_group(process.pid)
+        rusage = reap(process)
+        error = subprocess.TimeoutExpired(argv, timeout, output=pumped.stdout, stderr=pumped.stderr)
+        error.stats = _with_paused_time(stage_stats(time.monotonic() - started, rusage), registered)
+        raise error
+
+    return ProcessResult(
+        argv,
+        process.returncode,
+        pumped.stdout.decode('utf-8', errors='replace'),
+        pumped.stderr.decode('utf-8', errors='replace'),
+        output_truncated=pumped.truncated,
+        output_bytes=pumped.output_bytes,
+        stats=_with_paused_time(stage_stats(time.monotonic() - started, rusage), registered)
+    )
+
+
+def _with_paused_time(stats, registered):
+    """Add the time a sliced child spent stopped to its stage stats"""
+    if registered is not None:
+        stats['paused_time'] = round(registered.paused_total, 6)
+    return stats
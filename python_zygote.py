@@ -0,0 +1,388 @@
+"""
+Pre-forked Python execution server ("zygote").
+
+A long-lived interpreter imports the stdlib modules students use and then
+forks one isolated child per submission, so user programs skip interpreter
+startup. The web worker talks to it over a Unix socket and hands over the
+child's stdin/stdout/stderr pipes with SCM_RIGHTS, so output never passes
+through the zygote itself.
+
+Run as a script: python3 python_zygote.py <socket-path> <parent-pid>
+"""
+import json
+import os
+import select
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from process_runner import kill_group, pump_output, stage_stats, text_output_callback
+from time_slicer import signal_group, time_slicer
+
+PRELOAD_MODULES = ['math', 'random', 'collections', 'string']
+
+HEADER_LIMIT = 64
+
+# Commands the client sends to a helper, applied to the runner's process group
+SIGNAL_COMMANDS = {b'kill': signal.SIGKILL, b'stop': signal.SIGSTOP, b'cont': signal.SIGCONT}
+COMMAND_NAMES = {signum: name.decode() for name, signum in SIGNAL_COMMANDS.items()}
+
+# Seconds between exit checks on the runner where pidfds are unavailable
+EXIT_POLL_INTERVAL = 0.05
+
+
+class ZygoteUnavailable(Exception):
+    """Raised when the fork server cannot be started or reached"""
+
+
+def supported():
+    """Fork-server mode needs fork() and fd passing over Unix sockets"""
+    return hasattr(os, 'fork') and hasattr(socket, 'send_fds') and hasattr(socket, 'AF_UNIX')
+
+
+def enabled():
+    """Zygote mode is on by default where supported; COLUNN_PYTHON_ZYGOTE=0 turns it off"""
+    return supported() and os.environ.get('COLUNN_PYTHON_ZYGOTE', '1') != '0'
+
+
+# --- Server side ---------------------------------------------------------
+
+def _send_message(conn, message):
+    conn.sendall(json.dumps(message).encode('utf-8') + b'\n')
+
+
+def _receive_request(conn):
+    """Read '<length>\\n<json payload>' plus the three passed fds"""
+    data, fds, _, _ = socket.recv_fds(conn, 65536, 3)
+    while b'\n' not in data:
+        chunk = conn.recv(65536)
+        if not chunk or len(data) > HEADER_LIMIT:
+            raise ValueError('malformed request header')
+        data += chunk
+
+    header, payload = data.split(b'\n', 1)
+    length = int(header)
+    while len(payload) < length:
+        chunk = conn.recv(length - len(payload))
+        if not chunk:
+            raise ValueError('truncated request')
+        payload += chunk
+
+    if len(fds) != 3:
+        raise ValueError('expected stdin/stdout/stderr fds')
+    return json.loads(payload), fds
+
+
+def _run_child(request, fds):
+    """Runs in the forked child: wire up stdio and execute the submission"""
+    import atexit
+    import builtins
+    import linecache
+    import traceback
+
+    os.setsid()
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    for target, fd in enumerate(fds):
+        os.dup2(fd, target)
+        os.close(fd)
+
+    sys.stdin = open(0, 'r', closefd=False)
+    # Line buffering lets a streaming reader (the grader) see each line as it is printed
+    sys.stdout = open(1, 'w', closefd=False, buffering=1 if request.get('line_buffered') else -1)
+    sys.stderr = open(2, 'w', closefd=False)
+    sys.argv = ['main.py']
+    sys.path[0] = tempfile.gettempdir()
+
+    # Serve traceback source lines from the submission, not from disk
+    code = request['code']
+    linecache.cache['main.py'] = (len(code), None, code.splitlines(True), 'main.py')
+
+    status = 0
+    try:
+        program = compile(code, 'main.py', 'exec')
+        exec(program, {'__name__': '__main__', '__builtins__': builtins})
+    except SystemExit as exc:
+        if exc.code is None:
+            status = 0
+        elif isinstance(exc.code, int):
+            status = exc.code
+        else:
+            print(exc.code, file=sys.stderr)
+            status = 1
+    except BaseException as exc:
+        if isinstance(exc, SyntaxError) and exc.lineno:
+            # CPython fills in the text from any main.py found in the cwd
+            source_lines = code.splitlines()
+            if exc.lineno <= len(source_lines):
+                exc.text = source_lines[exc.lineno - 1] + '\n'
+        # Skip our own frame so tracebacks look like a plain `python3 main.py`
+        traceback_obj = exc.__traceback__.tb_next if exc.__traceback__ else None
+        traceback.print_exception(type(exc), exc, traceback_obj)
+        status = 1
+
+    try:
+        atexit._run_exitfuncs()
+        sys.stdout.flush()
+        sys.stderr.flush()
+    except BaseException:
+        pass
+    os._exit(status & 0xFF)
+
+
+def _serve_connection(conn):
+    """Runs in a per-request helper process: fork the runner and report on it"""
+    request, fds = _receive_request(conn)
+
+    started = time.monotonic()
+    pid = os.fork()
+    if pid == 0:
+        conn.close()
+        _run_child(request, fds)
+
+    for fd in fds:
+        os.close(fd)
+    _send_message(conn, {'pid': pid})
+
+    _await_exit(conn, pid)
+    # Kill whatever the program left running in its session before reaping it
+    kill_group(pid)
+    _, status, rusage = os.wait4(pid, 0)
+    _send_message(conn, {
+        'returncode': os.waitstatus_to_exitcode(status),
+        'stats': stage_stats(time.monotonic() - started, rusage)
+    })
+
+
+def _await_exit(conn, pid):
+    """
+    Wait for the runner to exit (leaving it unreaped), applying the client's
+    kill/stop/cont commands to its group meanwhile. Only this process reaps
+    the runner, so only it can signal the group without racing pid reuse.
+    A client that disconnects gets its runner killed.
+    """
+    try:
+        pidfd = os.pidfd_open(pid)
+    except (AttributeError, OSError):
+        pidfd = None
+    pending = b''
+    connected = True
+    try:
+        while os.waitid(os.P_PID, pid, os.WEXITED | os.WNOHANG | os.WNOWAIT) is None:
+            readers = ([conn] if connected else []) + ([pidfd] if pidfd is not None else [])
+            ready, _, _ = select.select(readers, [], [], None if pidfd is not None else EXIT_POLL_INTERVAL)
+            if conn not in ready:
+                continue
+            try:
+                data = conn.recv(4096)
+            except OSError:
+                data = b''
+            if not data:
+                connected = False
+                kill_group(pid)
+                continue
+            pending += data
+            while b'\n' in pending:
+                command, pending = pending.split(b'\n', 1)
+                signum = SIGNAL_COMMANDS.get(command)
+                if signum is not None:
+                    signal_group(pid, signum)
+    finally:
+        if pidfd is not None:
+            os.close(pidfd)
+
+
+def serve(socket_path, parent_pid):
+    """Accept run requests until the owning web worker goes away"""
+    for module_name in PRELOAD_MODULES:
+        __import__(module_name)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen(128)
+    server.settimeout(1.0)
+    sys.stdout.flush()
+    sys.stderr.flush()
+
+    try:
+        while os.getppid() == parent_pid:
+            # Reap finished helper processes
+            try:
+                while os.waitpid(-1, os.WNOHANG)[0]:
+                    pass
+            except ChildProcessError:
+                pass
+
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                continue
+
+            conn.settimeout(None)
+            pid = os.fork()
+            if pid == 0:
+                server.close()
+                try:
+                    _serve_connection(conn)
+                except Exception:
+                    pass
+                os._exit(0)
+            conn.close()
+    finally:
+        server.close()
+        try:
+            os.unlink(socket_path)
+        except OSError:
+            pass
+
+
+# --- Client side ---------------------------------------------------------
+
+class ZygoteClient:
+    """
+    Owns one zygote process per web worker and submits programs to it.
+    """
+
+    def __init__(self):
+        self._process = None
+        self._socket_path = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._process is not None and self._process.poll() is None:
+                return self._socket_path
+
+            python_cmd = shutil.which('python3') or shutil.which('python')
+            if not python_cmd:
+                raise ZygoteUnavailable('Python interpreter not found')
+
+            socket_path = os.path.join(tempfile.gettempdir(), f'colunn-zygote-{os.getpid()}.sock')
+            try:
+                os.unlink(socket_path)
+            except OSError:
+                pass
+
+            self._process = subprocess.Popen(
+                [python_cmd, os.path.abspath(__file__), socket_path, str(os.getpid())],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
+            )
+            self._socket_path = socket_path
+
+            # Wait for the listening socket to appear
+            deadline = time.monotonic() + 5
+            while not os.path.exists(socket_path):
+                if self._process.poll() is not None or time.monotonic() > deadline:
+                    raise ZygoteUnavailable('Zygote failed to start')
+                time.sleep(0.01)
+            return socket_path
+
+    def _connect(self):
+        socket_path = self._ensure_started()
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            conn.connect(socket_path)
+        except OSError as e:
+            conn.close()
+            raise ZygoteUnavailable(str(e))
+        return conn
+
+    def run(self, code, stdin_text='', timeout=5, on_output=None, capture=True, max_output=None,
+            line_buffered=False):
+        """
+        Execute code in a forked child; on_output/capture/max_output work as in
+        process_runner.run_process. line_buffered flushes stdout at each newline.
+        Returns {'stdout', 'stderr', 'returncode', 'stats', 'timed_out', 'output_truncated', 'output_bytes'}.
+        """
+        conn = self._connect()
+        stdin_read, stdin_write = os.pipe()
+        stdout_read, stdout_write = os.pipe()
+        stderr_read, stderr_write = os.pipe()
+
+        try:
+            payload = json.dumps({'code': code, 'line_buffered': line_buffered}).encode('utf-8')
+            try:
+                socket.send_fds(conn, [b'%d\n' % len(payload)], [stdin_read, stdout_write, stderr_write])
+                conn.sendall(payload)
+            except OSError as e:
+                raise ZygoteUnavailable(str(e))
+            finally:
+                os.close(stdin_read)
+                os.close(stdout_write)
+                os.close(stderr_write)
+
+            reader = conn.makefile('rb')
+            line = reader.readline()
+            if not line:
+                raise ZygoteUnavailable('Zygote closed the connection')
+            pid = json.loads(line)['pid']
+            send_lock = threading.Lock()
+
+            def send_signal(signum):
+                # The helper reaps the runner, so it does the signalling
+                with send_lock:
+                    try:
+                        conn.sendall(COMMAND_NAMES[signum].encode() + b'\n')
+                    except OSError:
+                        # The helper has already reported and gone
+                        pass
+
+            registered = time_slicer.register(pid, send_signal)
+            try:
+                pumped = pump_output(
+                    stdin_write, stdout_read, stderr_read,
+                    (stdin_text or '').encode('utf-8'), timeout,
+                    on_output=text_output_callback(on_output),
+                    capture=capture,
+                    max_output=max_output,
+                    charged=registered.charged
+                )
+            except BaseException as error:
+                # on_output may abort the run (the grader does on a wrong answer)
+                time_slicer.unregister(registered)
+                send_signal(signal.SIGKILL)
+                if isinstance(error, Exception) and getattr(error, 'stats', None) is None:
+                    line = reader.readline()
+                    error.stats = json.loads(line)['stats'] if line else None
+                raise
+            finally:
+                stdin_write = stdout_read = stderr_read = None
+            time_slicer.unregister(registered)
+
+            if pumped.timed_out or pumped.truncated:
+                send_signal(signal.SIGKILL)
+
+            line = reader.readline()
+            status = json.loads(line) if line else {'returncode': -signal.SIGKILL, 'stats': None}
+            return {
+                'stdout': pumped.stdout.decode('utf-8', errors='replace'),
+                'stderr': pumped.stderr.decode('utf-8', errors='replace'),
+                'returncode': status['returncode'],
+                'stats': status['stats'],
+                'timed_out': pumped.timed_out,
+                'output_truncated': pumped.truncated,
+                'output_bytes': pumped.output_bytes
+            }
+        finally:
+            for fd in (stdin_write, stdout_read, stderr_read):
+                if fd is not None:
+                    try:
+                        os.close(fd)
+                    except OSError:
+                        pass
+            conn.close()
+
+
+zygote_client = ZygoteClient()
+
+
+if __name__ == '__main__':
+    serve(sys.argv[1], int(sys.argv[2]))
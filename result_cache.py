@@ -0,0 +1,373 @@
+"""
+Cache of run results for deterministic programs.
+
+Most course programs print the same output for the same stdin, so a repeat
+run of unchanged code can return the previous result instead of compiling
+and executing again. Entries are keyed by language, toolchain fingerprint,
+source hash and stdin, and live in two tiers: an in-memory LRU
+(COLUNN_RESULT_CACHE_ENTRIES entries within COLUNN_RESULT_CACHE_MEMORY_BYTES;
+results over COLUNN_RESULT_CACHE_MEMORY_ENTRY_BYTES stay on disk only) and
+JSON files on disk
+(COLUNN_RESULT_CACHE_DIR, capped at COLUNN_RESULT_CACHE_MAX_BYTES), both
+expiring COLUNN_RESULT_CACHE_TTL seconds after the run was stored.
+
+Only clean runs (exit status 0, no timeout, output captured in full) are
+stored, and a static check skips programs that read the clock, random
+numbers, the environment, files or addresses, or that use threads.
+COLUNN_RESULT_CACHE=0 turns the cache off.
+"""
+import ast
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from c_tokenizer import tokenize_c
+from code_executor import toolchain_fingerprint
+from process_runner import stage_stats
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'colunn-result-cache')
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_MEMORY_BYTES = 32 * 1024 * 1024
+DEFAULT_MAX_MEMORY_ENTRY_BYTES = 256 * 1024
+DEFAULT_TTL = 3600
+
+# Result fields describing how the storing run was built, not what it printed
+PER_RUN_FIELDS = ('artifact', 'compile_cache', 'precompiled_header')
+
+# C/C++ identifiers whose results depend on more than the source and stdin
+NONDETERMINISTIC_C = frozenset({
+    'time', 'clock', 'clock_gettime', 'gettimeofday', 'localtime', 'gmtime', 'ctime', 'asctime',
+    'difftime', 'timespec_get', 'chrono', 'system_clock', 'steady_clock', 'high_resolution_clock',
+    'rand', 'srand', 'random', 'srandom', 'drand48', 'srand48', 'lrand48', 'rand_r', 'random_device',
+    'mt19937', 'mt19937_64', 'default_random_engine', 'minstd_rand', 'getrandom', 'arc4random',
+    'getenv', 'secure_getenv', 'environ', 'getpid', 'getppid', 'getuid', 'gethostname',
+    'fopen', 'freopen', 'open', 'ifstream', 'ofstream', 'fstream', 'opendir', 'system', 'popen',
+    'fork', 'vfork', 'pthread_create', 'thread', 'jthread', 'async', 'omp',
+    '__DATE__', '__TIME__', '__TIMESTAMP__',
+})
+
+# Format and path fragments in C/C++ string literals with the same problem
+NONDETERMINISTIC_C_STRINGS = re.compile(r'%[-+ #0-9.*]*p|/dev/|/proc/')
+
+# Python modules and builtins whose results vary between runs; str hashes are
+# randomized per process, so set iteration order and hash()/id() vary too
+NONDETERMINISTIC_PYTHON_MODULES = frozenset({
+    'time', 'datetime', 'random', 'secrets', 'uuid', 'os', 'platform', 'socket', 'threading',
+    'multiprocessing', 'subprocess', 'concurrent', 'asyncio', 'tempfile', 'pathlib', 'glob',
+})
+NONDETERMINISTIC_PYTHON_CALLS = frozenset({'open', 'id', 'hash', 'set', 'frozenset', 'globals', 'locals'})
+
+NONDETERMINISTIC_JAVA = re.compile(
+    r'\b(?:Random|ThreadLocalRandom|SecureRandom|Math\s*\.\s*random|currentTimeMillis|nanoTime|'
+    r'LocalDate|LocalTime|LocalDateTime|Instant|ZonedDateTime|Clock|Date|Calendar|UUID|'
+    r'getenv|getProperty|hashCode|identityHashCode|HashSet|Thread|Executors?|ExecutorService|'
+    r'parallelStream|parallel|File|Files|Paths|FileReader|Runtime|ProcessBuilder)\b'
+)
+
+
+def _python_is_deterministic(code):
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return True
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Set, ast.SetComp)):
+            return False
+        if isinstance(node, ast.Import):
+            modules = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            modules = [node.module or '']
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+            if node.func.id in NONDETERMINISTIC_PYTHON_CALLS or node.func.id == '__import__':
+                return False
+            continue
+        else:
+            continue
+        if any(module.split('.')[0] in NONDETERMINISTIC_PYTHON_MODULES for module in modules):
+            return False
+    return True
+
+
+def _c_is_deterministic(code):
+    for token in tokenize_c(code).tokens:
+        if token.kind == 'identifier' and token.text in NONDETERMINISTIC_C:
+            return False
+        if token.kind == 'string' and NONDETERMINISTIC_C_STRINGS.search(token.text):
+            return False
+    return True
+
+
+@lru_cache(maxsize=256)
+def is_deterministic(language, code):
+    """Static check that code's output can only depend on its source and stdin"""
+    if language in ('c', 'cpp'):
+        return _c_is_deterministic(code)
+    if language == 'python':
+        return _python_is_deterministic(code)
+    if language == 'java':
+        return NONDETERMINISTIC_JAVA.search(code) is None
+    return False
+
+
+def enabled():
+    """The result cache is on by default; COLUNN_RESULT_CACHE=0 turns it off"""
+    return os.environ.get('COLUNN_RESULT_CACHE', '1') != '0'
+
+
+def _cacheable(result):
+    """Only runs that exited cleanly with all of their output captured"""
+    return (result.get('success')
+            and not result.get('error')
+            and not result.get('output_truncated')
+            and result.get('stages', {}).get('run') is not None)
+
+
+class OutputRecorder:
+    """
+    Wraps a streaming on_output and keeps what it forwards, so a streamed
+    run can be stored and replayed in the same order.
+    """
+
+    def __init__(self, on_output):
+        self.on_output = on_output
+        self.transcript = []
+
+    def __call__(self, stream, text):
+        self.transcript.append((stream, text))
+        self.on_output(stream, text)
+
+    def output(self):
+        return ''.join(text for stream, text in self.transcript if stream == 'stdout')
+
+
+class ResultCache:
+    """
+    Two-tier (memory, then disk) LRU/TTL map of run key -> result dict.
+    """
+
+    def __init__(self, cache_dir=None, max_entries=None, max_bytes=None, ttl=None, max_memory_bytes=None,
+                 max_memory_entry_bytes=None):
+        self.cache_dir = cache_dir or os.environ.get('COLUNN_RESULT_CACHE_DIR', DEFAULT_CACHE_DIR)
+        self.max_entries = max_entries or int(os.environ.get('COLUNN_RESULT_CACHE_ENTRIES', DEFAULT_MAX_ENTRIES))
+        self.max_bytes = max_bytes or int(os.environ.get('COLUNN_RESULT_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+        self.ttl = ttl or int(os.environ.get('COLUNN_RESULT_CACHE_TTL', DEFAULT_TTL))
+        self.max_memory_bytes = max_memory_bytes or int(
+            os.environ.get('COLUNN_RESULT_CACHE_MEMORY_BYTES', DEFAULT_MAX_MEMORY_BYTES))
+        self.max_memory_entry_bytes = max_memory_entry_bytes or int(
+            os.environ.get('COLUNN_RESULT_CACHE_MEMORY_ENTRY_BYTES', DEFAULT_MAX_MEMORY_ENTRY_BYTES))
+        # key -> (stored_at, {'result': ..., 'transcript': [(stream, text)] or None}, size in bytes)
+        self._entries = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.skipped = 0
+        self.evicted = 0
+        self.expired = 0
+
+    def run_key(self, language, code, stdin=None):
+        """
+        Key for a run of code, or None when the cache is off or the program
+        may not be deterministic. stdin None (input guessed from the source)
+        differs from ''.
+        """
+        if not enabled():
+            return None
+        if not is_deterministic(language, code):
+            with self._lock:
+                self.skipped += 1
+            return None
+        digest = hashlib.sha256()
+        for part in (language, toolchain_fingerprint(language), code):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        if stdin is not None:
+            digest.update(b'\1')
+            digest.update(stdin.encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.json')
+
+    def _lookup_memory(self, key):
+        with self._lock:
+            stored = self._entries.get(key)
+            if stored is None:
+                return None
+            if time.time() - stored[0] > self.ttl:
+                self._forget(key)
+                self.expired += 1
+                return None
+            self._entries.move_to_end(key)
+            self.memory_hits += 1
+            return stored[1]
+
+    def _lookup_disk(self, key):
+        path = self._path(key)
+        try:
+            with open(path) as entry_file:
+                serialized = entry_file.read()
+            stored = json.loads(serialized)
+            if time.time() - stored['stored_at'] > self.ttl:
+                os.unlink(path)
+                with self._lock:
+                    self.expired += 1
+                return None
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        with self._lock:
+            self.disk_hits += 1
+        self._remember(key, stored['stored_at'], stored['entry'], len(serialized))
+        return stored['entry']
+
+    def _forget(self, key):
+        # Called with the lock held
+        self._memory_bytes -= self._entries.pop(key)[2]
+
+    def _remember(self, key, stored_at, entry, size):
+        """Keep entry in memory unless it is too large; evicts by count and bytes"""
+        if size > self.max_memory_entry_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._forget(key)
+            self._entries[key] = (stored_at, entry, size)
+            self._memory_bytes += size
+            while len(self._entries) > self.max_entries or self._memory_bytes > self.max_memory_bytes:
+                self._forget(next(iter(self._entries)))
+                self.evicted += 1
+
+    def lookup(self, key, on_output=None):
+        """
+        Return a copy of the cached result for key (with cache_hit set and
+        result_cache 'hit'), or None. Streaming callers get the cached output replayed through
+        on_output.
+        """
+        started = time.monotonic()
+        entry = self._lookup_memory(key) or self._lookup_disk(key)
+        if entry is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        result = dict(entry['result'])
+        if on_output is not None:
+            for stream, text in entry['transcript'] or [('stdout', result['output'])]:
+                if text:
+                    on_output(stream, text)
+            # Streamed results carry no output, as with a live run
+            result['output'] = ''
+        result['cache_hit'] = True
+        result['result_cache'] = 'hit'
+        result['stages'] = {'cache': stage_stats(time.monotonic() - started)}
+        result['execution_time'] = round(time.monotonic() - started, 3)
+        return result
+
+    def store(self, key, result, recorder=None):
+        """
+        Record a finished run and mark it cache_hit False (result_cache 'miss'). recorder is the
+        OutputRecorder a streamed run wrote through; without one, the result
+        must hold the captured output.
+        """
+        if result is None:
+            return
+        result['cache_hit'] = False
+        result['result_cache'] = 'miss'
+        if not _cacheable(result):
+            return
+        result = dict(result)
+        # A hit neither compiles nor reuses the storing run's build, and its
+        # artifact handle may have expired by the time it is replayed
+        for field in PER_RUN_FIELDS:
+            result.pop(field, None)
+        transcript = None
+        if recorder is not None:
+            result['output'] = recorder.output()
+            transcript = recorder.transcript
+        entry = {'result': result, 'transcript': transcript}
+        stored_at = time.time()
+        try:
+            serialized = json.dumps({'stored_at': stored_at, 'entry': entry})
+        except (TypeError, ValueError):
+            return
+        # The serialized size stands in for what the entry holds in memory
+        self._remember(key, stored_at, entry, len(serialized))
+        with self._lock:
+            self.stores += 1
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w') as entry_file:
+                entry_file.write(serialized)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            return
+
+        self._evict_disk()
+
+    def _evict_disk(self):
+        """Remove expired entries, then the oldest ones until the disk tier fits its budget"""
+        entries = []
+        total_size = 0
+        cutoff = time.time() - self.ttl
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return
+
+        for name in names:
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                # Entry files are written once, so mtime is when they were stored
+                stat = os.stat(path)
+                if stat.st_mtime < cutoff:
+                    os.unlink(path)
+                    continue
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, path, stat.st_size))
+            total_size += stat.st_size
+
+        if total_size <= self.max_bytes:
+            return
+
+        entries.sort()
+        for _, path, size in entries:
+            if total_size <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            total_size -= size
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': enabled(),
+                'entries': len(self._entries),
+                'memory_bytes': self._memory_bytes,
+                'max_memory_bytes': self.max_memory_bytes,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'stores': self.stores,
+                'skipped_nondeterministic': self.skipped,
+                'evicted': self.evicted,
+                'expired': self.expired
+            }
+
+
+result_cache = ResultCache()
@@ -1,7 +1,184 @@
-from flask import render_template, request, redirect, url_for, flash, jsonify, session
-from code_executor import execute_c_code, execute_python_code, execute_java_code, execute_cpp_code
+from flask import render_template, request, redirect, url_for, flash, jsonify, session, Response
+from code_executor import (execute_c_code, execute_python_code, execute_java_code, execute_cpp_code,
+                           compile_program, run_compiled)
+from artifact_store import artifact_store
+from async_executor import supervisor
+from diagnostics import diagnostics_checker
+from grader import RUN_TIMEOUT, grade_program
+from janitor import janitor
+from job_queue import job_queue, QueueFull
+from admission import admission, AdmissionRejected
+from compile_cache import compile_cache
+from precompiled_headers import precompiled_headers
+from result_cache import result_cache, OutputRecorder
+from singleflight import singleflight, flight_key
+from time_limits import time_limit_calibrator
+from time_slicer import time_slicer
+from workspace import workspace_pool
 from datetime import datetime
+import json
 import os
+import queue
+import threading
+import time
+
+# How long /run waits for an artifact another run is still building
+ARTIFACT_BUILD_WAIT = 30
+
+def resolve_language(data):
+    """Determine the submission language, preferring the filename extension"""
+    language = data.get('language', 'c')
+
+    # Determine language from extension if provided
+    filename = data.get('filename', '')
+    if filename:
+        ext = os.path.splitext(filename)[1].lower()
+        if ext == '.py':
+            language = 'python'
+        elif ext == '.java':
+            language = 'java'
+        elif ext == '.cpp' or ext == '.cxx':
+            language = 'cpp'
+        elif ext == '.c':
+            language = 'c'
+
+    return language
+
+def run_artifact(language, code, handle, stdin=None, on_output=None):
+    """
+    Run the program for a /compile handle, building and keeping it on first use.
+    Returns None when the artifact is unknown, expired or doesn't match the code.
+    """
+    artifact = artifact_store.get(handle, language, code)
+    if artifact is None:
+        return None
+
+    try:
+        program = artifact_store.build(artifact, code, compile_program, ARTIFACT_BUILD_WAIT)
+        if not artifact.ready.is_set():
+            return None
+        if program is None:
+            # The build failed; report its errors rather than compiling again
+            result = dict(artifact.result)
+        else:
+            result = run_compiled(program, stdin, on_output)
+    finally:
+        artifact_store.release(artifact)
+
+    result['artifact'] = handle
+    return result
+
+def execute_request(language, code, compile_only=False, on_output=None, stdin=None, artifact=None):
+    """
+    Run the executor for a language.
+    on_output(stream, text) receives program output while it runs.
+    stdin is fed to the program; when None, input is guessed from the source.
+    artifact is a handle from /compile; the stored build is used when it matches.
+    Returns the result dict, or None when the language is unsupported.
+    """
+    if artifact and not compile_only:
+        result = run_artifact(language, code, artifact, stdin, on_output)
+        if result is not None:
+            return result
+
+    if compile_only:
+        # For C and C++, compilation is separate from execution
+        if language == 'c':
+            return execute_c_code(code, compile_only=True)
+        elif language == 'cpp':
+            return execute_cpp_code(code, compile_only=True)
+        elif language == 'java':
+            return execute_java_code(code, compile_only=True)
+        elif language == 'python':
+            # Python doesn't need compilation, just syntax check
+            try:
+                compile(code, '<string>', 'exec')
+                return {'success': True, 'output': 'Python syntax is valid'}
+            except SyntaxError as e:
+                return {'success': False, 'error': f'Syntax error: {str(e)}'}
+        return None
+
+    # Execute the code based on language
+    if language == 'c':
+        return execute_c_code(code, on_output=on_output, stdin=stdin)
+    elif language == 'cpp':
+        return execute_cpp_code(code, on_output=on_output, stdin=stdin)
+    elif language == 'java':
+        return execute_java_code(code, on_output=on_output, stdin=stdin)
+    elif language == 'python':
+        return execute_python_code(code, on_output=on_output, stdin=stdin)
+    return None
+
+def lookup_run(language, code, stdin=None, on_output=None):
+    """
+    Check the result cache before running. Returns (key, result): result is
+    the cached result or None, and key is where to store a fresh result
+    (None when the program isn't cacheable).
+    """
+    key = result_cache.run_key(language, code, stdin)
+    if key is None:
+        return None, None
+    return key, result_cache.lookup(key, on_output)
+
+def execute_admitted(language, code, compile_only=False, on_output=None, stdin=None, artifact=None, bounded=True):
+    """
+    execute_request inside one of the language's admission slots; cached
+    runs are answered without taking a slot.
+    Raises AdmissionRejected when the server is saturated.
+    """
+    cache_key = None
+    if not compile_only:
+        cache_key, cached = lookup_run(language, code, stdin, on_output)
+        if cached is not None:
+            return cached
+
+    recorder = None
+    if cache_key is not None and on_output is not None:
+        on_output = recorder = OutputRecorder(on_output)
+
+    with admission.slot(language, bounded=bounded):
+        result = execute_request(language, code, compile_only, on_output, stdin, artifact)
+    if cache_key is not None:
+        result_cache.store(cache_key, result, recorder)
+    return result
+
+def grade_admitted(language, code, test_cases, time_limit=None, bounded=True):
+    """
+    grade_submission under admission control, under time_limit (from
+    TimeLimitCalibrator.limit_for) when given. The compile is admitted like
+    any request; each test case then waits for a slot of its own, so a grade
+    never runs more programs at once than the language has slots.
+    """
+    started = time.monotonic()
+    with admission.slot(language, bounded=bounded):
+        compiled, program = compile_program(language, code, grading=True)
+    timeout = time_limit['seconds'] if time_limit is not None else RUN_TIMEOUT
+    result = grade_program(compiled, program, test_cases, timeout,
+                           slot=lambda: admission.slot(language, bounded=False), start_time=started)
+    if time_limit is None:
+        return result
+    result['time_limit_source'] = time_limit['source']
+    result['reference_runtime'] = time_limit['reference_runtime']
+    return result
+
+def overloaded_payload(error):
+    """Body of the 429 response for an AdmissionRejected"""
+    return {
+        'success': False,
+        'error': f'Server busy: {error}',
+        'retry_after': error.retry_after
+    }
+
+def overloaded_response(error):
+    """429 response asking the client to retry after the estimated backlog"""
+    response = jsonify(overloaded_payload(error))
+    response.status_code = 429
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+def sse_event(event, payload):
+    """Format one Server-Sent Event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
 
 def register_routes(app, db):
     @app.route('/')
@@ -9,107 +186,328 @@ def register_routes(app, db):
         """Main Colunn IDE page"""
         return render_template('index.html')
 
+    def submit_job(fn, *args, lane='interactive', cost_key=None):
+        """Queue fn(*args) in lane, predicting its cost from cost_key, and return the 202 job response"""
+        try:
+            # Executor threads are already bounded, so jobs wait for a slot instead of being rejected
+            job = job_queue.submit(fn, *args, lane=lane, cost_key=cost_key, bounded=False)
+        except QueueFull as e:
+            response = jsonify({
+                'success': False,
+                'error': str(e)
+            })
+            response.status_code = 503
+            response.headers['Retry-After'] = '1'
+            return response
+
+        response = jsonify(job_queue.describe(job))
+        response.status_code = 202
+        response.headers['Location'] = url_for('job_status', job_id=job.id)
+        return response
+
     @app.route('/compile', methods=['POST'])
     def compile_code():
         """Compile code and return compilation results"""
         data = request.get_json()
         code = data.get('code', '')
-        language = data.get('language', 'c')
-        
-        # Determine language from extension if provided
-        filename = data.get('filename', '')
-        if filename:
-            ext = os.path.splitext(filename)[1].lower()
-            if ext == '.py':
-                language = 'python'
-            elif ext == '.java':
-                language = 'java'
-            elif ext == '.cpp' or ext == '.cxx':
-                language = 'cpp'
-            elif ext == '.c':
-                language = 'c'
-        
+        language = resolve_language(data)
+
         if not code.strip():
             return jsonify({
                 'success': False,
                 'error': 'No code provided'
             })
-        
+
+        if language not in ('c', 'cpp', 'java', 'python'):
+            return jsonify({
+                'success': False,
+                'error': f'Unsupported language: {language}'
+            })
+
+        if data.get('async'):
+            return submit_job(execute_admitted, language, code, True, cost_key=(None, language, 'compile'))
+
+        def compile_and_build():
+            result = execute_admitted(language, code, compile_only=True)
+            if result.get('success'):
+                # The first /run with the handle builds the program and keeps it
+                result['artifact'] = artifact_store.register(language, code)
+            return result
+
         try:
-            # For C and C++, compilation is separate from execution
-            if language == 'c':
-                result = execute_c_code(code, compile_only=True)
-            elif language == 'cpp':
-                result = execute_cpp_code(code, compile_only=True)
-            elif language == 'java':
-                result = execute_java_code(code, compile_only=True)
-            elif language == 'python':
-                # Python doesn't need compilation, just syntax check
-                try:
-                    compile(code, '<string>', 'exec')
-                    result = {'success': True, 'output': 'Python syntax is valid'}
-                except SyntaxError as e:
-                    result = {'success': False, 'error': f'Syntax error: {str(e)}'}
-            else:
-                return jsonify({
-                    'success': False,
-                    'error': f'Unsupported language: {language}'
-                })
-            
+            result = singleflight.do(flight_key(language, code, mode='compile'), compile_and_build)
             return jsonify(result)
-            
+
+        except AdmissionRejected as e:
+            return overloaded_response(e)
         except Exception as e:
             return jsonify({
                 'success': False,
                 'error': f'Compilation error: {str(e)}'
             })
 
+    @app.route('/diagnostics', methods=['POST'])
+    def code_diagnostics():
+        """Editor markers for the current buffer: a cheap check first, the compiler only when it passes"""
+        data = request.get_json()
+        code = data.get('code', '')
+        language = resolve_language(data)
+
+        if language not in ('c', 'cpp', 'java', 'python'):
+            return jsonify({
+                'success': False,
+                'error': f'Unsupported language: {language}'
+            })
+
+        if not code.strip():
+            return jsonify({'success': True, 'diagnostics': [], 'stage': 'lint', 'cached': False})
+
+        try:
+            result = diagnostics_checker.check(
+                language, code,
+                lambda language, code: execute_admitted(language, code, compile_only=True)
+            )
+        except AdmissionRejected:
+            # Too busy for a compiler check; markers from the cheap pass still help
+            result = diagnostics_checker.check(language, code)
+            result['busy'] = True
+        except Exception as e:
+            return jsonify({
+                'success': False,
+                'error': f'Diagnostics error: {str(e)}'
+            })
+
+        result['success'] = True
+        return jsonify(result)
+
     @app.route('/run', methods=['POST'])
     def run_code():
         """Execute code and return results"""
         data = request.get_json()
         code = data.get('code', '')
-        language = data.get('language', 'c')
-        
-        # Determine language from extension if provided
-        filename = data.get('filename', '')
-        if filename:
-            ext = os.path.splitext(filename)[1].lower()
-            if ext == '.py':
-                language = 'python'
-            elif ext == '.java':
-                language = 'java'
-            elif ext == '.cpp' or ext == '.cxx':
-                language = 'cpp'
-            elif ext == '.c':
-                language = 'c'
-        
+        language = resolve_language(data)
+
         if not code.strip():
             return jsonify({
                 'success': False,
                 'error': 'No code provided'
             })
-        
+
+        if language not in ('c', 'cpp', 'java', 'python'):
+            return jsonify({
+                'success': False,
+                'error': f'Unsupported language: {language}'
+            })
+
+        stdin = data.get('stdin')
+        artifact = data.get('artifact')
+
+        if data.get('async'):
+            return submit_job(execute_admitted, language, code, False, None, stdin, artifact,
+                              cost_key=(None, language, 'run'))
+
         try:
-            # Execute the code based on language
-            if language == 'c':
-                result = execute_c_code(code)
-            elif language == 'cpp':
-                result = execute_cpp_code(code)
-            elif language == 'java':
-                result = execute_java_code(code)
-            elif language == 'python':
-                result = execute_python_code(code)
-            else:
-                return jsonify({
-                    'success': False,
-                    'error': f'Unsupported language: {language}'
-                })
-            
+            # Identical runs already in flight (a whole class clicking Run) share one execution
+            result = singleflight.do(flight_key(language, code, stdin, 'run', artifact),
+                                     lambda: execute_admitted(language, code, stdin=stdin, artifact=artifact))
             return jsonify(result)
-            
+
+        except AdmissionRejected as e:
+            return overloaded_response(e)
         except Exception as e:
             return jsonify({
                 'success': False,
                 'error': f'Execution error: {str(e)}'
             })
+
+    @app.route('/run/stream', methods=['POST'])
+    def run_code_stream():
+        """Execute code and stream stdout/stderr as Server-Sent Events while it runs"""
+        data = request.get_json()
+        code = data.get('code', '')
+        language = resolve_language(data)
+        stdin = data.get('stdin')
+        artifact = data.get('artifact')
+
+        events = queue.Queue()
+
+        def on_output(stream, text):
+            events.put((stream, {'text': text}))
+
+        # Admit before the stream starts so an overloaded server can still answer 429
+        release = None
+        cache_key = cached = recorder = None
+        if code.strip() and language in ('c', 'cpp', 'java', 'python'):
+            # A cached result replays its output into the queue and needs no slot
+            cache_key, cached = lookup_run(language, code, stdin, on_output)
+            if cache_key is not None:
+                recorder = OutputRecorder(on_output)
+            if cached is None:
+                try:
+                    release = admission.acquire(language)
+                except AdmissionRejected as e:
+                    return overloaded_response(e)
+
+        def execute():
+            if not code.strip():
+                result = {'success': False, 'error': 'No code provided'}
+            elif language not in ('c', 'cpp', 'java', 'python'):
+                result = {'success': False, 'error': f'Unsupported language: {language}'}
+            elif cached is not None:
+                result = cached
+            else:
+                try:
+                    result = execute_request(language, code, on_output=recorder or on_output,
+                                             stdin=stdin, artifact=artifact)
+                except Exception as e:
+                    result = {'success': False, 'error': f'Execution error: {str(e)}'}
+                finally:
+                    release()
+                if cache_key is not None:
+                    result_cache.store(cache_key, result, recorder)
+            events.put(('result', result))
+
+        threading.Thread(target=execute, daemon=True).start()
+
+        def generate():
+            while True:
+                event, payload = events.get()
+                yield sse_event(event, payload)
+                if event == 'result':
+                    return
+
+        return Response(generate(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    @app.route('/jobs', methods=['POST'])
+    def submit_code_job():
+        """Queue a run (or compile with compile_only) and return a job id immediately"""
+        data = request.get_json()
+        code = data.get('code', '')
+        language = resolve_language(data)
+
+        if not code.strip():
+            return jsonify({
+                'success': False,
+                'error': 'No code provided'
+            }), 400
+
+        if language not in ('c', 'cpp', 'java', 'python'):
+            return jsonify({
+                'success': False,
+                'error': f'Unsupported language: {language}'
+            }), 400
+
+        compile_only = bool(data.get('compile_only'))
+        return submit_job(execute_admitted, language, code, compile_only, None, data.get('stdin'),
+                          data.get('artifact'), cost_key=(None, language, 'compile' if compile_only else 'run'))
+
+    @app.route('/jobs/<job_id>', methods=['GET'])
+    def job_status(job_id):
+        """Poll a job's status, queue position and result"""
+        job = job_queue.get(job_id)
+        if job is None:
+            return jsonify({
+                'success': False,
+                'error': 'Unknown job'
+            }), 404
+        return jsonify(job_queue.describe(job))
+
+    @app.route('/jobs/<job_id>/events', methods=['GET'])
+    def job_events(job_id):
+        """Subscribe to a job's status changes as Server-Sent Events"""
+        job = job_queue.get(job_id)
+        if job is None:
+            return jsonify({
+                'success': False,
+                'error': 'Unknown job'
+            }), 404
+
+        def generate():
+            while True:
+                version = job.version
+                yield sse_event('status', job_queue.describe(job))
+                if job.status in ('done', 'failed'):
+                    return
+                # Re-sends the current status every 15s, which doubles as a keep-alive
+                job_queue.wait_for_update(job, version, timeout=15)
+
+        return Response(generate(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    @app.route('/tasks/<int:task_id>/grade', methods=['POST'])
+    def grade_task(task_id):
+        """Compile once and run a submission against all of a task's test cases"""
+        # models imports app, which imports this module
+        from models import Task
+
+        task = Task.query.get(task_id)
+        if task is None:
+            return jsonify({
+                'success': False,
+                'error': 'Unknown task'
+            }), 404
+
+        data = request.get_json()
+        code = data.get('code', '')
+        language = resolve_language(data)
+
+        if not code.strip():
+            return jsonify({
+                'success': False,
+                'error': 'No code provided'
+            }), 400
+
+        if language not in ('c', 'cpp', 'java', 'python'):
+            return jsonify({
+                'success': False,
+                'error': f'Unsupported language: {language}'
+            }), 400
+
+        test_cases = [{'stdin': case.stdin, 'expected_output': case.expected_output}
+                      for case in task.test_cases]
+        if not test_cases:
+            return jsonify({
+                'success': False,
+                'error': 'Task has no test cases'
+            }), 400
+
+        time_limit = time_limit_calibrator.limit_for(task, language)
+
+        if data.get('async'):
+            return submit_job(grade_admitted, language, code, test_cases, time_limit,
+                              lane='grading', cost_key=(task.id, language, 'grade'))
+
+        try:
+            return jsonify(grade_admitted(language, code, test_cases, time_limit))
+        except AdmissionRejected as e:
+            return overloaded_response(e)
+        except Exception as e:
+            return jsonify({
+                'success': False,
+                'error': f'Grading error: {str(e)}'
+            })
+
+    @app.route('/jobs/stats', methods=['GET'])
+    def job_stats():
+        """Executor pool and queue depth"""
+        return jsonify(job_queue.stats())
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        """Executor load figures for monitoring"""
+        return jsonify({
+            'admission': admission.stats(),
+            'jobs': job_queue.stats(),
+            'compile_cache': compile_cache.stats(),
+            'precompiled_headers': precompiled_headers.stats(),
+            'workspaces': workspace_pool.stats(),
+            'artifacts': artifact_store.stats(),
+            'diagnostics': diagnostics_checker.stats(),
+            'async_runs': supervisor.stats(),
+            'singleflight': singleflight.stats(),
+            'result_cache': result_cache.stats(),
+            'janitor': janitor.stats(),
+            'time_limits': time_limit_calibrator.stats(),
+            'time_slicing': time_slicer.stats()
+        })
@@ -0,0 +1,140 @@
+"""
+Coalescing of identical in-flight executions.
+
+When a class clicks Run on the same projected code, dozens of identical
+requests arrive together. The first one for a key (language, source hash,
+stdin, mode) becomes the leader and executes; requests arriving while it is
+in flight wait for it and get a copy of its result (marked coalesced), or
+its exception. Nothing is kept once the leader finishes, so this is not a
+result cache: a request that arrives afterwards executes again.
+
+Followers never take an admission slot, and threads (Flask) and coroutines
+(asgi.py) can follow the same leader.
+"""
+import asyncio
+import hashlib
+import threading
+
+
+def flight_key(language, code, stdin=None, mode='run', artifact=None):
+    """Key for a request; stdin None (input guessed from the source) differs from ''"""
+    digest = hashlib.sha256()
+    for part in (language, mode, artifact or '', code):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    if stdin is not None:
+        digest.update(b'\1')
+        digest.update(stdin.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _shared(flight):
+    """What a follower gets from a finished flight"""
+    if flight.error is not None:
+        raise flight.error
+    if isinstance(flight.result, dict):
+        return dict(flight.result, coalesced=True)
+    return flight.result
+
+
+def _settle(future, flight):
+    if not future.done():
+        future.set_result(flight)
+
+
+class Flight:
+    """One in-flight execution and the requests waiting on it"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+        # (loop, future) for each coroutine following this flight
+        self.waiters = []
+
+
+class SingleFlight:
+    """
+    Map of key -> Flight for executions in progress.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+        self.max_followers = 0
+
+    def _join(self, key):
+        # Returns (flight, is_leader)
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = Flight()
+                self.leaders += 1
+                return flight, True
+            flight.followers += 1
+            self.coalesced += 1
+            self.max_followers = max(self.max_followers, flight.followers)
+            return flight, False
+
+    def _finish(self, key, flight):
+        with self._lock:
+            del self._flights[key]
+            flight.done.set()
+            waiters, flight.waiters = flight.waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_settle, future, flight)
+
+    def do(self, key, fn):
+        """Return fn(), or the result of the identical call already in flight"""
+        flight, leader = self._join(key)
+        if not leader:
+            flight.done.wait()
+            return _shared(flight)
+
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            self._finish(key, flight)
+
+    async def do_async(self, key, coroutine_fn):
+        """do() for coroutines: awaits coroutine_fn() or the flight already running"""
+        flight, leader = self._join(key)
+        if not leader:
+            with self._lock:
+                if not flight.done.is_set():
+                    loop = asyncio.get_running_loop()
+                    future = loop.create_future()
+                    flight.waiters.append((loop, future))
+                else:
+                    future = None
+            if future is not None:
+                await future
+            return _shared(flight)
+
+        try:
+            flight.result = await coroutine_fn()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            self._finish(key, flight)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': len(self._flights),
+                'leaders': self.leaders,
+                'coalesced': self.coalesced,
+                'max_followers': self.max_followers
+            }
+
+
+singleflight = SingleFlight()
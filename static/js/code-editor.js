@@ -49,6 +49,11 @@ function initializeCodeEditor() {
             window.Colunn.editor = monacoEditor;
         }
 
+        monacoEditor.onDidChangeModelContent(() => {
+            scheduleDiagnostics(monacoEditor, window.Colunn?.currentLanguage || 'c');
+        });
+        scheduleDiagnostics(monacoEditor, window.Colunn?.currentLanguage || 'c');
+
         console.log('Monaco Editor initialized successfully');
     });
 }
@@ -149,6 +154,64 @@ function findInCode(searchTerm) {
     }
 }
 
+// Live diagnostics: ask the server for markers shortly after typing stops
+const DIAGNOSTICS_DELAY_MS = 400;
+const markerSeverities = {
+    'error': 'Error',
+    'warning': 'Warning',
+    'info': 'Info'
+};
+let diagnosticsTimer = null;
+let diagnosticsRequest = null;
+
+function scheduleDiagnostics(editor, language) {
+    if (!editor || typeof monaco === 'undefined') return;
+    
+    clearTimeout(diagnosticsTimer);
+    diagnosticsTimer = setTimeout(() => requestDiagnostics(editor, language), DIAGNOSTICS_DELAY_MS);
+}
+
+function requestDiagnostics(editor, language) {
+    const model = editor.getModel();
+    if (!model) return;
+    
+    // Only the latest buffer matters; drop a check that is still in flight
+    if (diagnosticsRequest) {
+        diagnosticsRequest.abort();
+    }
+    diagnosticsRequest = new AbortController();
+    const version = model.getVersionId();
+    
+    fetch('/diagnostics', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ code: model.getValue(), language: language }),
+        signal: diagnosticsRequest.signal
+    })
+    .then(response => response.json())
+    .then(result => {
+        if (!result.success || model.isDisposed() || model.getVersionId() !== version) return;
+        
+        const markers = result.diagnostics.map(diagnostic => ({
+            startLineNumber: diagnostic.line,
+            startColumn: diagnostic.column,
+            endLineNumber: diagnostic.end_line,
+            endColumn: diagnostic.column === 1 && diagnostic.end_line === diagnostic.line
+                ? model.getLineMaxColumn(Math.min(diagnostic.line, model.getLineCount()))
+                : diagnostic.end_column,
+            severity: monaco.MarkerSeverity[markerSeverities[diagnostic.severity] || 'Error'],
+            message: diagnostic.message,
+            source: diagnostic.source
+        }));
+        monaco.editor.setModelMarkers(model, 'colunn', markers);
+    })
+    .catch(error => {
+        if (error.name !== 'AbortError') {
+            console.warn('Diagnostics failed:', error);
+        }
+    });
+}
+
 // Expose functions globally
 window.initializeCodeEditor = initializeCodeEditor;
 window.updateEditorLanguage = updateEditorLanguage;
@@ -157,3 +220,4 @@ window.setEditorContent = setEditorContent;
 window.insertAtCursor = insertAtCursor;
 window.formatCode = formatCode;
 window.findInCode = findInCode;
+window.scheduleDiagnostics = scheduleDiagnostics;
@@ -7,6 +7,7 @@ const Colunn = {
     currentLanguage: 'c',
     currentFilename: 'untitled.c',
     isCompiled: false,
+    artifact: null,
     programBlocks: [],
     editor: null,
     initialized: false
@@ -144,6 +145,9 @@ function initializeMonacoEditor() {
                     Colunn.editor.onDidChangeModelContent(() => {
                         Colunn.isCompiled = false;
                         updateFileStatus();
+                        if (typeof scheduleDiagnostics === 'function') {
+                            scheduleDiagnostics(Colunn.editor, Colunn.currentLanguage);
+                        }
                     });
                     
                     console.log('✅ Monaco Editor initialized');
@@ -326,6 +330,8 @@ function compileCode() {
     .then(result => {
         if (result.success) {
             Colunn.isCompiled = true;
+            // Handle of the server-side build; /run reuses it instead of recompiling
+            Colunn.artifact = result.artifact || null;
             addToConsole('logs', '✅ Compilation successful!');
             if (result.output) {
                 addToConsole('output', result.output);
@@ -376,20 +382,39 @@ function runCode() {
         runBtn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Running...';
     }
     
-    fetch('/run', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({
-            code: code,
-            language: Colunn.currentLanguage,
-            filename: Colunn.currentFilename
+    const payload = {
+        code: code,
+        language: Colunn.currentLanguage,
+        filename: Colunn.currentFilename
+    };
+    if (Colunn.isCompiled && Colunn.artifact) {
+        payload.artifact = Colunn.artifact;
+    }
+    
+    // Stream output while the program runs; fall back to a buffered /run
+    const execution = (window.ReadableStream && window.TextDecoder)
+        ? runCodeStreaming(payload)
+        : fetch('/run', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(payload)
         })
-    })
-    .then(response => response.json())
-    .then(result => {
-        if (result.success || result.output) {
-            addToConsole('output', result.output || 'Program executed successfully.');
+        .then(response => response.json())
+        .then(result => ({ result: result, streamed: { stdout: false, stderr: false } }));
+    
+    execution
+    .then(({ result, streamed }) => {
+        if (result.output) {
+            addToConsole('output', result.output);
+        }
+        if (result.success || result.output || streamed.stdout) {
+            if (!result.output && !streamed.stdout) {
+                addToConsole('output', 'Program executed successfully.');
+            }
             switchConsoleTab('output');
+        } else if (streamed.stderr) {
+            addToConsole('error', 'Program exited with errors');
+            switchConsoleTab('errors');
         } else {
             addToConsole('error', result.error || 'Execution failed');
             switchConsoleTab('errors');
@@ -400,6 +425,8 @@ function runCode() {
         addToConsole('error', 'Network error during execution');
     })
     .finally(() => {
+        endConsoleStreams();
+        
         // Reset button state
         if (runBtn) {
             runBtn.disabled = false;
@@ -408,6 +435,72 @@ function runCode() {
     });
 }
 
+function runCodeStreaming(payload) {
+    // POST to the Server-Sent Events endpoint and render chunks as they arrive
+    const streamed = { stdout: false, stderr: false };
+    
+    return fetch('/run/stream', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(payload)
+    })
+    .then(response => {
+        if (!response.ok) {
+            // Rejected before streaming started (e.g. 429 when the server is busy)
+            return response.json().then(result => ({ result: result, streamed: streamed }));
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let result = null;
+        
+        function handleEvent(rawEvent) {
+            let eventName = 'message';
+            let data = '';
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event: ')) {
+                    eventName = line.slice(7);
+                } else if (line.startsWith('data: ')) {
+                    data += line.slice(6);
+                }
+            });
+            if (!data) return;
+            
+            const message = JSON.parse(data);
+            if (eventName === 'stdout') {
+                if (!streamed.stdout) switchConsoleTab('output');
+                streamed.stdout = true;
+                addToConsole('output', message.text, { stream: true });
+            } else if (eventName === 'stderr') {
+                streamed.stderr = true;
+                addToConsole('error', message.text, { stream: true });
+            } else if (eventName === 'result') {
+                result = message;
+            }
+        }
+        
+        function pump() {
+            return reader.read().then(({ done, value }) => {
+                buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+                let boundary;
+                while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                    handleEvent(buffer.slice(0, boundary));
+                    buffer = buffer.slice(boundary + 2);
+                }
+                if (done) {
+                    endConsoleStreams();
+                    if (!result) throw new Error('Stream ended without a result');
+                    return { result: result, streamed: streamed };
+                }
+                return pump();
+            });
+        }
+        
+        return pump();
+    });
+}
+
 function switchConsoleTab(tab) {
     // Update tab buttons
     document.querySelectorAll('.console-tab').forEach(t => {
@@ -424,7 +517,7 @@ function switchConsoleTab(tab) {
     if (activePanel) activePanel.classList.add('active');
 }
 
-function addToConsole(type, message) {
+function addToConsole(type, message, options = {}) {
     const panelMap = {
         'logs': 'logs-text',
         'error': 'error-text', 
@@ -436,14 +529,30 @@ function addToConsole(type, message) {
     const panel = document.getElementById(panelId);
     
     if (panel) {
-        const div = document.createElement('div');
-        div.className = `console-${type}`;
-        div.textContent = `[${new Date().toLocaleTimeString()}] ${message}`;
-        panel.appendChild(div);
+        // Streamed chunks extend the open block instead of starting new lines
+        const last = panel.lastElementChild;
+        if (options.stream && last && last.dataset.streaming === 'open') {
+            last.textContent += message;
+        } else {
+            const div = document.createElement('div');
+            div.className = `console-${type}`;
+            div.textContent = `[${new Date().toLocaleTimeString()}] ${message}`;
+            if (options.stream) {
+                div.classList.add('console-stream');
+                div.dataset.streaming = 'open';
+            }
+            panel.appendChild(div);
+        }
         panel.scrollTop = panel.scrollHeight;
     }
 }
 
+function endConsoleStreams() {
+    document.querySelectorAll('[data-streaming="open"]').forEach(block => {
+        block.dataset.streaming = 'closed';
+    });
+}
+
 function updateFileStatus() {
     const statusEl = document.getElementById('file-status');
     if (statusEl) {
@@ -0,0 +1,29 @@
+import code_executor
+
+TCC_ONLY = [{'tier': 'fast', 'compiler': 'tcc', 'flags': []}]
+
+
+def fake_compile_native(calls):
+    def compile_native(code, language, compiler, flags, source_name, work_dir, syntax_only=False):
+        calls.append((compiler, syntax_only))
+        return {'returncode': 0, 'stderr': '', 'binary_path': None, 'cache': 'miss',
+                'precompiled_header': False, 'stats': {'wall_time': 0.0}}
+    return compile_native
+
+
+def test_syntax_only_on_tcc_only_host_falls_back_to_full_compile(monkeypatch, tmp_path):
+    calls = []
+    monkeypatch.setattr(code_executor, 'select_tiers', lambda language, grading=False: TCC_ONLY)
+    monkeypatch.setattr(code_executor, '_compile_native', fake_compile_native(calls))
+    compiled = code_executor._compile_tiered('int main(){return 0;}', 'c', str(tmp_path), syntax_only=True)
+    assert calls == [('tcc', False)]
+    assert compiled['returncode'] == 0
+    assert compiled['compiler'] == 'tcc'
+
+
+def test_no_compiler_gives_clean_result(monkeypatch, tmp_path):
+    monkeypatch.setattr(code_executor, 'select_tiers', lambda language, grading=False: [])
+    compiled = code_executor._compile_tiered('int main(){return 0;}', 'c', str(tmp_path), syntax_only=True)
+    assert compiled['returncode'] != 0
+    assert 'compiler not found' in compiled['stderr']
+    assert 'wall_time' in compiled['stats']
@@ -0,0 +1,36 @@
+from diagnostics import lint_c_family
+
+
+def messages(code):
+    return [diagnostic['message'] for diagnostic in lint_c_family(code)]
+
+
+def test_anonymous_typedef_struct_instance_is_declared():
+    code = ('#include <stdio.h>\n'
+            'typedef struct { int n; } Item;\n'
+            'int main(){ Item it; it.n=1; printf("%d", it.n); }\n')
+    assert messages(code) == []
+
+
+def test_cpp_class_instance_is_declared():
+    code = ('#include <cstdio>\n'
+            'class A { public: int n; };\n'
+            'int main(){ A a; a.n=1; printf("%d", a.n); }\n')
+    assert messages(code) == []
+
+
+def test_declarators_after_struct_body_are_declared():
+    code = ('#include <stdio.h>\n'
+            'struct P { int x; } p, q;\n'
+            'int main(){ printf("%d %d", p.x, q.x); }\n')
+    assert messages(code) == []
+
+
+def test_unknown_type_name_declares_variable():
+    code = '#include <stdio.h>\nint main(){ Widget w; printf("%d", w); }\n'
+    assert messages(code) == []
+
+
+def test_undeclared_argument_is_still_reported():
+    code = '#include <stdio.h>\nint main(){ int x = 1; printf("%d", y); return x; }\n'
+    assert messages(code) == ["'y' undeclared (first use in this function)"]
@@ -0,0 +1,80 @@
+import shutil
+
+import pytest
+
+from code_executor import execute_c_code
+from diagnostics import DiagnosticsChecker
+
+VALID_TYPEDEF = ('#include <stdio.h>\n'
+                 'typedef struct { int n; } Item;\n'
+                 'int main(){ Item it; it.n=1; printf("%d", it.n); return 0; }\n')
+
+
+class FakeCompiler:
+    def __init__(self, error=''):
+        self.error = error
+        self.calls = 0
+
+    def __call__(self, language, code):
+        self.calls += 1
+        return {'success': not self.error, 'error': self.error, 'compiler': 'gcc'}
+
+
+def test_undeclared_lint_finding_is_confirmed_by_compiler():
+    checker = DiagnosticsChecker()
+    compiler = FakeCompiler()
+    code = '#include <stdio.h>\nint main(){ printf("%d", value); }\n'
+    result = checker.check('c', code, compiler)
+    assert compiler.calls == 1
+    assert result['stage'] == 'compiler'
+    assert result['diagnostics'] == []
+
+
+def test_structural_lint_error_skips_compiler():
+    checker = DiagnosticsChecker()
+    compiler = FakeCompiler()
+    result = checker.check('c', 'int main() {\n  return 0;\n', compiler)
+    assert compiler.calls == 0
+    assert result['stage'] == 'lint'
+    assert result['diagnostics']
+    assert checker.check('c', 'int main() {\n  return 0;\n', compiler)['cached']
+
+
+def test_unconfirmed_lint_finding_is_not_cached_without_compiler():
+    checker = DiagnosticsChecker()
+    code = '#include <stdio.h>\nint main(){ printf("%d", value); }\n'
+    first = checker.check('c', code)
+    assert first['stage'] == 'lint' and first['diagnostics']
+    compiler = FakeCompiler()
+    second = checker.check('c', code, compiler)
+    assert compiler.calls == 1
+    assert second['stage'] == 'compiler' and not second['cached']
+
+
+def test_valid_typedef_program_has_no_markers():
+    checker = DiagnosticsChecker()
+    result = checker.check('c', VALID_TYPEDEF, FakeCompiler())
+    assert result['diagnostics'] == []
+
+
+def _real_compiler(language, code):
+    return execute_c_code(code, compile_only=True)
+
+
+def test_system_header_notes_are_not_markers():
+    if not shutil.which('gcc'):
+        pytest.skip('gcc not installed')
+    code = '#include <string.h>\nint main(){ return strlen(); }\n'
+    result = DiagnosticsChecker().check('c', code, _real_compiler)
+    assert result['stage'] == 'compiler'
+    assert result['diagnostics']
+    assert {diagnostic['line'] for diagnostic in result['diagnostics']} == {2}
+
+
+def test_warnings_of_a_successful_compile_are_markers():
+    if not shutil.which('gcc'):
+        pytest.skip('gcc not installed')
+    code = 'int main(){ char c = 300; return c; }\n'
+    result = DiagnosticsChecker().check('c', code, _real_compiler)
+    assert [diagnostic['severity'] for diagnostic in result['diagnostics']] == ['warning']
+    assert result['diagnostics'][0]['line'] == 1
@@ -0,0 +1,32 @@
+import threading
+from contextlib import contextmanager
+
+from code_executor import compile_program
+from grader import grade_program
+
+CASES = [{'stdin': f'{n}\n', 'expected_output': f'{n * 2}\n'} for n in range(4)]
+
+
+def test_cases_share_the_slots_they_are_given():
+    slots = threading.BoundedSemaphore(1)
+    running = [0]
+    most = [0]
+    lock = threading.Lock()
+
+    @contextmanager
+    def slot():
+        with slots:
+            with lock:
+                running[0] += 1
+                most[0] = max(most[0], running[0])
+            try:
+                yield
+            finally:
+                with lock:
+                    running[0] -= 1
+
+    compiled, program = compile_program('python', 'import time\ntime.sleep(0.05)\nprint(int(input()) * 2)',
+                                        grading=True)
+    result = grade_program(compiled, program, CASES, slot=slot)
+    assert result['passed'] == len(CASES)
+    assert most[0] == 1
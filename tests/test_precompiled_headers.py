@@ -0,0 +1,45 @@
+import shutil
+
+import pytest
+
+from precompiled_headers import PrecompiledHeaders, submission_includes
+from process_runner import run_process
+
+C_TOOLCHAIN = ('c', 'gcc', ['-O0', '-pipe'])
+CPP_TOOLCHAIN = ('cpp', 'g++', ['-O0', '-pipe'])
+
+C_CLASHES_WITH_MATH = '#include <stdio.h>\nint y1 = 3;\nint main(void) { printf("%d\\n", y1); return 0; }\n'
+CPP_CLASHES_WITH_ALGORITHM = ('#include <iostream>\nusing namespace std;\nint count = 0;\n'
+                              'int main() { cout << count << endl; return 0; }\n')
+
+
+def _compile(toolchain, extra_flags, code, tmp_path):
+    language, compiler, flags = toolchain
+    return run_process(
+        [shutil.which(compiler)] + extra_flags + flags + ['-x', language.replace('cpp', 'c++'), '-', '-o', 'main'],
+        input_text=code, timeout=120, cwd=str(tmp_path)
+    )
+
+
+@pytest.mark.parametrize('toolchain, code, bundle', [
+    (C_TOOLCHAIN, C_CLASHES_WITH_MATH, 'stdio.h,stdlib.h,string.h,math.h'),
+    (CPP_TOOLCHAIN, CPP_CLASHES_WITH_ALGORITHM, 'iostream,string,vector,algorithm'),
+])
+def test_bundle_is_used_only_for_its_exact_include_set(monkeypatch, tmp_path, toolchain, code, bundle):
+    language, compiler, _ = toolchain
+    if not shutil.which(compiler):
+        pytest.skip(f'{compiler} not installed')
+    monkeypatch.setenv(f'COLUNN_PCH_{language.upper()}_BUNDLES', bundle)
+    headers = PrecompiledHeaders(pch_dir=str(tmp_path / 'pch'))
+    headers.build([toolchain])
+
+    # The configured bundle covers the includes but declares more than they do
+    assert headers.flags_for(*toolchain, code) == []
+    headers.build_requested()
+    flags = headers.flags_for(*toolchain, code)
+    assert flags[0] == '-include'
+    with open(flags[1]) as bundle_file:
+        assert [line.split('<')[1].rstrip('>\n') for line in bundle_file] == submission_includes(code)
+
+    result = _compile(toolchain, flags, code, tmp_path)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,52 @@
+import sys
+import time
+
+from process_runner import run_process
+
+BACKGROUND_CHILD = '''
+import os, sys, time
+print('leader done', flush=True)
+if os.fork() == 0:
+    time.sleep(30)
+'''
+
+
+def test_background_grandchild_does_not_hold_the_run_open():
+    started = time.monotonic()
+    result = run_process([sys.executable, '-c', BACKGROUND_CHILD], timeout=5)
+    assert time.monotonic() - started < 2
+    assert result.returncode == 0
+    assert result.stdout == 'leader done\n'
+
+
+def test_output_and_input_round_trip():
+    result = run_process([sys.executable, '-c', 'print(input()[::-1])'], input_text='abc\n', timeout=5)
+    assert result.returncode == 0
+    assert result.stdout == 'cba\n'
+
+
+def test_async_run_kills_the_session_when_the_leader_exits():
+    import asyncio
+    from async_executor import run_process_async
+
+    started = time.monotonic()
+    result = asyncio.run(run_process_async([sys.executable, '-c', BACKGROUND_CHILD], timeout=5))
+    assert time.monotonic() - started < 2
+    assert result.returncode == 0
+    assert result.stdout == 'leader done\n'
+
+
+def test_aborting_callback_gets_the_run_stats():
+    class Abort(Exception):
+        pass
+
+    def on_output(stream, text):
+        raise Abort()
+
+    try:
+        run_process([sys.executable, '-c', 'print("x", flush=True)\nimport time; time.sleep(30)'],
+                    timeout=5, on_output=on_output)
+    except Abort as e:
+        assert 'user_cpu' in e.stats
+    else:
+        raise AssertionError('the callback did not abort the run')
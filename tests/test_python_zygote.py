@@ -0,0 +1,52 @@
+import os
+import signal
+import time
+
+from python_zygote import zygote_client
+
+
+def test_timed_out_runner_is_killed_by_its_helper():
+    started = time.monotonic()
+    result = zygote_client.run('while True: pass', timeout=0.5)
+    assert time.monotonic() - started < 3
+    assert result['timed_out']
+    assert result['returncode'] == -signal.SIGKILL
+    assert result['stats'] is not None
+
+
+def test_aborted_run_is_killed_by_its_helper():
+    class Abort(Exception):
+        pass
+
+    printed = []
+
+    def on_output(stream, text):
+        printed.append(text)
+        raise Abort()
+
+    try:
+        zygote_client.run('import os, time\nprint(os.getpid(), flush=True)\ntime.sleep(30)',
+                          timeout=10, on_output=on_output)
+    except Abort:
+        pass
+    pid = int(printed[0])
+    deadline = time.monotonic() + 2
+    while time.monotonic() < deadline:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return
+        time.sleep(0.02)
+    raise AssertionError('runner outlived the aborted run')
+
+
+def test_aborting_callback_gets_the_helper_stats():
+    def on_output(stream, text):
+        raise KeyError(text)
+
+    try:
+        zygote_client.run('print("x", flush=True)\nimport time\ntime.sleep(30)', timeout=5, on_output=on_output)
+    except KeyError as e:
+        assert 'user_cpu' in e.stats
+    else:
+        raise AssertionError('the callback did not abort the run')
@@ -0,0 +1,71 @@
+import json
+import os
+import time
+
+from result_cache import ResultCache
+
+RESULT = {'success': True, 'output': '42\n', 'error': '', 'compile_cache': 'miss',
+          'precompiled_header': True, 'stages': {'run': {'wall_time': 0.01}}}
+
+
+def _cache(tmp_path, **kwargs):
+    return ResultCache(cache_dir=str(tmp_path), **kwargs)
+
+
+def test_hit_does_not_report_the_storing_run_build(tmp_path):
+    cache = _cache(tmp_path)
+    stored = dict(RESULT)
+    cache.store('k', stored)
+    assert stored['result_cache'] == 'miss'
+
+    hit = cache.lookup('k')
+    assert hit['result_cache'] == 'hit'
+    assert hit['cache_hit'] is True
+    assert 'compile_cache' not in hit
+    assert 'precompiled_header' not in hit
+    assert hit['output'] == '42\n'
+
+
+def test_disk_entries_expire_from_when_they_were_stored(tmp_path):
+    cache = _cache(tmp_path, ttl=60)
+    cache.store('k', dict(RESULT))
+    path = os.path.join(str(tmp_path), 'k.json')
+    with open(path) as entry_file:
+        stored = json.load(entry_file)
+    stored['stored_at'] -= 120
+    with open(path, 'w') as entry_file:
+        json.dump(stored, entry_file)
+
+    # A fresh process has only the disk tier; touching the file does not revive it
+    os.utime(path)
+    assert _cache(tmp_path, ttl=60).lookup('k') is None
+    assert not os.path.exists(path)
+
+
+def test_disk_hit_keeps_the_stored_time(tmp_path):
+    cache = _cache(tmp_path, ttl=60)
+    cache.store('k', dict(RESULT))
+    path = os.path.join(str(tmp_path), 'k.json')
+    before = os.path.getmtime(path)
+    time.sleep(0.01)
+    assert _cache(tmp_path, ttl=60).lookup('k') is not None
+    assert os.path.getmtime(path) == before
+
+
+def test_memory_tier_keeps_to_its_byte_budget(tmp_path):
+    cache = _cache(tmp_path, max_memory_bytes=4096, max_memory_entry_bytes=2048)
+    for index in range(4):
+        cache.store(f'k{index}', dict(RESULT, output='x' * 1000))
+    stats = cache.stats()
+    assert stats['memory_bytes'] <= 4096
+    assert 0 < stats['entries'] < 4
+    # Evicted entries are still served from disk
+    assert all(cache.lookup(f'k{index}')['output'] == 'x' * 1000 for index in range(4))
+
+
+def test_large_results_skip_the_memory_tier(tmp_path):
+    cache = _cache(tmp_path, max_memory_entry_bytes=2048)
+    cache.store('big', dict(RESULT, output='x' * 4096))
+    assert cache.stats()['entries'] == 0
+    assert cache.lookup('big')['output'] == 'x' * 4096
+    assert cache.stats()['entries'] == 0
@@ -0,0 +1,202 @@
+"""
+Per-task run time limits calibrated from reference solutions.
+
+A fixed 5 second limit lets an infinite loop on a trivial task burn 5 seconds
+of CPU, and gives heavier tasks false timeouts on a loaded machine. Instead,
+each task's reference solution (models.TaskReference) is graded in the
+background on this machine, COLUNN_CALIBRATION_RUNS times, and its runtime
+(the slowest test case's median wall time) is stored with a fingerprint of
+the machine and toolchain. A submission's limit is COLUNN_TIME_LIMIT_FACTOR
+times that runtime, clamped to [COLUNN_TIME_LIMIT_MIN, COLUNN_TIME_LIMIT_MAX].
+
+A reference is recalibrated when the fingerprint changes (new compiler or
+runtime version, different CPU). Until it has been calibrated, or for
+languages without a reference, grading uses the default limit.
+COLUNN_TIME_LIMITS=0 turns calibration off.
+"""
+import hashlib
+import os
+import platform
+import queue
+import statistics
+import threading
+from datetime import datetime
+from functools import lru_cache
+
+from code_executor import toolchain_fingerprint
+from grader import RUN_TIMEOUT, grade_submission
+
+DEFAULT_FACTOR = 3.0
+DEFAULT_MIN_LIMIT = 0.5
+DEFAULT_MAX_LIMIT = 10.0
+DEFAULT_RUNS = 3
+
+
+def enabled():
+    """Calibrated limits are on by default; COLUNN_TIME_LIMITS=0 turns them off"""
+    return os.environ.get('COLUNN_TIME_LIMITS', '1') != '0'
+
+
+def _cpu_model():
+    try:
+        with open('/proc/cpuinfo') as cpuinfo:
+            for line in cpuinfo:
+                if line.startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor()
+
+
+@lru_cache(maxsize=1)
+def machine_fingerprint():
+    """What a runtime measured on this machine depends on besides the toolchain"""
+    return f'{platform.machine()} {_cpu_model()} x{os.cpu_count()}'
+
+
+def calibration_fingerprint(language):
+    """Runtimes are comparable only under the same fingerprint"""
+    digest = hashlib.sha256()
+    for part in (machine_fingerprint(), language, toolchain_fingerprint(language)):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def _test_cases(task):
+    return [{'stdin': case.stdin, 'expected_output': case.expected_output} for case in task.test_cases]
+
+
+class TimeLimitCalibrator:
+    """
+    Background benchmarking of reference solutions, and the limits derived
+    from their runtimes.
+    """
+
+    def __init__(self, factor=None, minimum=None, maximum=None, runs=None):
+        self.factor = factor or float(os.environ.get('COLUNN_TIME_LIMIT_FACTOR', DEFAULT_FACTOR))
+        self.minimum = minimum or float(os.environ.get('COLUNN_TIME_LIMIT_MIN', DEFAULT_MIN_LIMIT))
+        self.maximum = maximum or float(os.environ.get('COLUNN_TIME_LIMIT_MAX', DEFAULT_MAX_LIMIT))
+        self.runs = runs or int(os.environ.get('COLUNN_CALIBRATION_RUNS', DEFAULT_RUNS))
+        self._app = None
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self.calibrated = 0
+        self.failed = 0
+
+    def start(self, app):
+        """Calibrate every stale reference in a daemon thread, then any queued later"""
+        with self._lock:
+            if self._app is not None or not enabled():
+                return
+            self._app = app
+
+        def loop():
+            with app.app_context():
+                self._queue_stale()
+            while True:
+                reference_id = self._queue.get()
+                try:
+                    with app.app_context():
+                        self._calibrate(reference_id)
+                except Exception:
+                    with self._lock:
+                        self.failed += 1
+                finally:
+                    with self._lock:
+                        self._pending.discard(reference_id)
+
+        threading.Thread(target=loop, name='time-limit-calibrator', daemon=True).start()
+
+    def _queue_stale(self):
+        from models import TaskReference
+
+        for reference in TaskReference.query.all():
+            if reference.fingerprint != calibration_fingerprint(reference.language):
+                self.request(reference.id)
+
+    def request(self, reference_id):
+        """Queue a reference for calibration unless it is already waiting"""
+        with self._lock:
+            if self._app is None or reference_id in self._pending:
+                return
+            self._pending.add(reference_id)
+        self._queue.put(reference_id)
+
+    def _calibrate(self, reference_id):
+        # app imports routes, which imports this module
+        from app import db
+        from models import TaskReference
+
+        reference = TaskReference.query.get(reference_id)
+        if reference is None:
+            return
+        fingerprint = calibration_fingerprint(reference.language)
+        test_cases = _test_cases(reference.task)
+
+        runtime, error = None, None
+        if not test_cases:
+            error = 'Task has no test cases'
+        else:
+            # Wall time per test case across runs; each run grades every case
+            samples = [[] for _ in test_cases]
+            for _ in range(self.runs):
+                result = grade_submission(reference.language, reference.code, test_cases,
+                                          timeout=self.maximum, early_exit=False)
+                if not result['success']:
+                    error = result.get('error') or result.get('output') or 'Reference solution failed'
+                    break
+                for case, sample in zip(result['cases'], samples):
+                    sample.append(case['stats']['wall_time'])
+            else:
+                runtime = max(statistics.median(sample) for sample in samples)
+
+        reference.runtime = runtime
+        reference.calibration_error = error
+        reference.fingerprint = fingerprint
+        reference.calibrated_at = datetime.utcnow()
+        db.session.commit()
+        with self._lock:
+            if error is None:
+                self.calibrated += 1
+            else:
+                self.failed += 1
+
+    def limit_from_runtime(self, runtime):
+        return round(min(max(runtime * self.factor, self.minimum), self.maximum), 3)
+
+    def limit_for(self, task, language):
+        """
+        The run time limit for a submission to task in language:
+        {'seconds', 'source' ('calibrated' or 'default'), 'reference_runtime'}.
+        A reference that is missing or stale is queued for calibration.
+        """
+        limit = {'seconds': RUN_TIMEOUT, 'source': 'default', 'reference_runtime': None}
+        if not enabled():
+            return limit
+        reference = next((ref for ref in task.references if ref.language == language), None)
+        if reference is None:
+            return limit
+        if reference.fingerprint != calibration_fingerprint(language):
+            self.request(reference.id)
+            return limit
+        if reference.runtime is not None:
+            limit.update(seconds=self.limit_from_runtime(reference.runtime), source='calibrated',
+                         reference_runtime=reference.runtime)
+        return limit
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': enabled(),
+                'factor': self.factor,
+                'min_limit': self.minimum,
+                'max_limit': self.maximum,
+                'pending': len(self._pending),
+                'calibrated': self.calibrated,
+                'failed': self.failed
+            }
+
+
+time_limit_calibrator = TimeLimitCalibrator()
@@ -0,0 +1,184 @@
+"""
+Preemptive time slicing of long-running student programs.
+
+Admission hands out more execution slots than there are cores, so a few
+CPU-bound programs can hold every core while newly started runs wait for
+CPU. Every COLUNN_SLICE_MS milliseconds the slicer looks at the registered
+programs: those that have been charged more than COLUNN_SLICE_LONG_AFTER
+seconds are long-running. While younger programs are running and there are
+more programs than cores (COLUNN_SLICE_CORES), long-running ones are paused
+with SIGSTOP and resumed with SIGCONT round-robin, so they share whatever
+cores the young ones leave. A program paused for COLUNN_SLICE_MAX_PAUSE
+seconds gets a slice regardless, so it keeps making progress.
+
+A program's time limit is charged only for the time it was allowed to run:
+wall time minus time spent stopped. COLUNN_SLICE_MAX_STRETCH bounds how far
+that can stretch its wall time. COLUNN_TIME_SLICING=0 turns pausing off.
+"""
+import functools
+import os
+import signal
+import threading
+import time
+
+DEFAULT_SLICE_MS = 100
+DEFAULT_LONG_AFTER = 0.5
+DEFAULT_MAX_PAUSE = 1.0
+DEFAULT_MAX_STRETCH = 4.0
+
+
+def enabled():
+    """Time slicing is on by default; COLUNN_TIME_SLICING=0 turns it off"""
+    return os.environ.get('COLUNN_TIME_SLICING', '1') != '0'
+
+
+def signal_group(pid, signum):
+    """
+    Send signum to the process group led by pid, or to pid alone before it
+    has called setsid(). Only call this while pid is unreaped.
+    """
+    try:
+        os.killpg(pid, signum)
+    except OSError:
+        try:
+            os.kill(pid, signum)
+        except OSError:
+            pass
+
+
+class SlicedProcess:
+    """A registered program and the time it has spent stopped"""
+
+    def __init__(self, pid, max_stretch, send_signal=None):
+        self.pid = pid
+        self.send_signal = send_signal or functools.partial(signal_group, pid)
+        self.max_stretch = max_stretch
+        self.started = time.monotonic()
+        self.last_resumed = self.started
+        self.paused_at = None
+        self.paused_total = 0.0
+        self.pauses = 0
+
+    def paused_time(self, now=None):
+        now = time.monotonic() if now is None else now
+        paused_at = self.paused_at
+        return self.paused_total + (now - paused_at if paused_at is not None else 0.0)
+
+    def charged(self, now=None):
+        """Seconds to charge against the time limit: wall time less time stopped"""
+        now = time.monotonic() if now is None else now
+        wall = now - self.started
+        return max(wall - self.paused_time(now), wall / self.max_stretch)
+
+
+class TimeSlicer:
+    """
+    Registry of running programs and the thread that pauses and resumes them.
+    """
+
+    def __init__(self, slice_seconds=None, long_after=None, max_pause=None, max_stretch=None, cores=None):
+        self.slice_seconds = slice_seconds or int(os.environ.get('COLUNN_SLICE_MS', DEFAULT_SLICE_MS)) / 1000
+        self.long_after = long_after or float(os.environ.get('COLUNN_SLICE_LONG_AFTER', DEFAULT_LONG_AFTER))
+        self.max_pause = max_pause or float(os.environ.get('COLUNN_SLICE_MAX_PAUSE', DEFAULT_MAX_PAUSE))
+        self.max_stretch = max_stretch or float(os.environ.get('COLUNN_SLICE_MAX_STRETCH', DEFAULT_MAX_STRETCH))
+        self.cores = cores or int(os.environ.get('COLUNN_SLICE_CORES', os.cpu_count() or 2))
+        self._processes = []
+        self._condition = threading.Condition()
+        self._started = False
+        self.pauses = 0
+        self.resumes = 0
+        self.max_paused = 0
+
+    def register(self, pid, send_signal=None):
+        """
+        Track a started program (the leader of its own session). Returns a
+        SlicedProcess whose charged() is the time to hold against its limit;
+        pass it to unregister() before the program is reaped. send_signal(signum)
+        stops and continues the program's group; by default it is signalled
+        directly, which is only safe from the process that reaps it.
+        """
+        process = SlicedProcess(pid, self.max_stretch, send_signal)
+        if not enabled():
+            return process
+        with self._condition:
+            self._processes.append(process)
+            if not self._started:
+                self._started = True
+                threading.Thread(target=self._loop, name='time-slicer', daemon=True).start()
+            self._condition.notify_all()
+        return process
+
+    def unregister(self, process):
+        """Stop tracking process, resuming it if it is paused"""
+        with self._condition:
+            if process not in self._processes:
+                return
+            self._processes.remove(process)
+            if process.paused_at is not None:
+                self._resume(process, time.monotonic())
+
+    def _pause(self, process, now):
+        # Called with the condition held
+        process.send_signal(signal.SIGSTOP)
+        process.paused_at = now
+        process.pauses += 1
+        self.pauses += 1
+
+    def _resume(self, process, now):
+        # Called with the condition held
+        process.send_signal(signal.SIGCONT)
+        process.paused_total += now - process.paused_at
+        process.paused_at = None
+        process.last_resumed = now
+        self.resumes += 1
+
+    def _loop(self):
+        while True:
+            with self._condition:
+                while not self._processes:
+                    self._condition.wait()
+            time.sleep(self.slice_seconds)
+            self._tick()
+
+    def _tick(self):
+        now = time.monotonic()
+        with self._condition:
+            young = [process for process in self._processes if process.charged(now) < self.long_after]
+            long_running = [process for process in self._processes if process not in young]
+            if not young:
+                runnable = long_running
+            else:
+                # Paused programs take their turn in the order they were
+                # stopped; running ones keep the core until their slice ends
+                turns = sorted(long_running, key=lambda process: process.paused_at
+                               if process.paused_at is not None
+                               else process.last_resumed + self.slice_seconds)
+                budget = max(self.cores - len(young), 0)
+                runnable = turns[:budget] + [
+                    process for process in turns[budget:]
+                    if process.paused_at is not None and now - process.paused_at >= self.max_pause
+                ]
+
+            for process in long_running:
+                if process in runnable and process.paused_at is not None:
+                    self._resume(process, now)
+                elif process not in runnable and process.paused_at is None:
+                    self._pause(process, now)
+            paused = sum(1 for process in self._processes if process.paused_at is not None)
+            self.max_paused = max(self.max_paused, paused)
+
+    def stats(self):
+        with self._condition:
+            return {
+                'enabled': enabled(),
+                'cores': self.cores,
+                'slice_ms': round(self.slice_seconds * 1000),
+                'running': sum(1 for process in self._processes if process.paused_at is None),
+                'paused': sum(1 for process in self._processes if process.paused_at is not None),
+                'max_paused': self.max_paused,
+                'pauses': self.pauses,
+                'resumes': self.resumes
+            }
+
+
+time_slicer = TimeSlicer()
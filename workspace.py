@@ -0,0 +1,133 @@
+"""
+Pooled per-job working directories on a RAM-backed filesystem.
+
+Creating and deleting a temp directory for every execution puts disk and
+metadata churn on the hot path. Instead a fixed pool of directories is
+created once under COLUNN_WORKSPACE_ROOT (default /dev/shm when it allows
+executing binaries, else the system temp dir); each job borrows one, and it
+is scrubbed and handed to the next job afterwards. When the pool is empty an
+overflow directory is created and removed after use.
+"""
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+
+DEFAULT_POOL_SIZE = 32
+RAM_ROOTS = ('/dev/shm',)
+
+
+def _default_root():
+    """A tmpfs mount that permits exec, falling back to the system temp dir"""
+    for candidate in RAM_ROOTS:
+        try:
+            flags = os.statvfs(candidate).f_flag
+        except OSError:
+            continue
+        if os.access(candidate, os.W_OK) and not flags & os.ST_NOEXEC:
+            return os.path.join(candidate, 'colunn-workspaces')
+    return os.path.join(tempfile.gettempdir(), 'colunn-workspaces')
+
+
+def _scrub(path):
+    """Empty a directory without removing it; returns False if something could not be removed"""
+    try:
+        entries = list(os.scandir(path))
+    except OSError:
+        return False
+    clean = True
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path)
+            else:
+                os.unlink(entry.path)
+        except OSError:
+            clean = False
+    return clean
+
+
+class WorkspacePool:
+    """
+    Fixed set of reusable job directories plus overflow on demand.
+    """
+
+    def __init__(self, root=None, size=None):
+        self.root = root or os.environ.get('COLUNN_WORKSPACE_ROOT') or _default_root()
+        self.size = size or int(os.environ.get('COLUNN_WORKSPACE_POOL', DEFAULT_POOL_SIZE))
+        self._idle = []
+        self._lock = threading.Lock()
+        self._created = False
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.acquired = 0
+        self.overflow = 0
+        self.recreated = 0
+
+    def _create_pool(self):
+        # Called with the lock held
+        if self._created:
+            return
+        os.makedirs(self.root, exist_ok=True)
+        for index in range(self.size):
+            path = os.path.join(self.root, f'ws-{os.getpid()}-{index}')
+            os.makedirs(path, exist_ok=True)
+            _scrub(path)
+            self._idle.append(path)
+        self._created = True
+
+    def acquire(self):
+        """Borrow an empty directory; return it with release()"""
+        with self._lock:
+            self._create_pool()
+            self.acquired += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+            if self._idle:
+                return self._idle.pop()
+            self.overflow += 1
+        return tempfile.mkdtemp(prefix=f'overflow-{os.getpid()}-', dir=self.root)
+
+    def release(self, path):
+        """Scrub a borrowed directory and return it to the pool"""
+        pooled = os.path.basename(path).startswith('ws-')
+        if pooled and not _scrub(path):
+            # Left in a state we can't clean in place; start it over
+            shutil.rmtree(path, ignore_errors=True)
+            os.makedirs(path, exist_ok=True)
+            with self._lock:
+                self.recreated += 1
+        elif not pooled:
+            shutil.rmtree(path, ignore_errors=True)
+
+        with self._lock:
+            self.in_use -= 1
+            if pooled:
+                self._idle.append(path)
+
+    @contextmanager
+    def workspace(self):
+        """Context manager yielding a borrowed directory path"""
+        path = self.acquire()
+        try:
+            yield path
+        finally:
+            self.release(path)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'root': self.root,
+                'size': self.size,
+                'in_use': self.in_use,
+                'idle': len(self._idle),
+                'peak_in_use': self.peak_in_use,
+                'utilization': round(self.in_use / self.size, 3) if self.size else 0.0,
+                'acquired': self.acquired,
+                'overflow': self.overflow,
+                'recreated': self.recreated
+            }
+
+
+workspace_pool = WorkspacePool()